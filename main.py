@@ -1,6 +1,8 @@
 import pandas as pd
 import os
-from datetime import datetime, timedelta
+
+from semester_calendar import DEFAULT_CALENDAR
+from tkb_schema import detect_schema
 
 # Đường dẫn tới file Excel
 excel_file = "0528_TKB_HK1_NAM_HOC_2025_20261-1.xlsx"
@@ -22,12 +24,13 @@ if os.path.exists(excel_file):
             print("\n� Đang xử lý sheet TKB CHINH...")
             
             # Đọc sheet TKB CHINH với các tùy chọn để xử lý header
-            df_main = pd.read_excel(excel_file, sheet_name='TKB CHINH', header=7)
+            schema = detect_schema(excel_file, 'TKB CHINH')
+            df_main = schema.apply(pd.read_excel(excel_file, sheet_name='TKB CHINH', header=schema.header))
             
             print(f"Số dòng dữ liệu: {len(df_main)}")
             
             # Xử lý và chuyển đổi dữ liệu
-            schedule_list = process_schedule_data(df_main)
+            schedule_list = process_schedule_data(df_main, schema.calendar or DEFAULT_CALENDAR)
             
             # Hiển thị kết quả
             df_result = display_schedule_table(schedule_list)
@@ -54,45 +57,19 @@ else:
         if file.endswith((".xlsx", ".xls")):
             print(f"  - {file}")
 
+# Bảng tên thứ dựng một lần (không tạo lại dict mỗi lần gọi)
+DAY_NAMES = {2: "Thứ 2", 3: "Thứ 3", 4: "Thứ 4", 5: "Thứ 5", 6: "Thứ 6", 7: "Thứ 7", 8: "Chủ nhật"}
+
 def convert_day_to_vietnamese(day_num):
     """Chuyển đổi số thứ sang tên thứ tiếng Việt"""
-    days = {
-        2: "Thứ 2",
-        3: "Thứ 3", 
-        4: "Thứ 4",
-        5: "Thứ 5",
-        6: "Thứ 6",
-        7: "Thứ 7",
-        8: "Chủ nhật"
-    }
-    return days.get(day_num, f"Thứ {day_num}")
+    return DAY_NAMES.get(day_num, f"Thứ {day_num}")
 
-def calculate_date_range(week_schedule):
+def calculate_date_range(week_schedule, calendar=DEFAULT_CALENDAR):
     """Tính toán ngày bắt đầu và kết thúc dựa trên lịch tuần"""
-    # Ngày bắt đầu học kỳ (25/08/2025)
-    start_date = datetime(2025, 8, 25)
-    
-    # Tìm tuần đầu tiên có dấu 'x'
-    first_week = None
-    last_week = None
-    
-    week_columns = ['08/25', '09/25', '10/25', '11/25', '12/25']
-    
-    for i, col in enumerate(week_columns):
-        if week_schedule.get(col) == 'x':
-            if first_week is None:
-                first_week = i
-            last_week = i
-    
-    if first_week is not None and last_week is not None:
-        # Tính ngày bắt đầu và kết thúc
-        start = start_date + timedelta(weeks=first_week)
-        end = start_date + timedelta(weeks=last_week + 1)
-        return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
-    
-    return "2025-08-25", "2025-12-31"
+    start, end, _ = calendar.date_range(week_schedule)
+    return start, end
 
-def process_schedule_data(df):
+def process_schedule_data(df, calendar=DEFAULT_CALENDAR):
     """Xử lý dữ liệu thời khóa biểu và chuyển đổi sang định dạng mong muốn"""
     
     # Lọc các dòng có dữ liệu hợp lệ (bỏ qua header và dòng trống)
@@ -123,15 +100,9 @@ def process_schedule_data(df):
             # Chuyển đổi thứ
             day_name = convert_day_to_vietnamese(day_num) if pd.notna(day_num) else ""
             
-            # Tính toán ngày bắt đầu và kết thúc
-            week_data = {
-                '08/25': row.get('08/25'),
-                '09/25': row.get('09/25'), 
-                '10/25': row.get('10/25'),
-                '11/25': row.get('11/25'),
-                '12/25': row.get('12/25')
-            }
-            start_date, end_date = calculate_date_range(week_data)
+            # Tính toán ngày bắt đầu và kết thúc theo mọi cột tuần của lịch học kỳ
+            week_data = {week_col: row.get(week_col) for week_col in calendar.columns if week_col in df.columns}
+            start_date, end_date = calculate_date_range(week_data, calendar)
             
             # Tạo thời gian học
             time_slot = ""
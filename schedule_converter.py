@@ -1,66 +1,25 @@
+import numpy as np
 import pandas as pd
 import os
-from datetime import datetime, timedelta
+
+from semester_calendar import DEFAULT_CALENDAR, is_active_week_cell
+from tkb_schema import detect_schema
+from tkb_stats import compute_statistics, print_statistics
+from tkb_weeks import parse_week_matrix
+from tkb_writer import frame_rows, write_xlsx_stream
+
+# Bảng tên thứ dựng một lần (không tạo lại dict mỗi lần gọi)
+DAY_NAMES = {2: "Thứ 2", 3: "Thứ 3", 4: "Thứ 4", 5: "Thứ 5", 6: "Thứ 6", 7: "Thứ 7", 8: "Chủ nhật"}
 
 def convert_day_to_vietnamese(day_num):
     """Chuyển đổi số thứ sang tên thứ tiếng Việt"""
-    days = {
-        2: "Thứ 2",
-        3: "Thứ 3", 
-        4: "Thứ 4",
-        5: "Thứ 5",
-        6: "Thứ 6",
-        7: "Thứ 7",
-        8: "Chủ nhật"
-    }
-    return days.get(day_num, f"Thứ {day_num}")
-
-def calculate_date_range(week_schedule):
-    """Tính toán ngày bắt đầu và kết thúc dựa trên lịch tuần"""
-    # Ngày bắt đầu học kỳ (25/08/2025)
-    start_date = datetime(2025, 8, 25)
-    
-    # Tìm tuần đầu tiên có dấu 'x'
-    first_week = None
-    last_week = None
-    
-    week_columns = ['08/25', '09/25', '10/25', '11/25', '12/25']
-    
-    for i, col in enumerate(week_columns):
-        if week_schedule.get(col) == 'x':
-            if first_week is None:
-                first_week = i
-            last_week = i
-    
-    if first_week is not None and last_week is not None:
-        # Tính ngày bắt đầu và kết thúc
-        start = start_date + timedelta(weeks=first_week)
-        end = start_date + timedelta(weeks=last_week + 1)
-        return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
-    
-    return "2025-08-25", "2025-12-31"
+    return DAY_NAMES.get(day_num, f"Thứ {day_num}")
 
-def get_period_description(week_data):
-    """Tạo mô tả thời gian học dựa trên các tuần có 'x'"""
-    period_descriptions = []
-    
-    week_periods = {
-        '08/25': "cuối tháng 8/2025",
-        '09/25': "đầu tháng 9/2025", 
-        '10/25': "đầu tháng 10/2025",
-        '11/25': "đầu tháng 11/2025",
-        '12/25': "đầu tháng 12/2025"
-    }
-    
-    for week_col, description in week_periods.items():
-        if str(week_data.get(week_col, '')).lower() == 'x':
-            period_descriptions.append(description)
-    
-    if period_descriptions:
-        return "Từ " + ", ".join(period_descriptions)
-    return "Không xác định"
+def get_period_description(week_data, calendar=DEFAULT_CALENDAR):
+    """Mô tả thời gian học theo các tuần có lịch (đọc từ lịch học kỳ, mọi cột tuần)"""
+    return calendar.describe(calendar.encode(week_data))
 
-def process_schedule_data(df):
+def process_schedule_data(df, calendar=DEFAULT_CALENDAR):
     """Xử lý dữ liệu thời khóa biểu - BAO GỒM TẤT CẢ CÁC CỘT"""
     
     # Lọc các dòng có tên môn học (ít nghiêm ngặt hơn)
@@ -70,10 +29,8 @@ def process_schedule_data(df):
     df_filtered = df_filtered[df_filtered['Tên môn học/ học phần'] != 'Tên môn học/ học phần']
     
     # Lọc các dòng có ít nhất một tuần có lịch học
-    week_cols = ['08/25', '09/25', '10/25', '11/25', '12/25']
-    has_schedule = df_filtered[week_cols].apply(
-        lambda row: row.astype(str).str.lower().str.contains('x', na=False).any(), axis=1
-    )
+    week_cols = [col for col in calendar.columns if col in df_filtered.columns]
+    has_schedule = parse_week_matrix(df_filtered, week_cols).active().any(axis=1)
     df_clean = df_filtered[has_schedule]
     
     print(f"📊 Số dòng sau khi lọc: {len(df_clean)} (từ {len(df)} dòng ban đầu)")
@@ -138,14 +95,12 @@ def process_schedule_data(df):
                 week_data[week_col] = row.get(week_col)
             
             # Thêm mô tả thời gian học
-            schedule_item['Thời gian học'] = get_period_description(week_data)
+            schedule_item['Thời gian học'] = get_period_description(week_data, calendar)
             
-            # Thêm chi tiết từng tuần (giữ lại để tham khảo)
-            schedule_item['Tuần 25/8'] = 'Có' if str(row.get('08/25', '')).lower() == 'x' else 'Không'
-            schedule_item['Tuần 1/9'] = 'Có' if str(row.get('09/25', '')).lower() == 'x' else 'Không'
-            schedule_item['Tuần 6/10'] = 'Có' if str(row.get('10/25', '')).lower() == 'x' else 'Không'
-            schedule_item['Tuần 3/11'] = 'Có' if str(row.get('11/25', '')).lower() == 'x' else 'Không'
-            schedule_item['Tuần 1/12'] = 'Có' if str(row.get('12/25', '')).lower() == 'x' else 'Không'
+            # Thêm chi tiết từng tuần (giữ lại để tham khảo): 'Tuần <số tuần>' theo lịch học kỳ
+            for week_col in week_cols:
+                active = is_active_week_cell(week_data[week_col])
+                schedule_item[f'Tuần {calendar.week_of(week_col)}'] = 'Có' if active else 'Không'
             
             # Tạo địa điểm đầy đủ
             if schedule_item['Phòng'] and schedule_item['Nhà']:
@@ -165,6 +120,18 @@ def process_schedule_data(df):
     
     return schedule_list
 
+def week_flag_masks(df_result):
+    """Bitmask tuần mỗi dòng từ các cột 'Tuần ...' ('Có'/'Không') của kết quả, bit i = cột thứ i"""
+    masks = np.zeros(len(df_result), dtype=np.int64)
+    flag_cols = [col for col in df_result.columns if col.startswith('Tuần ')]
+    for bit, col in enumerate(flag_cols):
+        masks[(df_result[col] == 'Có').to_numpy(dtype=bool)] |= 1 << bit
+    return masks
+
+def schedule_statistics(df_result):
+    """Thống kê (tkb_stats) của kết quả process_schedule_data: số tuần lấy từ các cột 'Tuần ...'"""
+    return compute_statistics(df_result, masks=week_flag_masks(df_result))
+
 def display_schedule_table(schedule_list):
     """Hiển thị bảng thời khóa biểu với TẤT CẢ CÁC CỘT"""
     if not schedule_list:
@@ -195,19 +162,8 @@ def display_schedule_table(schedule_list):
     
     print(f"\n📊 Tổng số lớp học phần: {len(schedule_list)}")
     
-    # Thống kê theo ngành
-    if 'Ngành' in df_result.columns and not df_result['Ngành'].isnull().all():
-        major_stats = df_result['Ngành'].value_counts().head(10)
-        print("\n📈 Top 10 ngành có nhiều lớp nhất:")
-        for major, count in major_stats.items():
-            print(f"  - {major}: {count} lớp")
-    
-    # Thống kê theo khóa
-    if 'Khóa' in df_result.columns and not df_result['Khóa'].isnull().all():
-        year_stats = df_result['Khóa'].value_counts()
-        print("\n📅 Thống kê theo khóa:")
-        for year, count in year_stats.items():
-            print(f"  - Khóa {year}: {count} lớp")
+    # Thống kê theo ngành, khóa, giảng viên, phòng (một lượt, xem tkb_stats)
+    print_statistics(schedule_statistics(df_result))
     
     # Thống kê thời gian học
     if 'Thời gian học' in df_result.columns:
@@ -221,45 +177,43 @@ def display_schedule_table(schedule_list):
     
     return df_result
 
-def save_to_excel(df_result, output_file="tkb_full_columns.xlsx"):
-    """Lưu kết quả với TẤT CẢ CÁC CỘT vào file Excel mới"""
+def save_to_excel(df_result, output_file="tkb_full_columns.xlsx", streaming=True, stats=None):
+    """Lưu kết quả với TẤT CẢ CÁC CỘT vào file Excel mới (streaming=True: ghi theo luồng, bộ nhớ không đổi)
+
+    stats: ScheduleStatistics cho sheet 'Thống kê'; None thì tính từ df_result.
+    """
     try:
+        # Sheet tóm tắt với các cột chính
+        summary_cols = ['TT', 'Mã môn học', 'Tên môn học/ học phần', 'Lớp', 'Nhóm', 'Thứ', 
+                      'Tiết BĐ', 'Số tiết', 'Giảng viên giảng dạy', 'Phòng', 'Nhà', 
+                      'Thời gian học', 'Địa điểm đầy đủ']
+        df_summary = df_result[summary_cols]
+        
+        # Sheet thống kê: cùng số liệu với phần in ra màn hình
+        if stats is None:
+            stats = schedule_statistics(df_result)
+        df_stats = stats.to_frame()
+        
         # Tạo file Excel với nhiều sheet
-        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-            # Sheet chính với tất cả dữ liệu
-            df_result.to_excel(writer, sheet_name='Thời khóa biểu đầy đủ', index=False)
-            
-            # Sheet tóm tắt với các cột chính
-            summary_cols = ['TT', 'Mã môn học', 'Tên môn học/ học phần', 'Lớp', 'Nhóm', 'Thứ', 
-                          'Tiết BĐ', 'Số tiết', 'Giảng viên giảng dạy', 'Phòng', 'Nhà', 
-                          'Thời gian học', 'Địa điểm đầy đủ']
-            df_summary = df_result[summary_cols]
-            df_summary.to_excel(writer, sheet_name='Tóm tắt', index=False)
-            
-            # Sheet thống kê
-            stats_data = []
-            
-            # Thống kê theo ngành
-            if 'Ngành' in df_result.columns:
-                major_stats = df_result['Ngành'].value_counts()
-                for major, count in major_stats.items():
-                    stats_data.append({'Loại': 'Ngành', 'Tên': major, 'Số lượng': count})
-            
-            # Thống kê theo khóa
-            if 'Khóa' in df_result.columns:
-                year_stats = df_result['Khóa'].value_counts()
-                for year, count in year_stats.items():
-                    stats_data.append({'Loại': 'Khóa', 'Tên': year, 'Số lượng': count})
-            
-            if stats_data:
-                df_stats = pd.DataFrame(stats_data)
-                df_stats.to_excel(writer, sheet_name='Thống kê', index=False)
+        sheets = [
+            ('Thời khóa biểu đầy đủ', df_result),  # Sheet chính với tất cả dữ liệu
+            ('Tóm tắt', df_summary),
+        ]
+        if not df_stats.empty:
+            sheets.append(('Thống kê', df_stats))
+        
+        if streaming:
+            write_xlsx_stream(output_file, [(name, list(df.columns), frame_rows(df)) for name, df in sheets])
+        else:
+            with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+                for name, df in sheets:
+                    df.to_excel(writer, sheet_name=name, index=False)
         
         print(f"\n💾 Đã lưu dữ liệu với {len(df_result.columns)} cột vào file: {output_file}")
         print(f"📄 File chứa {len(df_result)} dòng dữ liệu trên 3 sheet:")
         print("   - 'Thời khóa biểu đầy đủ': Tất cả các cột")
         print("   - 'Tóm tắt': Các cột chính")
-        print("   - 'Thống kê': Thống kê theo ngành và khóa")
+        print("   - 'Thống kê': Thống kê theo ngành, khóa, giảng viên, nhà và phòng")
         
     except Exception as e:
         print(f"Lỗi khi lưu file: {e}")
@@ -286,13 +240,14 @@ def main():
                 print("\n🔄 Đang xử lý sheet TKB CHINH...")
                 
                 # Đọc sheet TKB CHINH với header đúng
-                df_main = pd.read_excel(excel_file, sheet_name='TKB CHINH', header=8)
+                schema = detect_schema(excel_file, 'TKB CHINH')
+                df_main = schema.apply(pd.read_excel(excel_file, sheet_name='TKB CHINH', header=schema.header))
                 
                 print(f"Số dòng dữ liệu: {len(df_main)}")
                 print(f"Các cột: {list(df_main.columns)}")
                 
                 # Xử lý và chuyển đổi dữ liệu
-                schedule_list = process_schedule_data(df_main)
+                schedule_list = process_schedule_data(df_main, schema.calendar or DEFAULT_CALENDAR)
                 
                 # Hiển thị kết quả
                 df_result = display_schedule_table(schedule_list)
@@ -1,98 +1,52 @@
+import contextlib
+import io
+import numpy as np
 import pandas as pd
 import os
-from datetime import datetime, timedelta
+import sys
+
+from semester_calendar import DEFAULT_CALENDAR, is_active_week_cell
+from tkb_builder import ColumnBuilder
+from tkb_cache import load_cached_workbook
+from tkb_cli import DEFAULT_EXCEL_FILE
+from tkb_format import (cache_stats, day_name as format_day_name, location_label, period_range, print_cache_stats,
+                        record_table_lookup, week_list_label)
+from tkb_output import format_for_path, write_output
+from tkb_profile import PROFILER, stage
+from tkb_stats import compute_statistics, print_statistics
+from tkb_weeks import DEFAULT_MARKER_TABLE
+from tkb_writer import frame_rows, write_xlsx_stream
+
+# Các cột kết quả (trước các cột 'Gốc_<cột tuần>')
+SCHEDULE_COLUMNS = ['STT', 'Lớp', 'Mã lớp', 'Bắt đầu', 'Kết thúc', 'Thứ', 'Giảng viên', 'Môn học',
+                    'Mã môn học', 'Khóa', 'Ngành', 'Thời gian', 'Địa điểm', 'Số tín chỉ', 'Ghi chú', 'Tuần học']
+
+# Các cột lặp lại nhiều được lưu dạng categorical
+CATEGORICAL_COLUMNS = ['Thứ', 'Giảng viên', 'Khóa', 'Ngành', 'Địa điểm']
 
 def convert_day_to_vietnamese(day_num):
     """Chuyển đổi số thứ sang tên thứ tiếng Việt"""
-    if pd.isna(day_num):
-        return ""
-    days = {
-        2: "2",
-        3: "3", 
-        4: "4",
-        5: "5",
-        6: "6",
-        7: "7",
-        8: "CN"
-    }
-    return days.get(int(day_num), f"Thứ {int(day_num)}")
-
-def calculate_date_range_improved(week_schedule):
+    return format_day_name(day_num)
+
+def calculate_date_range_improved(week_schedule, calendar=DEFAULT_CALENDAR, marker_table=DEFAULT_MARKER_TABLE):
     """Tính toán ngày bắt đầu và kết thúc dựa trên lịch tuần - CHÍNH XÁC THEO THỰC TẾ"""
-    
-    # Ánh xạ CHI TIẾT từng cột đến ngày cụ thể dựa trên cấu trúc Excel thực tế
-    detailed_week_mapping = {
-        # Tháng 8/2025
-        '08/25': (2025, 8, 11, 17, 1),      # Tuần 1: 11-17/8
-        'Unnamed: 18': (2025, 8, 18, 24, 2), # Tuần 2: 18-24/8  
-        'Unnamed: 19': (2025, 8, 25, 31, 3), # Tuần 3: 25-31/8
-        
-        # Tháng 9/2025
-        '09/25': (2025, 9, 1, 7, 4),        # Tuần 4: 1-7/9
-        'Unnamed: 21': (2025, 9, 8, 14, 5), # Tuần 5: 8-14/9
-        'Unnamed: 22': (2025, 9, 15, 21, 6), # Tuần 6: 15-21/9
-        'Unnamed: 23': (2025, 9, 22, 28, 7), # Tuần 7: 22-28/9
-        'Unnamed: 24': (2025, 9, 29, 30, 8), # Tuần 8: 29-30/9 (chuyển sang tháng 10)
-        
-        # Tháng 10/2025
-        '10/25': (2025, 10, 6, 12, 9),      # Tuần 9: 6-12/10
-        'Unnamed: 26': (2025, 10, 13, 19, 10), # Tuần 10: 13-19/10
-        'Unnamed: 27': (2025, 10, 20, 26, 11), # Tuần 11: 20-26/10
-        'Unnamed: 28': (2025, 10, 27, 31, 12), # Tuần 12: 27-31/10 (chuyển sang tháng 11)
-        
-        # Tháng 11/2025
-        '11/25': (2025, 11, 3, 9, 13),       # Tuần 13: 3-9/11
-        'Unnamed: 30': (2025, 11, 10, 16, 14), # Tuần 14: 10-16/11
-        'Unnamed: 31': (2025, 11, 17, 23, 15), # Tuần 15: 17-23/11
-        'Unnamed: 32': (2025, 11, 24, 30, 16), # Tuần 16: 24-30/11
-        
-        # Tháng 12/2025
-        '12/25': (2025, 12, 1, 7, 17),       # Tuần 17: 1-7/12
-    }
-    
-    # Tìm tất cả các khoảng thời gian có 'x' và số tuần tương ứng
-    active_periods = []
-    active_weeks = []  # Danh sách các tuần học
-    
-    for col_name, (year, month, start_day, end_day, week_num) in detailed_week_mapping.items():
-        if col_name in week_schedule:
-            value = week_schedule[col_name]
-            if pd.notna(value) and 'x' in str(value).lower():
-                try:
-                    start_date = datetime(year, month, start_day)
-                    end_date = datetime(year, month, end_day)
-                    active_periods.append((start_date, end_date))
-                    active_weeks.append(week_num)  # Thêm số tuần
-                except ValueError:
-                    continue
-    
-    if not active_periods:
-        return "2025-08-11", "2025-09-14", []  # Trả về ngày mặc định và danh sách tuần trống
-    
-    # Sắp xếp và lấy ngày đầu tiên và cuối cùng
-    active_periods.sort(key=lambda x: x[0])
-    overall_start = active_periods[0][0]
-    overall_end = active_periods[-1][1]
-    
-    # Sắp xếp danh sách tuần
-    active_weeks.sort()
-    
-    return overall_start.strftime("%Y-%m-%d"), overall_end.strftime("%Y-%m-%d"), active_weeks
+    return calendar.date_range(week_schedule, marker_table)
+
+def process_schedule_data_improved(df, calendar=DEFAULT_CALENDAR, marker_table=DEFAULT_MARKER_TABLE):
+    """Xử lý dữ liệu thời khóa biểu - LẤY TẤT CẢ DỮ LIỆU VÀ THÊM TUẦN HỌC
 
-def process_schedule_data_improved(df):
-    """Xử lý dữ liệu thời khóa biểu - LẤY TẤT CẢ DỮ LIỆU VÀ THÊM TUẦN HỌC"""
+    Vòng lặp từng dòng (đường tham chiếu). Kết quả được dựng theo cột bằng ColumnBuilder,
+    trả về DataFrame (các cột trong CATEGORICAL_COLUMNS có kiểu category).
+    marker_table: bảng ký hiệu ô tuần (tkb_weeks.MarkerTable), vd. thêm mã học bù.
+    """
     
     # Không lọc gì cả - lấy TẤT CẢ dữ liệu
     print(f"📊 Xử lý TẤT CẢ {len(df)} dòng dữ liệu gốc")
     
-    # Danh sách tất cả các cột tuần (bao gồm cả Unnamed)
-    all_week_cols = ['08/25', 'Unnamed: 18', 'Unnamed: 19',
-                     '09/25', 'Unnamed: 21', 'Unnamed: 22', 'Unnamed: 23', 'Unnamed: 24',
-                     '10/25', 'Unnamed: 26', 'Unnamed: 27', 'Unnamed: 28',
-                     '11/25', 'Unnamed: 30', 'Unnamed: 31', 'Unnamed: 32',
-                     '12/25']
+    all_week_cols = calendar.columns
     
-    schedule_list = []
+    builder = ColumnBuilder(SCHEDULE_COLUMNS, categorical=CATEGORICAL_COLUMNS)
+    error_positions = []
     
     for index, row in df.iterrows():
         try:
@@ -122,101 +76,259 @@ def process_schedule_data_improved(df):
                 if week_col in df.columns:
                     week_data[week_col] = row.get(week_col)
             
-            start_date, end_date, week_numbers = calculate_date_range_improved(week_data)
-            
-            # Tạo thời gian học
-            time_slot = ""
-            if pd.notna(start_period) and pd.notna(num_periods):
-                try:
-                    end_period = int(start_period) + int(num_periods) - 1
-                    time_slot = f"{int(start_period)}-{end_period}"
-                except:
-                    time_slot = f"{start_period}"
+            start_date, end_date, week_numbers = calculate_date_range_improved(week_data, calendar, marker_table)
             
-            # Tạo địa điểm
-            location = ""
-            if room and building:
-                location = f"Phòng {room}, Nhà {building}"
-            elif room:
-                location = f"Phòng {room}"
-            elif building:
-                location = f"Nhà {building}"
+            # Thời gian học, địa điểm, chuỗi tuần học (tra cache theo tổ hợp giá trị)
+            time_slot = period_range(start_period, num_periods)
+            location = location_label(room, building)
+            week_list = week_list_label(tuple(week_numbers))
             
-            # Tạo mô tả lịch học từ tất cả cột tuần
-            schedule_pattern = ""
-            active_weeks = []
-            for col in all_week_cols:
-                if col in week_data and pd.notna(week_data[col]) and 'x' in str(week_data[col]).lower():
-                    active_weeks.append(col)
-            if active_weeks:
-                schedule_pattern = ", ".join(active_weeks)
-            
-            # Tạo chuỗi tuần học
-            week_list = ""
-            if week_numbers:
-                week_list = ", ".join([f"{w}" for w in week_numbers])
-                
-            schedule_item = {
-                'STT': row_number,
-                'Lớp': class_name,
-                'Mã lớp': class_code,
-                'Bắt đầu': start_date,
-                'Kết thúc': end_date,
-                'Thứ': day_name,
-                'Giảng viên': teacher_name,
-                'Môn học': subject_name,
-                'Mã môn học': subject_code,
-                'Khóa': course_year,
-                'Ngành': major,
-                'Thời gian': time_slot,
-                'Địa điểm': location,
-                'Số tín chỉ': credits,
-                'Ghi chú': notes,
-                'Tuần học': week_list,
-            }
-            
-            # Thêm tất cả các cột tuần gốc để tham khảo
-            for col in all_week_cols:
-                if col in df.columns:
-                    schedule_item[f'Gốc_{col}'] = row.get(col)
-            
-            schedule_list.append(schedule_item)
+            # Thứ tự giá trị theo SCHEDULE_COLUMNS
+            builder.append(row_number, class_name, class_code, start_date, end_date, day_name,
+                           teacher_name, subject_name, subject_code, course_year, major,
+                           time_slot, location, credits, notes, week_list)
             
         except Exception as e:
             print(f"⚠️ Lỗi xử lý dòng {index}: {e}")
             # Vẫn thêm dòng lỗi để không mất dữ liệu
-            schedule_item = {
-                'STT': index,
-                'Lớp': 'Lỗi',
-                'Mã lớp': 'Lỗi',
-                'Bắt đầu': 'Lỗi',
-                'Kết thúc': 'Lỗi',
-                'Thứ': 'Lỗi',
-                'Giảng viên': 'Lỗi',
-                'Môn học': f'Lỗi dòng {index}: {str(e)}',
-                'Mã môn học': 'Lỗi',
-                'Khóa': 'Lỗi',
-                'Ngành': 'Lỗi',
-                'Thời gian': 'Lỗi',
-                'Địa điểm': 'Lỗi',
-                'Số tín chỉ': 'Lỗi',
-                'Ghi chú': 'Lỗi',
-                'Tuần học': 'Lỗi',
-            }
-            schedule_list.append(schedule_item)
+            error_positions.append(len(builder))
+            builder.append(index, *(['Lỗi'] * 6), f'Lỗi dòng {index}: {str(e)}', *(['Lỗi'] * 8))
             continue
     
-    return schedule_list
+    df_result = builder.to_frame()
+    
+    # Thêm tất cả các cột tuần gốc để tham khảo (lấy nguyên cột, không copy từng ô)
+    for col in all_week_cols:
+        if col in df.columns:
+            original = df[col].reset_index(drop=True)
+            if error_positions:
+                original = original.astype(object)
+                original.iloc[error_positions] = np.nan
+            df_result[f'Gốc_{col}'] = original
+    
+    return df_result
+
+def _apply_distinct(func, values, missing, failures):
+    """[func(v) for v in values]; giá trị làm func lỗi -> missing, lỗi ghi vào failures[vị trí]"""
+    labels = []
+    for i, value in enumerate(values):
+        try:
+            labels.append(func(value))
+        except Exception as e:
+            labels.append(missing)
+            failures[i] = e
+    return labels
+
+def _record_failures(errors, codes, failures):
+    """Ghi lỗi của từng giá trị khác nhau vào các dòng mang mã đó (giữ lỗi đầu tiên của mỗi dòng)"""
+    for code, error in failures.items():
+        rows = (codes == code) & np.equal(errors, None)
+        errors[rows] = error
+
+def _map_distinct(values, func, missing="", errors=None):
+    """Gọi func một lần cho mỗi giá trị khác nhau (ô trống -> missing), kết quả dạng category
+
+    Cột nguồn đã là category thì dùng luôn mã số và bảng categories, không duyệt từng dòng.
+    errors: mảng object theo dòng; func lỗi với một giá trị thì các dòng mang giá trị đó nhận lỗi.
+    """
+    failures = {}
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        labels = _apply_distinct(func, values.cat.categories, missing, failures)
+    else:
+        codes, uniques = pd.factorize(values)
+        labels = _apply_distinct(func, uniques, missing, failures)
+    if failures and errors is None:
+        raise next(iter(failures.values()))
+    if failures:
+        _record_failures(errors, codes, failures)
+    labels.append(missing)
+    return _labels_to_categorical(np.where(codes < 0, len(labels) - 1, codes), labels, values.index)
+
+def _labels_to_categorical(codes, labels, index):
+    """Series category với giá trị labels[codes] (các label trùng nhau được gộp)"""
+    label_codes, categories = pd.factorize(np.array(labels, dtype=object))
+    return pd.Series(pd.Categorical.from_codes(label_codes[codes], categories=pd.Index(categories, dtype=object)),
+                     index=index)
+
+def _strip_text(value):
+    return str(value).strip()
+
+def _text_column(df, col, categorical=False):
+    """Cột văn bản đã strip, ô trống/thiếu cột -> "" (giống str(...).strip() trong vòng lặp)
+
+    Kết quả là category nếu categorical=True hoặc cột nguồn đã là category.
+    """
+    if col not in df.columns:
+        if categorical:
+            return _map_distinct(pd.Series(np.nan, index=df.index), _strip_text)
+        return pd.Series("", index=df.index, dtype=object)
+    values = df[col]
+    if categorical or isinstance(values.dtype, pd.CategoricalDtype):
+        return _map_distinct(values, _strip_text)
+    text = values.astype(str).str.strip().astype(object)
+    return text.where(values.notna(), "")
+
+def process_schedule_data_vectorized(df, calendar=DEFAULT_CALENDAR, marker_table=DEFAULT_MARKER_TABLE):
+    """Xử lý dữ liệu thời khóa biểu theo cột - cùng kết quả với process_schedule_data_improved"""
+
+    print(f"📊 Xử lý TẤT CẢ {len(df)} dòng dữ liệu gốc (theo cột)")
+    return _convert_columns(df, calendar, marker_table=marker_table)
+
+def _convert_columns(df, calendar, error_rows=None, marker_table=DEFAULT_MARKER_TABLE):
+    """Phần chuyển đổi theo cột của process_schedule_data_vectorized (chỉ in cảnh báo dòng lỗi)
+
+    error_rows: list nhận thêm vị trí (trong df) các dòng lỗi; marker_table: bảng ký hiệu ô tuần.
+    """
+    week_cols = [col for col in calendar.columns if col in df.columns]
+    # Lỗi đầu tiên của từng dòng (None = không lỗi), theo thứ tự các bước của vòng lặp tham chiếu
+    errors = np.full(len(df), None, dtype=object)
+
+    # Thứ: chỉ chuyển đổi các giá trị khác nhau
+    day_values = df['Thứ'] if 'Thứ' in df.columns else pd.Series(np.nan, index=df.index)
+    day_name = _map_distinct(day_values, convert_day_to_vietnamese, errors=errors)
+    record_table_lookup('day_name', len(df), len(day_name.cat.categories))
+
+    # Thời gian học: định dạng một lần cho mỗi cặp (tiết BĐ, số tiết) khác nhau rồi tra bảng
+    raw_start = df['Tiết BĐ'] if 'Tiết BĐ' in df.columns else pd.Series(np.nan, index=df.index)
+    raw_count = df['Số tiết'] if 'Số tiết' in df.columns else pd.Series(np.nan, index=df.index)
+    start_codes, start_values = pd.factorize(raw_start)
+    count_codes, count_values = pd.factorize(raw_count)
+    slot_codes = (start_codes.astype(np.int64) + 1) * (len(count_values) + 1) + count_codes + 1
+    slots, slot_index = np.unique(slot_codes, return_inverse=True)
+    slot_labels = np.empty(len(slots), dtype=object)
+    for i, slot in enumerate(slots):
+        start, count = divmod(int(slot), len(count_values) + 1)
+        slot_labels[i] = period_range(start_values[start - 1] if start else np.nan,
+                                      count_values[count - 1] if count else np.nan)
+    time_slot = pd.Series(slot_labels[slot_index.reshape(-1)], index=df.index)
+    record_table_lookup('period_range', len(df), len(slots))
+
+    # Địa điểm: ghép theo cặp mã (phòng, nhà) khác nhau thay vì nối chuỗi từng dòng
+    room = _text_column(df, 'Phòng', categorical=True)
+    building = _text_column(df, 'Nhà', categorical=True)
+    n_buildings = len(building.cat.categories)
+    pair_codes = room.cat.codes.to_numpy(dtype=np.int64) * n_buildings + building.cat.codes.to_numpy(dtype=np.int64)
+    pairs, pair_index = np.unique(pair_codes, return_inverse=True)
+    pair_labels = [location_label(room.cat.categories[pair // n_buildings], building.cat.categories[pair % n_buildings])
+                   for pair in pairs]
+    location = _labels_to_categorical(pair_index, pair_labels, df.index)
+    record_table_lookup('location', len(df), len(pairs))
 
-def display_schedule_table(schedule_list):
-    """Hiển thị bảng thời khóa biểu theo định dạng yêu cầu"""
-    if not schedule_list:
+    # Tuần học: mỗi dòng là một bitmask, tra bảng theo từng mẫu tuần khác nhau
+    masks = calendar.encode_frame(df, marker_table)
+    patterns, pattern_index = np.unique(masks, return_inverse=True)
+    pattern_index = pattern_index.reshape(-1)
+    failures = {}
+    decoded = _apply_distinct(lambda mask: calendar.decode(int(mask)), patterns, ("", "", []), failures)
+    _record_failures(errors, pattern_index, failures)
+    start_date = pd.Series(np.array([d[0] for d in decoded], dtype=object)[pattern_index], index=df.index)
+    end_date = pd.Series(np.array([d[1] for d in decoded], dtype=object)[pattern_index], index=df.index)
+    week_strings = np.array([week_list_label(tuple(d[2])) for d in decoded], dtype=object)
+    record_table_lookup('week_list', len(df), len(patterns))
+    week_list = pd.Series(week_strings[pattern_index], index=df.index)
+
+    credits = df['Số TC'].astype(object).where(df['Số TC'].notna(), "") if 'Số TC' in df.columns else pd.Series("", index=df.index, dtype=object)
+
+    result = pd.DataFrame({
+        'STT': _text_column(df, 'TT'),
+        'Lớp': _text_column(df, 'Lớp'),
+        'Mã lớp': _text_column(df, 'Nhóm'),
+        'Bắt đầu': start_date,
+        'Kết thúc': end_date,
+        'Thứ': day_name,
+        'Giảng viên': _text_column(df, 'Giảng viên giảng dạy', categorical=True),
+        'Môn học': _text_column(df, 'Tên môn học/ học phần'),
+        'Mã môn học': _text_column(df, 'Mã môn học'),
+        'Khóa': _text_column(df, 'Khóa', categorical=True),
+        'Ngành': _text_column(df, 'Ngành', categorical=True),
+        'Thời gian': time_slot,
+        'Địa điểm': location,
+        'Số tín chỉ': credits.astype(object),
+        'Ghi chú': _text_column(df, 'Ghi chú'),
+        'Tuần học': week_list,
+    })
+
+    # Thêm tất cả các cột tuần gốc để tham khảo
+    for col in week_cols:
+        result[f'Gốc_{col}'] = df[col]
+
+    positions = np.flatnonzero(np.not_equal(errors, None))
+    if error_rows is not None:
+        error_rows.extend(positions.tolist())
+    return _mark_error_rows(result.reset_index(drop=True), df.index, errors, positions)
+
+def _mark_error_rows(result, index, errors, positions):
+    """Dòng lỗi giống vòng lặp tham chiếu: STT = nhãn dòng, 'Môn học' = thông báo lỗi, các cột khác 'Lỗi',
+    cột tuần gốc để trống"""
+    if not len(positions):
+        return result
+    labels = index[positions]
+    for label, position in zip(labels, positions):
+        print(f"⚠️ Lỗi xử lý dòng {label}: {errors[position]}")
+    for col in result.columns:
+        values = result[col]
+        if col == 'STT':
+            fill = list(labels)
+        elif col == 'Môn học':
+            fill = [f'Lỗi dòng {label}: {errors[position]}' for label, position in zip(labels, positions)]
+        elif col.startswith('Gốc_'):
+            fill = np.nan
+        else:
+            fill = 'Lỗi'
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            if 'Lỗi' not in values.cat.categories:
+                values = values.cat.set_categories(pd.Index([*values.cat.categories, 'Lỗi'], dtype=object))
+        else:
+            values = values.astype(object)
+        values.iloc[positions] = fill
+        result[col] = values
+    return result
+
+def schedule_columns(df, calendar=DEFAULT_CALENDAR):
+    """Danh sách cột kết quả cho dữ liệu nguồn df"""
+    return list(_convert_columns(df.iloc[:0], calendar).columns)
+
+def iter_schedule_rows(df, calendar=DEFAULT_CALENDAR, chunk_size=5000, marker_table=DEFAULT_MARKER_TABLE):
+    """Sinh từng dòng kết quả (tuple) theo khối chunk_size dòng, không giữ toàn bộ kết quả trong bộ nhớ"""
+    for start in range(0, len(df), chunk_size):
+        yield from frame_rows(_convert_columns(df.iloc[start:start + chunk_size], calendar,
+                                               marker_table=marker_table))
+
+def _as_plain_values(df_result):
+    """Bỏ kiểu category để so sánh giá trị"""
+    categorical = [col for col in df_result.columns if isinstance(df_result[col].dtype, pd.CategoricalDtype)]
+    return df_result.astype({col: object for col in categorical})
+
+def verify_vectorized_output(df, calendar=DEFAULT_CALENDAR, marker_table=DEFAULT_MARKER_TABLE):
+    """So sánh kết quả xử lý theo cột với vòng lặp từng dòng (đường tham chiếu)"""
+    expected = process_schedule_data_improved(df, calendar, marker_table)
+    try:
+        actual = process_schedule_data_vectorized(df, calendar, marker_table)
+        pd.testing.assert_frame_equal(_as_plain_values(actual), _as_plain_values(expected), check_dtype=False)
+    except Exception as e:
+        print(f"❌ Kết quả xử lý theo cột KHÁC vòng lặp từng dòng:\n{type(e).__name__}: {e}")
+        return False
+    print(f"✅ Kết quả xử lý theo cột giống vòng lặp từng dòng ({len(actual)} dòng)")
+    return True
+
+def display_schedule_table(schedule_list, stats=None):
+    """Hiển thị bảng thời khóa biểu theo định dạng yêu cầu (nhận list dict hoặc DataFrame)
+
+    stats: ScheduleStatistics đã tính (tkb_stats); None thì tính từ bảng kết quả.
+    """
+    if isinstance(schedule_list, pd.DataFrame):
+        df_result = schedule_list
+    elif schedule_list:
+        # Tạo DataFrame từ danh sách
+        df_result = pd.DataFrame(schedule_list)
+    else:
+        df_result = None
+
+    if df_result is None or df_result.empty:
         print("Không có dữ liệu để hiển thị")
         return None
     
-    # Tạo DataFrame từ danh sách
-    df_result = pd.DataFrame(schedule_list)
-    
     # Hiển thị bảng đẹp
     print("\n" + "="*150)
     print("📚 THỜI KHÓA BIỂU HỌC KỲ I NĂM HỌC 2025-2026 (ĐÃ SỬA)")
@@ -226,57 +338,81 @@ def display_schedule_table(schedule_list):
     print("📄 20 DÒNG ĐẦU:")
     print(df_result.head(20).to_string(index=False))
     
-    print(f"\n📊 Tổng số lớp học phần: {len(schedule_list)}")
-    
-    # Thống kê theo ngành
-    if 'Ngành' in df_result.columns and not df_result['Ngành'].empty:
-        major_stats = df_result['Ngành'].value_counts().head(10)
-        print("\n📈 Top 10 ngành có nhiều lớp nhất:")
-        for major, count in major_stats.items():
-            print(f"  - {major}: {count} lớp")
+    print(f"\n📊 Tổng số lớp học phần: {len(df_result)}")
     
-    # Thống kê theo khóa
-    if 'Khóa' in df_result.columns and not df_result['Khóa'].empty:
-        year_stats = df_result['Khóa'].value_counts()
-        print("\n📅 Thống kê theo khóa:")
-        for year, count in year_stats.items():
-            print(f"  - Khóa {year}: {count} lớp")
+    # Thống kê theo ngành, khóa, giảng viên, phòng (một lượt, xem tkb_stats)
+    print_statistics(stats if stats is not None else compute_statistics(df_result))
     
     return df_result
 
-def save_to_excel(df_result, output_file="tkb_full_data.xlsx"):
-    """Lưu TẤT CẢ dữ liệu vào file Excel mới"""
+def save_to_excel(df_result, output_file="tkb_full_data.xlsx", streaming=True):
+    """Lưu TẤT CẢ dữ liệu vào file Excel mới (streaming=True: ghi theo luồng, bộ nhớ không đổi)"""
+    if streaming:
+        save_to_excel_streaming(frame_rows(df_result), list(df_result.columns), output_file)
+        return
     try:
         df_result.to_excel(output_file, index=False, engine='openpyxl')
         print(f"\n💾 Đã lưu TẤT CẢ {len(df_result)} dòng dữ liệu vào file: {output_file}")
     except Exception as e:
         print(f"Lỗi khi lưu file: {e}")
 
-def get_period_description_correct(week_data):
-    """Tạo mô tả thời gian học dựa trên các tuần có 'x' - ĐÚNG THEO NGÀY THỰC TẾ"""
-    period_descriptions = []
-    
-    week_periods = {
-        '08/25': "tháng 8/2025 (ngày 11-31)",
-        '09/25': "tháng 9/2025 (ngày 1-28)", 
-        '10/25': "tháng 9-10/2025 (ngày 29/9-26/10)",
-        '11/25': "tháng 10-11/2025 (ngày 27/10-23/11)",
-        '12/25': "tháng 11-12/2025 (ngày 24/11-7/12)"
-    }
-    
-    for week_col, description in week_periods.items():
-        if str(week_data.get(week_col, '')).lower() == 'x':
-            period_descriptions.append(description)
-    
-    if period_descriptions:
-        return "Từ " + ", ".join(period_descriptions)
-    return "Không xác định"
-
-def main():
-    """Hàm chính để xử lý file Excel - PHIÊN BẢN ĐÃ SỬA"""
-    # Đường dẫn tới file Excel
-    excel_file = "0528_TKB_HK1_NAM_HOC_2025_20261-1.xlsx"
-    
+def save_to_excel_streaming(rows, columns, output_file="tkb_full_data.xlsx", sheet_name='Sheet1'):
+    """Lưu dữ liệu vào Excel theo luồng - rows là iterable các tuple, vd. iter_schedule_rows(df)"""
+    try:
+        count, = write_xlsx_stream(output_file, [(sheet_name, columns, rows)])
+        print(f"\n💾 Đã lưu TẤT CẢ {count} dòng dữ liệu vào file: {output_file}")
+    except Exception as e:
+        print(f"Lỗi khi lưu file: {e}")
+
+def get_period_description_correct(week_data, calendar=DEFAULT_CALENDAR):
+    """Tạo mô tả thời gian học dựa trên các tuần có 'x' - ĐÚNG THEO NGÀY THỰC TẾ (lịch học kỳ, mọi cột tuần)"""
+    return calendar.describe(calendar.encode(week_data))
+
+def save_output(df_result, output_file, output_format='xlsx'):
+    """Lưu kết quả bằng writer của định dạng: xlsx, csv (theo khối), parquet, feather (xem tkb_output)"""
+    count = write_output(df_result, output_file, output_format)
+    print(f"\n💾 Đã lưu TẤT CẢ {count} dòng dữ liệu vào file: {output_file}")
+
+def save_streaming_output(df, calendar, output_file, sheet_name='Sheet1', marker_table=DEFAULT_MARKER_TABLE):
+    """Chuyển đổi và ghi xlsx theo khối (iter_schedule_rows): cùng nội dung với save_output, bộ nhớ không đổi"""
+    count, = write_xlsx_stream(output_file, [(sheet_name, schedule_columns(df, calendar),
+                                              iter_schedule_rows(df, calendar, marker_table=marker_table))])
+    print(f"\n💾 Đã lưu TẤT CẢ {count} dòng dữ liệu vào file: {output_file}")
+
+def main(incremental=False, profile=None, excel_file=DEFAULT_EXCEL_FILE, sheet_name='TKB CHINH', header=None,
+         output_file="tkb_full_data.xlsx", output_format='xlsx', quiet=False, jobs=1, stats_file=None,
+         marker_table=None):
+    """Hàm chính để xử lý file Excel - PHIÊN BẢN ĐÃ SỬA
+
+    incremental=True: chỉ chuyển đổi lại các dòng thay đổi so với lần chạy trước
+    và ghi thêm danh sách thay đổi (cạnh output_file: <tên>.state.parquet, <tên>.changes.csv).
+    profile: đường dẫn file JSON để đo thời gian/bộ nhớ từng bước (hoặc đặt biến môi trường TKB_PROFILE).
+    quiet=True: không in bảng, thống kê, mẫu dữ liệu (không gọi to_string), chỉ in lỗi.
+    jobs: số process chuyển đổi song song theo khối dòng (0 = mọi nhân CPU, 1 = tuần tự).
+    stats_file: đường dẫn file JSON để ghi thống kê (cùng số liệu in ra màn hình, xem tkb_stats).
+    marker_table: bảng ký hiệu ô tuần (tkb_weeks.MarkerTable, vd. thêm MAKEUP_MARKERS); None = bảng mặc định.
+    Số ô theo từng ký hiệu (vd. 'x*' = "Học, xem ghi chú") được đưa vào thống kê.
+    Trả về True nếu đã chuyển đổi và lưu thành công.
+    """
+    if profile:
+        PROFILER.enable(profile)
+    else:
+        PROFILER.enable_from_env()
+    marker_table = marker_table or DEFAULT_MARKER_TABLE
+    try:
+        if quiet:
+            with contextlib.redirect_stdout(io.StringIO()):
+                return _run_main(incremental, excel_file, sheet_name, header, output_file, output_format, quiet, jobs,
+                         stats_file, marker_table)
+        return _run_main(incremental, excel_file, sheet_name, header, output_file, output_format, quiet, jobs,
+                         stats_file, marker_table)
+    finally:
+        if PROFILER.enabled:
+            PROFILER.write()
+            PROFILER.disable()
+
+def _run_main(incremental, excel_file, sheet_name, header, output_file, output_format, quiet, jobs,
+              stats_file, marker_table=DEFAULT_MARKER_TABLE):
     # Kiểm tra xem file có tồn tại không
     if os.path.exists(excel_file):
         try:
@@ -284,29 +420,83 @@ def main():
             print(f"Đang đọc file: {excel_file}")
             print("=" * 50)
             
-            # Đọc tất cả các sheet trong file Excel
-            excel_data = pd.ExcelFile(excel_file)
-            print(f"Các sheet trong file: {excel_data.sheet_names}")
+            # Mở workbook MỘT lần (read-only): danh sách sheet, lịch tuần và dữ liệu sheet
+            # Lần chạy lại với cùng nội dung file dùng cache Parquet, không mở openpyxl
+            with stage('read') as record:
+                workbook = load_cached_workbook(excel_file, sheet_name=sheet_name, header=header, categorical=True)
+                if record is not None and workbook.frame is not None:
+                    record.rows = len(workbook.frame)
+            print(f"Các sheet trong file: {workbook.sheet_names}")
             print("=" * 50)
             
-            # Xử lý sheet TKB CHINH
-            if 'TKB CHINH' in excel_data.sheet_names:
-                print("\n🔄 Đang xử lý sheet TKB CHINH...")
+            # Xử lý sheet TKB
+            if workbook.frame is not None:
+                print(f"\n🔄 Đang xử lý sheet {sheet_name}...")
                 
-                # Đọc sheet TKB CHINH với header đúng
-                df_main = pd.read_excel(excel_file, sheet_name='TKB CHINH', header=8)
+                df_main = workbook.frame
                 
                 print(f"Số dòng dữ liệu ban đầu: {len(df_main)}")
                 
-                # Xử lý và chuyển đổi dữ liệu với logic mới
-                schedule_list = process_schedule_data_improved(df_main)
+                # Lịch tuần đọc từ các dòng tiêu đề phía trên header
+                calendar = workbook.calendar or DEFAULT_CALENDAR
+                print(f"📅 {calendar}")
+                
+                # Chế độ quiet chỉ cần file xlsx: chuyển đổi từng khối và ghi thẳng ra file theo luồng,
+                # không giữ toàn bộ bảng kết quả trong bộ nhớ
+                if (quiet and len(df_main) and jobs == 1 and not (incremental or stats_file)
+                        and (output_format or format_for_path(output_file)) == 'xlsx'):
+                    with stage('save', rows=len(df_main)):
+                        save_streaming_output(df_main, calendar, output_file, marker_table=marker_table)
+                    return True
                 
-                # Hiển thị kết quả
-                df_result = display_schedule_table(schedule_list)
+                # Xử lý và chuyển đổi dữ liệu theo cột (process_schedule_data_improved là đường tham chiếu)
+                with stage('process', rows=len(df_main)):
+                    if incremental:
+                        from tkb_incremental import convert_incremental, incremental_paths
+                        state_file, changes_file = incremental_paths(output_file)
+                        schedule_list, _ = convert_incremental(df_main, calendar, state_file, changes_file,
+                                                               source=os.path.basename(excel_file),
+                                                               marker_table=marker_table)
+                    elif jobs != 1:
+                        from tkb_parallel import convert_parallel
+                        schedule_list = convert_parallel(df_main, calendar, max_workers=jobs or None,
+                                                         marker_table=marker_table)
+                    else:
+                        schedule_list = process_schedule_data_vectorized(df_main, calendar, marker_table)
+                if PROFILER.enabled:
+                    PROFILER.metrics['format_cache'] = cache_stats()
                 
-                # Lưu vào file Excel mới
+                # Thống kê tính một lần, dùng chung cho màn hình và file JSON
+                stats = None
+                if stats_file or not quiet:
+                    with stage('stats', rows=len(schedule_list)):
+                        week_markers = calendar.week_matrix(df_main, marker_table).marker_counts()
+                        stats = compute_statistics(schedule_list, calendar, week_markers=week_markers)
+                    if stats_file:
+                        stats.write_json(stats_file)
+                        print(f"📈 Đã ghi thống kê vào file: {stats_file}")
+                
+                # Hiển thị kết quả (chế độ quiet bỏ qua toàn bộ phần định dạng bảng và thống kê)
+                if quiet:
+                    df_result = schedule_list
+                else:
+                    with stage('display', rows=len(schedule_list)):
+                        df_result = display_schedule_table(schedule_list, stats)
+                    print_cache_stats()
+                
+                # Lưu vào file mới
                 if df_result is not None and not df_result.empty:
-                    save_to_excel(df_result)
+                    with stage('save', rows=len(df_result)):
+                        save_output(df_result, output_file, output_format)
+                    
+                    if quiet:
+                        return True
+                    
+                    # Kiểm tra trùng phòng / trùng giảng viên
+                    from tkb_conflicts import find_conflicts, print_conflict_summary
+                    print("\n🔍 Kiểm tra xung đột lịch:")
+                    with stage('conflicts', rows=len(df_result)):
+                        print_conflict_summary(find_conflicts(df_result))
                     
                     # Xuất mẫu dữ liệu theo format yêu cầu BÌNH THƯỜNG
                     print("\n📄 BẢNG THỜI KHÓA BIỂU THEO ĐỊNH DẠNG YÊU CẦU:")
@@ -329,21 +519,25 @@ def main():
                         print(f"  {row['Lớp']} - {row['Môn học'][:30]}: {row['Bắt đầu']} đến {row['Kết thúc']}")
                         print(f"    ➤ {row['Tuần học']}")
                         print()
+                    return True
             
             else:
-                print("Không tìm thấy sheet 'TKB CHINH'")
+                print(f"Không tìm thấy sheet '{sheet_name}'", file=sys.stderr if quiet else sys.stdout)
                 
         except Exception as e:
-            print(f"Lỗi khi đọc file Excel: {e}")
+            print(f"Lỗi khi đọc file Excel: {e}", file=sys.stderr if quiet else sys.stdout)
             import traceback
             traceback.print_exc()
             
     else:
-        print(f"Không tìm thấy file: {excel_file}")
+        print(f"Không tìm thấy file: {excel_file}", file=sys.stderr if quiet else sys.stdout)
         print("Các file trong thư mục hiện tại:")
         for file in os.listdir("."):
             if file.endswith((".xlsx", ".xls")):
                 print(f"  - {file}")
+    return False
 
 if __name__ == "__main__":
-    main()
+    # Cùng tham số với tkb_cli.py; chạy tkb_cli.py để `--help` và lỗi tham số trả về ngay (không nạp pandas)
+    from tkb_cli import run
+    sys.exit(run(main=main))
@@ -0,0 +1,231 @@
+import re
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from tkb_weeks import DEFAULT_MARKER_TABLE, parse_week_matrix
+
+# Số tuần mặc định tính khoảng ngày khi dòng không có tuần học nào (giữ như phiên bản cũ)
+FALLBACK_WEEKS = 5
+
+MONTH_LABEL = re.compile(r"^\s*(\d{1,2})\s*/\s*(\d{2}|\d{4})\s*$")
+
+def is_active_week_cell(value, table=DEFAULT_MARKER_TABLE):
+    """Ô tuần có lịch học theo bảng ký hiệu ('x', 'x*', mã học bù; ô lạ chứa 'x' cũng tính)"""
+    return table.is_active(value)
+
+def _as_number(value):
+    """Giá trị số của ô (int/float/chuỗi số), None nếu không phải số"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return None if pd.isna(value) else float(value)
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return None
+
+def _parse_month_label(value):
+    """(năm, tháng) từ nhãn tháng trong header: '08/25', '8/2025' hoặc ô kiểu ngày"""
+    if isinstance(value, (datetime, date)):
+        return value.year, value.month
+    if value is None:
+        return None
+    match = MONTH_LABEL.match(str(value))
+    if not match:
+        return None
+    month, year = int(match.group(1)), int(match.group(2))
+    if year < 100:
+        year += 2000
+    return year, month
+
+def _column_name(value, position):
+    """Tên cột giống pandas tạo ra khi đọc với header=...: ô trống -> 'Unnamed: i'"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)) or str(value).strip() == "":
+        return f"Unnamed: {position}"
+    return value
+
+class SemesterCalendar:
+    """Lịch học kỳ: ánh xạ cột tuần -> (số tuần, ngày thứ Hai) lưu bằng mảng
+
+    Bit i của bitmask tuần tương ứng với cột self.columns[i].
+    """
+
+    def __init__(self, columns, week_numbers, mondays):
+        if not (len(columns) == len(week_numbers) == len(mondays)):
+            raise ValueError("columns, week_numbers và mondays phải cùng độ dài")
+        self.columns = list(columns)
+        self.week_numbers = np.asarray(week_numbers, dtype=np.int64)
+        self.mondays = np.asarray(mondays, dtype="datetime64[D]")
+        self.column_index = {col: i for i, col in enumerate(self.columns)}
+        self.bits = {col: 1 << i for i, col in enumerate(self.columns)}
+
+        # Bảng tra tính một lần cho cả học kỳ
+        self.start_labels = [str(d) for d in self.mondays]
+        self.end_labels = [str(d) for d in self.mondays + np.timedelta64(6, "D")]
+        self._week_list = [int(w) for w in self.week_numbers]
+        last = min(FALLBACK_WEEKS, len(self.columns)) - 1
+        self.fallback_range = (self.start_labels[0], self.end_labels[last]) if self.columns else ("", "")
+
+    def __len__(self):
+        return len(self.columns)
+
+    def __repr__(self):
+        if not self.columns:
+            return "SemesterCalendar(0 tuần)"
+        return f"SemesterCalendar({len(self)} tuần, {self.start_labels[0]} -> {self.end_labels[-1]})"
+
+    def __eq__(self, other):
+        return (isinstance(other, SemesterCalendar)
+                and self.columns == other.columns
+                and np.array_equal(self.week_numbers, other.week_numbers)
+                and np.array_equal(self.mondays, other.mondays))
+
+    @classmethod
+    def weekly(cls, columns, first_monday, first_week=1):
+        """Lịch các tuần liên tiếp bắt đầu từ first_monday"""
+        start = np.datetime64(first_monday, "D")
+        offsets = np.arange(len(columns)) * 7
+        return cls(columns, np.arange(first_week, first_week + len(columns)), start + offsets)
+
+    @classmethod
+    def from_rows(cls, rows, header):
+        """Đọc lịch từ các dòng thô của sheet (mỗi dòng là list giá trị ô)
+
+        rows[header] là dòng tiêu đề có nhãn tháng ('08/25', ...), dòng phía trên chứa số tuần,
+        dòng phía dưới ('Ngày BĐ') chứa ngày thứ Hai của từng tuần.
+        """
+        header_row = list(rows[header])
+        week_row = list(rows[header - 1]) if header >= 1 else []
+        day_row = list(rows[header + 1]) if header + 1 < len(rows) else []
+
+        def cell(row, i):
+            return row[i] if i < len(row) else None
+
+        columns, week_numbers, mondays = [], [], []
+        year_month = None
+        previous_day = None
+        for i in range(len(header_row)):
+            week = _as_number(cell(week_row, i))
+            label = _parse_month_label(cell(header_row, i))
+            if label is not None:
+                year_month = label
+                previous_day = None
+            if week is None or year_month is None:
+                continue
+
+            day = _as_number(cell(day_row, i))
+            year, month = year_month
+            if day is None:
+                # Không có ngày bắt đầu: nối tiếp tuần trước
+                if not mondays:
+                    raise ValueError(f"Không xác định được ngày bắt đầu của cột tuần {i}")
+                monday = mondays[-1] + np.timedelta64(7, "D")
+            else:
+                if previous_day is not None and day < previous_day:
+                    # Ngày nhỏ hơn tuần trước -> sang tháng mới
+                    month += 1
+                    if month > 12:
+                        year, month = year + 1, 1
+                    year_month = (year, month)
+                monday = np.datetime64(date(year, month, int(day)), "D")
+                previous_day = day
+
+            columns.append(_column_name(cell(header_row, i), i))
+            week_numbers.append(int(week))
+            mondays.append(monday)
+
+        if not columns:
+            raise ValueError("Không tìm thấy cột tuần nào trong các dòng tiêu đề")
+        return cls(columns, week_numbers, mondays)
+
+    @classmethod
+    def from_excel(cls, excel_file, sheet_name='TKB CHINH', header=8):
+        """Đọc lịch từ các dòng tiêu đề phía trên dữ liệu (chỉ đọc header + 2 dòng đầu)"""
+        raw = pd.read_excel(excel_file, sheet_name=sheet_name, header=None, nrows=header + 2)
+        rows = [[None if pd.isna(v) else v for v in row] for row in raw.itertuples(index=False)]
+        return cls.from_rows(rows, header)
+
+    def to_dict(self):
+        """Dạng JSON được (dùng để lưu kèm cache)"""
+        return {
+            'columns': list(self.columns),
+            'week_numbers': [int(w) for w in self.week_numbers],
+            'mondays': [str(d) for d in self.mondays],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Dựng lại lịch từ kết quả của to_dict()"""
+        return cls(data['columns'], data['week_numbers'], data['mondays'])
+
+    def week_of(self, column):
+        """Số tuần của một cột tuần"""
+        return int(self.week_numbers[self.column_index[column]])
+
+    def monday_of(self, column):
+        """Ngày thứ Hai (datetime.date) của một cột tuần"""
+        return self.mondays[self.column_index[column]].astype(date)
+
+    def encode(self, week_schedule, table=DEFAULT_MARKER_TABLE):
+        """Gói các ô tuần của một dòng (dict cột -> giá trị) thành một số nguyên bitmask"""
+        mask = 0
+        for col, bit in self.bits.items():
+            if col in week_schedule and is_active_week_cell(week_schedule[col], table):
+                mask |= bit
+        return mask
+
+    def week_matrix(self, df, table=DEFAULT_MARKER_TABLE):
+        """WeekMatrix (ký hiệu từng ô + tuần có học đã nén bit) của các cột tuần trong df"""
+        return parse_week_matrix(df, self.columns, table)
+
+    def encode_frame(self, df, table=DEFAULT_MARKER_TABLE):
+        """Bitmask tuần cho mọi dòng của DataFrame (mảng int64)"""
+        return self.week_matrix(df, table).masks()
+
+    def decode(self, mask):
+        """(ngày bắt đầu, ngày kết thúc, danh sách tuần) từ bitmask - dùng bit thấp nhất và cao nhất"""
+        if not mask:
+            return self.fallback_range[0], self.fallback_range[1], []
+        lowest = (mask & -mask).bit_length() - 1
+        highest = mask.bit_length() - 1
+        weeks = [self._week_list[i] for i in range(lowest, highest + 1) if mask >> i & 1]
+        return self.start_labels[lowest], self.end_labels[highest], weeks
+
+    def describe(self, mask):
+        """Mô tả các tuần có học: "Tuần 1-8 (11/8-5/10/2025), tuần 10 (13/10-19/10/2025)"
+
+        Các cột tuần liền nhau được gộp thành một khoảng; không có tuần nào -> "Không xác định".
+        """
+        active = [i for i in range(len(self.columns)) if mask >> i & 1]
+        runs = []
+        for i in active:
+            if runs and runs[-1][1] == i - 1:
+                runs[-1][1] = i
+            else:
+                runs.append([i, i])
+        parts = []
+        for first, last in runs:
+            weeks = f"{self._week_list[first]}" if first == last else f"{self._week_list[first]}-{self._week_list[last]}"
+            start = self.mondays[first].astype(date)
+            end = (self.mondays[last] + np.timedelta64(6, "D")).astype(date)
+            parts.append(f"tuần {weeks} ({start.day}/{start.month}-{end.day}/{end.month}/{end.year})")
+        if not parts:
+            return "Không xác định"
+        text = ", ".join(parts)
+        return text[0].upper() + text[1:]
+
+    def date_range(self, week_schedule, table=DEFAULT_MARKER_TABLE):
+        """Khoảng ngày và danh sách tuần của một dòng (dict cột -> giá trị)"""
+        return self.decode(self.encode(week_schedule, table))
+
+# Lịch HK1 2025-2026 (17 tuần từ 11/8/2025) - chỉ dùng khi không đọc được lịch từ file
+DEFAULT_CALENDAR = SemesterCalendar.weekly(
+    ['08/25', 'Unnamed: 18', 'Unnamed: 19',
+     '09/25', 'Unnamed: 21', 'Unnamed: 22', 'Unnamed: 23', 'Unnamed: 24',
+     '10/25', 'Unnamed: 26', 'Unnamed: 27', 'Unnamed: 28',
+     '11/25', 'Unnamed: 30', 'Unnamed: 31', 'Unnamed: 32',
+     '12/25'],
+    date(2025, 8, 11),
+)
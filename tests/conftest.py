@@ -0,0 +1,38 @@
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SAMPLE_WORKBOOK = os.path.join(ROOT, "0528_TKB_HK1_NAM_HOC_2025_20261-1.xlsx")
+
+@pytest.fixture(scope="session")
+def sample_workbook():
+    """TkbWorkbook của file TKB mẫu (đọc một lần cho cả phiên test)"""
+    from tkb_reader import load_tkb_workbook
+
+    if not os.path.isfile(SAMPLE_WORKBOOK):
+        pytest.skip("không có file TKB mẫu")
+    return load_tkb_workbook(SAMPLE_WORKBOOK)
+
+@pytest.fixture
+def quiet():
+    """Chạy một khối lệnh không in ra màn hình; trả về buffer đã ghi"""
+    @contextlib.contextmanager
+    def run():
+        buffer = io.StringIO()
+        with contextlib.redirect_stdout(buffer):
+            yield buffer
+    return run
+
+@pytest.fixture(scope="session")
+def sample_result(sample_workbook):
+    """Kết quả chuyển đổi (theo cột) của file TKB mẫu"""
+    from schedule_converter_fixed import process_schedule_data_vectorized
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return process_schedule_data_vectorized(sample_workbook.frame, sample_workbook.calendar)
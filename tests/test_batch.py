@@ -0,0 +1,53 @@
+import json
+import os
+import shutil
+
+import pytest
+
+import tkb_batch
+from conftest import SAMPLE_WORKBOOK
+from tkb_batch import convert_batch, find_workbooks
+
+@pytest.fixture
+def batch_dir(tmp_path):
+    """Hai bản của file TKB mẫu và một file .xlsx hỏng"""
+    source = tmp_path / "nguon"
+    source.mkdir()
+    if not os.path.isfile(SAMPLE_WORKBOOK):
+        pytest.skip("không có file TKB mẫu")
+    shutil.copy(SAMPLE_WORKBOOK, source / "a.xlsx")
+    shutil.copy(SAMPLE_WORKBOOK, source / "b.xlsx")
+    (source / "c.xlsx").write_bytes(b"khong phai xlsx")
+    (source / "~$a.xlsx").write_bytes(b"")
+    return source
+
+def test_find_workbooks_excludes_output(batch_dir):
+    output = batch_dir / "tong_hop.xlsx"
+    output.write_bytes(b"")
+    names = [os.path.basename(path) for path in find_workbooks([str(batch_dir)], exclude=(str(output),))]
+    assert names == ["a.xlsx", "b.xlsx", "c.xlsx"]
+
+def test_convert_batch(batch_dir, tmp_path, sample_result, quiet):
+    output, report = tmp_path / "tong_hop.xlsx", tmp_path / "report.json"
+    with quiet():
+        written, reports = convert_batch([str(batch_dir)], str(output), max_workers=1, report_file=str(report),
+                                         cache_dir=str(tmp_path / "cache"))
+    assert written == 2 * len(sample_result)
+    assert [r['rows'] for r in reports] == [len(sample_result)] * 2 + [0]
+    assert reports[2]['error'] and not reports[0]['error']
+    assert len(json.loads(report.read_text(encoding='utf-8'))['files']) == 3
+    assert any(path.name.endswith(".parquet") for path in (tmp_path / "cache").iterdir())
+
+def test_report_written_when_output_fails(batch_dir, tmp_path, monkeypatch, quiet):
+    def failing_writer(output_file, sheets):
+        (_, _, rows), = sheets
+        next(iter(rows))
+        raise OSError("đĩa đầy")
+
+    monkeypatch.setattr(tkb_batch, "write_xlsx_stream", failing_writer)
+    report = tmp_path / "report.json"
+    with quiet(), pytest.raises(OSError):
+        convert_batch([str(batch_dir)], str(tmp_path / "tong_hop.xlsx"), max_workers=1, report_file=str(report),
+                      cache_dir=str(tmp_path / "cache"))
+    assert [entry['file'].rsplit("/", 1)[-1] for entry in json.loads(report.read_text(encoding='utf-8'))['files']] \
+        == ["a.xlsx", "b.xlsx", "c.xlsx"]
@@ -0,0 +1,34 @@
+from semester_calendar import DEFAULT_CALENDAR, SemesterCalendar
+
+def week_row(*weeks, calendar=DEFAULT_CALENDAR):
+    """Dòng nguồn (cột tuần -> ô) có 'x' ở các tuần đã cho"""
+    return {col: 'x' if calendar.week_of(col) in weeks else "" for col in calendar.columns}
+
+def test_single_week_end_dates():
+    assert DEFAULT_CALENDAR.date_range(week_row(8)) == ("2025-09-29", "2025-10-05", [8])
+    assert DEFAULT_CALENDAR.date_range(week_row(12)) == ("2025-10-27", "2025-11-02", [12])
+
+def test_range_ends_on_last_active_week():
+    start, end, weeks = DEFAULT_CALENDAR.date_range(week_row(*range(1, 9)))
+    assert (start, end, weeks) == ("2025-08-11", "2025-10-05", list(range(1, 9)))
+    start, end, weeks = DEFAULT_CALENDAR.date_range(week_row(3, 8, 12))
+    assert (start, end, weeks) == ("2025-08-25", "2025-11-02", [3, 8, 12])
+
+def test_describe_groups_consecutive_weeks():
+    mask = DEFAULT_CALENDAR.encode(week_row(1, 2, 3, 4, 5, 6, 7, 8, 10))
+    assert DEFAULT_CALENDAR.describe(mask) == "Tuần 1-8 (11/8-5/10/2025), tuần 10 (13/10-19/10/2025)"
+    assert DEFAULT_CALENDAR.describe(0) == "Không xác định"
+
+def test_irregular_calendar_uses_real_mondays():
+    # Tuần 3 nghỉ lễ: cột thứ ba là tuần 4, thứ Hai lùi thêm một tuần
+    calendar = SemesterCalendar(['a', 'b', 'c'], [1, 2, 4], ['2025-08-11', '2025-08-18', '2025-09-01'])
+    assert calendar.date_range(week_row(4, calendar=calendar)) == ("2025-09-01", "2025-09-07", [4])
+    assert calendar.date_range(week_row(2, 4, calendar=calendar))[1:] == ("2025-09-07", [2, 4])
+
+def test_sample_calendar(sample_workbook):
+    calendar = sample_workbook.calendar
+    assert len(calendar) == 17
+    assert calendar.week_of(calendar.columns[7]) == 8
+    assert calendar.decode(1 << 7)[1] == "2025-10-05"
+    assert calendar.decode(1 << 11)[1] == "2025-11-02"
+    assert calendar == SemesterCalendar.from_dict(calendar.to_dict())
@@ -0,0 +1,70 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from tkb_conflicts import (CONFLICT_LECTURER, CONFLICT_ROOM, SKIP_LOCATIONS, find_conflicts, parse_periods,
+                           sweep_overlaps, week_masks)
+
+def brute_force_overlaps(resource, day, start, end, masks):
+    return sorted((i, j) for i, j in itertools.combinations(range(len(resource)), 2)
+                  if resource[i] == resource[j] and day[i] == day[j]
+                  and start[i] <= end[j] and start[j] <= end[i] and masks[i] & masks[j])
+
+def test_sweep_matches_brute_force():
+    rng = np.random.default_rng(7)
+    count = 400
+    resource = rng.integers(0, 12, count)
+    day = rng.integers(0, 3, count)
+    start = rng.integers(1, 12, count)
+    end = start + rng.integers(0, 4, count)
+    masks = rng.integers(1, 1 << 6, count)
+    assert sorted(sweep_overlaps(resource, day, start, end, masks)) == \
+        brute_force_overlaps(resource, day, start, end, masks)
+
+def test_week_masks():
+    masks = week_masks(pd.Series(["1, 2, 3", "", "17", np.nan]))
+    np.testing.assert_array_equal(masks, [0b1110, 0, 1 << 17, 0])
+
+def schedule(rows):
+    columns = ['STT', 'Lớp', 'Thứ', 'Thời gian', 'Địa điểm', 'Giảng viên', 'Tuần học']
+    return pd.DataFrame(rows, columns=columns)
+
+def test_find_conflicts():
+    df = schedule([
+        (1, 'L1', '2', '1-3', 'Phòng 402, Nhà A2', 'GV A', "1, 2, 3"),
+        (2, 'L2', '2', '3-4', 'Phòng 402, Nhà A2', 'GV B', "3, 4"),      # trùng phòng tiết 3, tuần 3
+        (3, 'L3', '2', '3-4', 'Phòng 403, Nhà A2', 'GV A', "4, 5"),      # cùng giảng viên nhưng khác tuần
+        (4, 'L4', '3', '1-3', 'Phòng 402, Nhà A2', 'GV C', "1"),         # khác thứ
+        (5, 'L5', '2', '1-2', 'Phòng -', 'GV C', "1"),                   # phòng chưa xếp: bỏ qua
+        (6, 'L6', '2', '1-2', 'Phòng -', 'GV D', "1"),
+        (7, 'L7', '2', '2-2', 'Nhà Online', 'GV A', "2"),                # trùng giảng viên với dòng 0
+    ])
+    conflicts = find_conflicts(df)
+    assert conflicts[['Loại', 'Dòng 1', 'Dòng 2', 'Tiết trùng', 'Tuần trùng']].values.tolist() == [
+        [CONFLICT_ROOM, 0, 1, "3-3", "3"],
+        [CONFLICT_LECTURER, 0, 6, "2-2", "2"],
+    ]
+    assert conflicts['STT 2'].tolist() == [2, 7]
+
+def test_no_conflicts_on_empty_weeks():
+    df = schedule([
+        (1, 'L1', '2', '1-3', 'Phòng 402, Nhà A2', 'GV A', ""),
+        (2, 'L2', '2', '1-3', 'Phòng 402, Nhà A2', 'GV A', ""),
+    ])
+    assert find_conflicts(df).empty
+
+def test_sample_room_conflicts_match_pairwise_join(sample_result):
+    start, end = parse_periods(sample_result['Thời gian'])
+    rows = pd.DataFrame({'room': sample_result['Địa điểm'].astype(object), 'day': sample_result['Thứ'].astype(object),
+                         'start': start, 'end': end, 'mask': week_masks(sample_result['Tuần học']),
+                         'row': np.arange(len(sample_result))})
+    rows = rows[rows['day'].notna() & (rows['start'] >= 0) & (rows['mask'] != 0)
+                & ~rows['room'].map(lambda room: bool(SKIP_LOCATIONS.search(str(room))))
+                & ~rows['room'].astype(str).str.strip().isin(["", "Lỗi"])]
+    pairs = rows.merge(rows, on=['room', 'day'])
+    pairs = pairs[(pairs['row_x'] < pairs['row_y']) & (pairs['start_x'] <= pairs['end_y'])
+                  & (pairs['start_y'] <= pairs['end_x']) & (pairs['mask_x'] & pairs['mask_y'] != 0)]
+    conflicts = find_conflicts(sample_result, kinds=(CONFLICT_ROOM,))
+    assert len(conflicts)
+    assert list(zip(conflicts['Dòng 1'], conflicts['Dòng 2'])) == sorted(zip(pairs['row_x'], pairs['row_y']))
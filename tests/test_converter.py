@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from schedule_converter_fixed import (_as_plain_values, process_schedule_data_improved,
+                                      process_schedule_data_vectorized, verify_vectorized_output)
+from semester_calendar import DEFAULT_CALENDAR
+
+def malformed_frame():
+    """Vài dòng nguồn, trong đó 'Thứ' không đổi được sang số ở dòng 1 và 3"""
+    weeks = DEFAULT_CALENDAR.columns
+    rows = [
+        {'TT': 1, 'Lớp': 'D23AT1', 'Nhóm': 1, 'Thứ': 4, 'Tiết BĐ': 1, 'Số tiết': 2, 'Giảng viên giảng dạy': 'A',
+         'Tên môn học/ học phần': 'Môn 1', 'Khóa': 2023, 'Ngành': 'AT', 'Phòng': '402', 'Nhà': 'A2', 'Số TC': 3.0},
+        {'TT': 2, 'Lớp': 'D23AT1', 'Nhóm': 2, 'Thứ': 'CN', 'Tiết BĐ': 3, 'Số tiết': 2, 'Giảng viên giảng dạy': 'B',
+         'Tên môn học/ học phần': 'Môn 2', 'Khóa': 2023, 'Ngành': 'AT', 'Phòng': '403', 'Nhà': 'A2', 'Số TC': 2.0},
+        {'TT': 3, 'Lớp': 'D24CN1', 'Nhóm': 1, 'Thứ': np.nan, 'Tiết BĐ': np.nan, 'Số tiết': np.nan,
+         'Tên môn học/ học phần': 'Môn 3', 'Khóa': 2024, 'Ngành': 'CN'},
+        {'TT': 4, 'Lớp': 'D24CN1', 'Nhóm': 1, 'Thứ': 'CN', 'Tiết BĐ': 7, 'Số tiết': 3, 'Giảng viên giảng dạy': 'C',
+         'Tên môn học/ học phần': 'Môn 4', 'Khóa': 2024, 'Ngành': 'CN', 'Phòng': '101', 'Nhà': 'NT'},
+    ]
+    df = pd.DataFrame(rows)
+    for i, col in enumerate(weeks):
+        df[col] = ['x' if (row + i) % 3 else np.nan for row in range(len(df))]
+    return df
+
+def test_vectorized_matches_reference_on_sample(sample_workbook, quiet):
+    with quiet():
+        assert verify_vectorized_output(sample_workbook.frame, sample_workbook.calendar)
+
+def test_malformed_rows_degrade_like_reference(quiet):
+    df = malformed_frame()
+    with quiet() as out:
+        expected = process_schedule_data_improved(df)
+        actual = process_schedule_data_vectorized(df)
+    pd.testing.assert_frame_equal(_as_plain_values(actual), _as_plain_values(expected), check_dtype=False)
+    assert out.getvalue().count("⚠️ Lỗi xử lý dòng") == 4
+    assert actual.loc[1, 'Môn học'].startswith("Lỗi dòng 1:")
+    assert actual.loc[1, 'Thứ'] == 'Lỗi'
+    assert actual.loc[0, 'Thứ'] == '4'
+    assert actual.filter(like='Gốc_').iloc[[1, 3]].isna().all().all()
+
+def test_verify_reports_failure_instead_of_raising(quiet, monkeypatch):
+    import schedule_converter_fixed
+
+    def broken(df, calendar):
+        raise ValueError("hỏng")
+
+    monkeypatch.setattr(schedule_converter_fixed, 'process_schedule_data_vectorized', broken)
+    with quiet():
+        assert verify_vectorized_output(malformed_frame()) is False
@@ -0,0 +1,36 @@
+import json
+
+import pandas as pd
+
+from tkb_fanout import FANOUT_GROUPS, fan_out, plan_fanout, safe_filename
+
+def test_safe_filename():
+    assert safe_filename("D23CQAT01-N") == "D23CQAT01-N"
+    assert safe_filename("Nguyễn Văn A / B") == "Nguyễn_Văn_A_B"
+    assert safe_filename(' <*> ') == "khong_ten"
+
+def test_plan_fanout_unique_names(tmp_path):
+    """Tên trùng sau khi làm sạch được đánh số; bỏ nhóm rỗng và dòng lỗi"""
+    df = pd.DataFrame({'Lớp': ["A/B", "A:B", "", "Lỗi", "A/B"], 'Giảng viên': ["GV"] * 5,
+                       'Môn học': ["M1", "M2", "M3", "M4", "M5"]})
+    jobs, manifest = plan_fanout(df, str(tmp_path), by=('Lớp',), fmt='csv')
+    assert [row['File'] for row in manifest] == ["lop/A_B.csv", "lop/A_B_2.csv"]
+    assert [row['Số dòng'] for row in manifest] == [2, 1]
+    assert [len(rows) for _, _, rows, _ in jobs] == [2, 1]
+
+def test_fan_out_sample(sample_result, tmp_path, quiet):
+    output = tmp_path / "tkb_ca_nhan"
+    with quiet():
+        manifest = fan_out(sample_result, str(output), fmt='csv', use_processes=False, max_workers=2)
+    for group_col, folder in FANOUT_GROUPS.items():
+        names = sample_result[group_col].astype(str).str.strip()
+        names = names[~names.isin(["", "Lỗi", "nan"])]
+        rows = manifest[manifest['Nhóm'] == group_col]
+        assert len(rows) == names.nunique()
+        assert rows['Số dòng'].sum() == len(names)
+        assert len(list((output / folder).iterdir())) == len(rows)
+    saved = json.loads((output / "manifest.json").read_text(encoding='utf-8'))
+    assert saved['source_rows'] == len(sample_result)
+    assert len(saved['files']) == len(manifest)
+    first = manifest.iloc[0]
+    assert len(pd.read_csv(output / first['File'], encoding='utf-8-sig')) == first['Số dòng']
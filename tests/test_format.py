@@ -0,0 +1,44 @@
+import math
+
+from tkb_format import (cache_counts, cache_stats, clear_caches, counts_since, day_name, location_label,
+                        merge_cache_stats, period_range, record_table_lookup, week_list_label)
+
+def test_labels():
+    assert [day_name(d) for d in (2, 7.0, 8, 9, math.nan)] == ["2", "7", "CN", "Thứ 9", ""]
+    assert period_range(1, 3) == "1-3"
+    assert period_range("7", 2.0) == "7-8"
+    assert period_range("sáng", 2) == "sáng"
+    assert period_range(1, None) == ""
+    assert location_label("101", "A2") == "Phòng 101, Nhà A2"
+    assert location_label("101", "") == "Phòng 101"
+    assert location_label("", "A2") == "Nhà A2"
+    assert location_label("", "") == ""
+    assert week_list_label((1, 2, 5)) == "1, 2, 5"
+
+def test_cache_stats():
+    clear_caches()
+    for _ in range(3):
+        location_label("101", "A2")
+    record_table_lookup('location', rows=10, distinct=4)
+    info = cache_stats()['location']
+    assert (info['hits'], info['misses'], info['size']) == (2 + 6, 1, 1)
+    assert info['hit_rate'] == round(8 / 9, 4)
+    assert cache_stats()['week_list']['hit_rate'] is None
+    clear_caches()
+    assert cache_stats()['location']['hits'] == 0
+
+def test_merge_worker_counts():
+    """Số liệu process con gửi về (counts_since) được cộng vào cache_stats() của process cha"""
+    clear_caches()
+    before = cache_counts()
+    day_name(2)
+    day_name(2)
+    worker = counts_since(before)
+    assert worker['day_name'] == {'hits': 1, 'misses': 1, 'size': 1}
+    clear_caches()
+    merge_cache_stats(worker)
+    merge_cache_stats(worker)
+    info = cache_stats()['day_name']
+    assert (info['hits'], info['misses'], info['size']) == (2, 2, 1)
+    clear_caches()
+    assert cache_stats()['day_name']['misses'] == 0
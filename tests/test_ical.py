@@ -0,0 +1,35 @@
+from datetime import date
+
+from tkb_ical import escape_text, fold_line, week_recurrence, write_ics
+
+def test_escape_text():
+    assert escape_text("a,b;c\\d\ne") == "a\\,b\\;c\\\\d\\ne"
+
+def test_fold_line_keeps_utf8_characters():
+    line = "SUMMARY:" + "Lập trình hướng đối tượng " * 5
+    folded = fold_line(line)
+    parts = folded[:-2].split(b"\r\n")
+    assert all(len(part) <= 75 for part in parts)
+    assert all(part.startswith(b" ") for part in parts[1:])
+    assert b"".join(part[1:] if i else part for i, part in enumerate(parts)).decode('utf-8') == line
+    assert fold_line("END:VEVENT") == b"END:VEVENT\r\n"
+
+def test_week_recurrence():
+    """Tuần nghỉ ở giữa thành EXDATE, ngày lệch khỏi lưới 7 ngày thành RDATE"""
+    dates = [date(2025, 8, 11), date(2025, 8, 18), date(2025, 9, 1), date(2025, 9, 3)]
+    first, count, exdates, rdates = week_recurrence(dates)
+    assert (first, count) == (date(2025, 8, 11), 4)
+    assert exdates == [date(2025, 8, 25)]
+    assert rdates == [date(2025, 9, 3)]
+
+def test_write_ics_sample(sample_result, sample_workbook, tmp_path, quiet):
+    output = tmp_path / "tkb.ics"
+    with quiet():
+        count, skipped = write_ics(sample_result, str(output), calendar=sample_workbook.calendar)
+    assert count > 0 and count + len(skipped) == len(sample_result)
+    data = output.read_bytes()
+    lines = data.split(b"\r\n")
+    assert lines[0] == b"BEGIN:VCALENDAR" and lines[-2] == b"END:VCALENDAR"
+    assert lines.count(b"BEGIN:VEVENT") == lines.count(b"END:VEVENT") == count
+    assert all(len(line) <= 75 for line in lines)
+    data.decode('utf-8')
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from schedule_converter_fixed import _as_plain_values, process_schedule_data_vectorized
+from tkb_incremental import (STATUS_ADDED, STATUS_CHANGED, STATUS_REMOVED, convert_incremental, diff_fingerprints,
+                             incremental_paths, row_fingerprints)
+
+def fingerprints(rows):
+    return pd.DataFrame({'_key': [key for key, _ in rows], '_hash': np.array([h for _, h in rows], dtype=np.uint64)})
+
+def test_diff_fingerprints():
+    previous = fingerprints([("a", 1), ("b", 2), ("b", 3), ("c", 4), ("d", 5)])
+    current = fingerprints([("b", 3), ("a", 1), ("b", 9), ("c", 7), ("e", 6)])
+    status, previous_position, removed = diff_fingerprints(current, previous)
+    assert status.tolist() == ["", "", STATUS_CHANGED, STATUS_CHANGED, STATUS_ADDED]
+    assert previous_position.tolist() == [2, 0, 1, 3, -1]
+    assert removed == [4]
+
+def test_duplicate_keys_match_by_content():
+    previous = fingerprints([("a", 1), ("a", 2)])
+    status, previous_position, removed = diff_fingerprints(fingerprints([("a", 2), ("a", 1)]), previous)
+    assert status.tolist() == ["", ""] and previous_position.tolist() == [1, 0] and removed == []
+
+def test_row_fingerprints_ignore_index():
+    df = pd.DataFrame({'TT': [1, 2], 'Mã môn học': ['M1', np.nan], 'Nhóm': [1, 2], 'Lớp': ['L1', 'L2']})
+    first = row_fingerprints(df)
+    assert first['_key'].tolist() == ["1|M1|1", "2||2"]
+    pd.testing.assert_frame_equal(row_fingerprints(df.set_axis([10, 11])), first)
+
+def test_incremental_matches_full_conversion(sample_workbook, quiet, tmp_path):
+    source, calendar = sample_workbook.frame, sample_workbook.calendar
+    files = {'state_file': str(tmp_path / "state.parquet"), 'changes_file': str(tmp_path / "changes.csv")}
+    with quiet():
+        first, changes = convert_incremental(source, calendar, **files)
+    assert len(first) == len(source)
+    assert (changes['Trạng thái'] == STATUS_ADDED).all() and len(changes) == len(source)
+
+    # Lần phát hành sau: sửa một dòng, xóa một dòng, thêm một dòng
+    edited = source.drop(index=source.index[5]).reset_index(drop=True)
+    edited['Giảng viên giảng dạy'] = edited['Giảng viên giảng dạy'].astype(object)
+    edited.loc[0, 'Giảng viên giảng dạy'] = "Giảng viên mới"
+    added = source.iloc[[1]].assign(TT=99999)
+    edited = pd.concat([edited, added], ignore_index=True)
+    with quiet():
+        result, changes = convert_incremental(edited, calendar, **files)
+        expected = process_schedule_data_vectorized(edited, calendar)
+    pd.testing.assert_frame_equal(_as_plain_values(result), _as_plain_values(expected), check_dtype=False)
+    assert changes['Trạng thái'].tolist() == [STATUS_CHANGED, STATUS_ADDED, STATUS_REMOVED]
+    assert changes['Giảng viên'].iloc[0] == "Giảng viên mới"
+    assert (tmp_path / "changes.csv").exists()
+
+    with quiet():
+        _, changes = convert_incremental(edited, calendar, **files)
+    assert changes.empty
+
+def test_incremental_paths():
+    assert incremental_paths("out/tkb.xlsx") == ("out/tkb.state.parquet", "out/tkb.changes.csv")
+    assert incremental_paths("tkb") == ("tkb.state.parquet", "tkb.changes.csv")
+
+def test_state_of_another_source_is_rebuilt(sample_workbook, quiet, tmp_path):
+    source, calendar = sample_workbook.frame, sample_workbook.calendar
+    state_file, changes_file = incremental_paths(str(tmp_path / "tkb.xlsx"))
+    with quiet():
+        convert_incremental(source, calendar, state_file, changes_file, source="a.xlsx")
+        _, same = convert_incremental(source, calendar, state_file, changes_file, source="a.xlsx")
+        _, other = convert_incremental(source, calendar, state_file, changes_file, source="b.xlsx")
+    assert same.empty
+    assert len(other) == len(source) and (other['Trạng thái'] == STATUS_ADDED).all()
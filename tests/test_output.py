@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+import pytest
+
+from schedule_converter_fixed import _as_plain_values
+from tkb_output import arrow_table, format_for_path, write_output
+
+def small_result():
+    return pd.DataFrame({
+        'Lớp': pd.Categorical(['L1', 'L1', 'L2']),
+        'Thứ': ['2', 'CN', '4'],
+        'Số tín chỉ': pd.Series([3.0, "", 2], dtype=object),
+        'Gốc_08/25': pd.Series(['x', 1, np.nan], dtype=object),
+        'STT': [1, 2, 3],
+    })
+
+def plain_list(values):
+    """Giá trị Python của một cột, ô trống (NaN/None/NA) thành None"""
+    return [None if pd.isna(value) else value for value in values.astype(object)]
+
+def test_format_for_path():
+    assert [format_for_path(path) for path in ("a.XLSX", "a.pq", "a.arrow", "a.txt", "a", None)] == \
+        ['xlsx', 'parquet', 'feather', 'csv', 'xlsx', 'xlsx']
+    with pytest.raises(ValueError):
+        write_output(small_result(), "a.out", 'html')
+
+def test_arrow_types():
+    schema = arrow_table(small_result()).schema
+    assert str(schema.field('Số tín chỉ').type) == 'int64'
+    assert str(schema.field('Gốc_08/25').type) == 'string'
+    assert str(schema.field('Lớp').type).startswith('dictionary')
+    assert arrow_table(small_result()).column('Số tín chỉ').to_pylist() == [3, None, 2]
+
+@pytest.mark.parametrize("extension", ["parquet", "feather"])
+def test_arrow_round_trip(sample_result, tmp_path, extension):
+    path = str(tmp_path / f"tkb.{extension}")
+    assert write_output(sample_result, path) == len(sample_result)
+    table = pq.read_table(path) if extension == "parquet" else feather.read_table(path)
+    assert str(table.schema.field('Số tín chỉ').type) == 'int64'
+    loaded = table.to_pandas()
+    assert list(loaded.columns) == list(sample_result.columns)
+    expected = _as_plain_values(sample_result)
+    for col in expected.columns:
+        original = plain_list(expected[col])
+        if col == 'Số tín chỉ':
+            original = [None if value in (None, "") else int(value) for value in original]
+        elif col.startswith('Gốc_'):
+            original = [None if value is None else str(value) for value in original]
+        assert plain_list(loaded[col]) == original, col
+
+def test_csv_round_trip(sample_result, tmp_path):
+    path = str(tmp_path / "tkb.csv")
+    write_output(sample_result, path, chunk_rows=1000)
+    loaded = pd.read_csv(path, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+    expected = sample_result.astype(str).replace("nan", "")
+    assert loaded.shape == sample_result.shape
+    assert loaded['Tuần học'].tolist() == expected['Tuần học'].tolist()
+    assert loaded['Giảng viên'].tolist() == expected['Giảng viên'].tolist()
+
+def test_xlsx_round_trip(tmp_path):
+    path = str(tmp_path / "tkb.xlsx")
+    assert write_output(small_result(), path) == 3
+    loaded = pd.read_excel(path, dtype=object)
+    assert loaded['Lớp'].tolist() == ['L1', 'L1', 'L2']
+    assert loaded['Số tín chỉ'].tolist()[::2] == [3, 2] and pd.isna(loaded['Số tín chỉ'].iat[1])
+    assert loaded['STT'].tolist() == [1, 2, 3]
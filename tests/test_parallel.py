@@ -0,0 +1,36 @@
+import pandas as pd
+
+import tkb_parallel
+from schedule_converter_fixed import _as_plain_values
+from tkb_format import cache_stats, clear_caches
+from tkb_parallel import convert_parallel, decode_chunk, encode_chunk, plan_layout
+
+def test_shared_memory_round_trip(sample_workbook):
+    """Mã hóa rồi giải mã một khối cho lại đúng giá trị và dtype gốc"""
+    df = sample_workbook.frame
+    layout, size = plan_layout(df, list(df.columns))
+    buffer = bytearray(size)
+    views = tkb_parallel._column_views(buffer, layout, len(df))
+    categories = encode_chunk(df, layout, views, 100, 600)
+    pd.testing.assert_frame_equal(decode_chunk(layout, views, 100, 600, categories), df.iloc[100:600])
+
+def test_parallel_matches_sequential(sample_workbook, sample_result, monkeypatch, quiet):
+    monkeypatch.setattr(tkb_parallel, "available_cpus", lambda: 2)
+    clear_caches()
+    with quiet() as output:
+        result = convert_parallel(sample_workbook.frame, sample_workbook.calendar, chunk_rows=1000, min_rows=0)
+    assert "5 khối, 2 process" in output.getvalue()
+    pd.testing.assert_frame_equal(_as_plain_values(result), _as_plain_values(sample_result), check_dtype=False)
+    # Process cha không định dạng dòng nào: mọi số liệu cache đều do process con gửi về
+    stats = cache_stats()
+    assert all(info['misses'] > 0 for info in stats.values())
+    assert stats['location']['hits'] + stats['location']['misses'] == len(sample_result)
+    clear_caches()
+
+def test_single_cpu_runs_sequentially(sample_workbook, sample_result, monkeypatch, quiet):
+    monkeypatch.setattr(tkb_parallel, "available_cpus", lambda: 1)
+    with quiet() as output:
+        result = convert_parallel(sample_workbook.frame, sample_workbook.calendar, max_workers=4, chunk_rows=1000,
+                                  min_rows=0)
+    assert "process)" not in output.getvalue()
+    pd.testing.assert_frame_equal(result, sample_result)
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from semester_calendar import DEFAULT_CALENDAR
+from tkb_cache import evict_lru
+from tkb_rooms import RoomOccupancy, day_index, load_room_occupancy
+
+ROOMS = ['Phòng 402, Nhà A2', 'Phòng 403, Nhà A2', 'Phòng 101, Nhà NT']
+
+def schedule():
+    return pd.DataFrame([
+        ('2', '1-3', ROOMS[0], "1, 2, 3"),
+        ('2', '7-9', ROOMS[1], "2"),
+        ('CN', '4-6', ROOMS[2], "8, 12"),
+        ('2', '1-2', 'Phòng -', "1"),
+        ('3', '1-3', 'Nhà Online', "1"),
+    ], columns=['Thứ', 'Thời gian', 'Địa điểm', 'Tuần học'])
+
+def test_day_index():
+    assert [day_index(day) for day in (4, "4", "Thứ 4", 8, "CN", "chủ nhật", "x")] == [2, 2, 2, 6, 6, 6, None]
+
+def test_free_rooms():
+    occupancy = RoomOccupancy.from_schedule(schedule())
+    assert sorted(occupancy.rooms) == sorted(ROOMS)
+    assert occupancy.free_rooms(2, "1-3", 1) == sorted(ROOMS[1:])
+    assert occupancy.free_rooms(2, "3-7", 2) == [ROOMS[2]]
+    assert occupancy.free_rooms(2, "4-6", 2) == sorted(ROOMS)
+    assert occupancy.free_rooms("CN", "6", 12, building="nt") == []
+    assert occupancy.free_rooms("CN", "6", 11, building="NT") == [ROOMS[2]]
+    assert not occupancy.is_free(ROOMS[0], "Thứ 2", (2, 2), 3)
+
+def test_free_matrix_matches_single_queries():
+    occupancy = RoomOccupancy.from_schedule(schedule())
+    queries = [(day, f"{first}-{first + length}", week)
+               for day in ("2", "CN") for first in (1, 3, 7) for length in (0, 2) for week in (1, 2, 8, 12)]
+    expected = [occupancy.free_rooms(*query) for query in queries]
+    assert occupancy.free_rooms_batch(queries) == expected
+
+def test_week_axis_covers_calendar():
+    occupancy = RoomOccupancy.from_schedule(schedule())
+    with pytest.raises(ValueError):
+        occupancy.free_rooms(2, "1-3", 17)
+    occupancy = RoomOccupancy.from_schedule(schedule(), calendar=DEFAULT_CALENDAR)
+    assert occupancy.free_rooms(2, "1-3", 17) == sorted(ROOMS)
+    with pytest.raises(ValueError):
+        occupancy.free_rooms(2, "1-3", 18)
+
+def test_sample_matches_schedule_rows(sample_result):
+    occupancy = RoomOccupancy.from_schedule(sample_result, calendar=DEFAULT_CALENDAR)
+    booked = sample_result[sample_result['Địa điểm'].astype(str) == occupancy.rooms[0]]
+    row = booked.iloc[0]
+    week = int(str(row['Tuần học']).split(",")[0])
+    assert occupancy.rooms[0] not in occupancy.free_rooms(row['Thứ'], row['Thời gian'], week)
+
+def test_cache_round_trip_and_eviction(tmp_path):
+    cache_dir = str(tmp_path)
+    built = load_room_occupancy(schedule(), cache_dir, calendar=DEFAULT_CALENDAR)
+    files = sorted(os.listdir(cache_dir))
+    assert len(files) == 2 and files[1] == files[0] + ".json"
+    loaded = load_room_occupancy(schedule(), cache_dir, calendar=DEFAULT_CALENDAR)
+    assert isinstance(loaded.occupied, np.memmap)
+    np.testing.assert_array_equal(loaded.occupied, built.occupied)
+    assert loaded.rooms == built.rooms
+
+    assert evict_lru(cache_dir, 0) == [os.path.join(cache_dir, files[0])]
+    assert os.listdir(cache_dir) == []
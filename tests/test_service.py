@@ -0,0 +1,64 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from conftest import SAMPLE_WORKBOOK
+from tkb_service import MAX_LIMIT, TimetableService, make_handler
+
+@pytest.fixture(scope="module")
+def service(sample_workbook, tmp_path_factory):
+    """Dịch vụ trên file TKB mẫu; cache Parquet ghi vào thư mục tạm"""
+    import os
+
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("service"))
+    try:
+        return TimetableService(SAMPLE_WORKBOOK)
+    finally:
+        os.chdir(cwd)
+
+def test_schedule_paging(service):
+    status, body = service.handle("/schedule", {'limit': ['5'], 'offset': ['2']})
+    assert status == 200 and body['count'] == len(service.snapshot.frame) and len(body['rows']) == 5
+    _, tail = service.handle("/schedule", {'limit': ['5'], 'offset': [str(body['count'] - 2)]})
+    assert len(tail['rows']) == 2
+    status, body = service.handle("/schedule", {'limit': ['0']})
+    assert status == 200 and body['rows'] == []
+
+@pytest.mark.parametrize("query", [{'limit': ['-1']}, {'limit': [str(MAX_LIMIT + 1)]}, {'offset': ['-3']},
+                                   {'tuan': ['0']}, {'tuan': ['63']}, {'tuan': ['abc']}])
+def test_schedule_rejects_bad_parameters(service, query):
+    with pytest.raises(ValueError):
+        service.handle("/schedule", query)
+
+def test_week_filter_and_free_rooms(service):
+    _, week_3 = service.handle("/schedule", {'tuan': ['3'], 'limit': ['10000']})
+    assert week_3['count'] and all("3" in row['Tuần học'].split(", ") for row in week_3['rows'])
+    status, body = service.handle("/free-rooms", {'thu': ['2'], 'tiet': ['1-3'], 'tuan': ['17']})
+    assert status == 200 and body['count'] == len(body['rooms']) > 0
+
+def get(port, path):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}") as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+def test_http_status_codes(service, monkeypatch, capsys):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(service))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    try:
+        assert get(port, "/health")[0] == 200
+        assert get(port, "/schedule?limit=-1")[0] == 400
+        assert get(port, "/khong-co")[0] == 404
+        monkeypatch.setattr(service, "handle", lambda path, query: 1 / 0)
+        status, body = get(port, "/health")
+        assert status == 500 and "ZeroDivisionError" in body['error']
+    finally:
+        server.shutdown()
+        server.server_close()
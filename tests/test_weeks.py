@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from semester_calendar import DEFAULT_CALENDAR
+from tkb_weeks import DEFAULT_MARKERS, MAKEUP_MARKERS, MarkerTable, parse_week_matrix
+
+def legacy_masks(df, calendar=DEFAULT_CALENDAR):
+    """Quy tắc cũ: ô có học khi `'x' in str(ô).lower()`"""
+    masks = np.zeros(len(df), dtype=np.int64)
+    for col, bit in calendar.bits.items():
+        if col in df.columns:
+            active = df[col].map(lambda value: pd.notna(value) and 'x' in str(value).lower())
+            masks[active.to_numpy(dtype=bool)] |= bit
+    return masks
+
+def week_frame():
+    cells = ['x', 'X ', 'x*', 'b', 'bù', np.nan, '', ' x(P302)', 11]
+    columns = DEFAULT_CALENDAR.columns[:len(cells)]
+    return pd.DataFrame([cells, cells[::-1]], columns=columns)
+
+def test_default_table_matches_legacy_rule():
+    df = week_frame()
+    np.testing.assert_array_equal(DEFAULT_CALENDAR.encode_frame(df), legacy_masks(df))
+
+def test_default_table_on_sample(sample_workbook):
+    frame, calendar = sample_workbook.frame, sample_workbook.calendar
+    np.testing.assert_array_equal(calendar.encode_frame(frame), legacy_masks(frame, calendar))
+
+def test_makeup_codes_are_opt_in():
+    df = week_frame()
+    table = MarkerTable(DEFAULT_MARKERS + MAKEUP_MARKERS)
+    default = parse_week_matrix(df, df.columns)
+    makeup = parse_week_matrix(df, df.columns, table)
+    assert not default.active()[0, 3] and not default.active()[0, 4]
+    assert makeup.active()[0, 3] and makeup.active()[0, 4]
+    assert makeup.marker_counts()['Học bù'] == 4
+    assert default.marker_counts() == {'Học': 4, 'Học, xem ghi chú': 2, 'Khác': 8}
+
+def makeup_frame():
+    """Ba dòng nguồn: tuần 1 'x', tuần 2 mã học bù 'b', tuần 3 'x*'"""
+    columns = DEFAULT_CALENDAR.columns
+    df = pd.DataFrame({'TT': [1, 2, 3], 'Lớp': ['L1', 'L2', 'L3'], 'Nhóm': [1, 1, 1], 'Thứ': [2, 3, 4],
+                       'Tiết BĐ': [1, 1, 1], 'Số tiết': [2, 2, 2], 'Tên môn học/ học phần': ['M1', 'M2', 'M3']})
+    for i, col in enumerate(columns):
+        df[col] = [('x' if i == 0 else 'b' if i == 1 else 'x*' if i == 2 else np.nan)] * 3
+    return df
+
+def test_converters_honour_marker_table(quiet):
+    from schedule_converter_fixed import process_schedule_data_vectorized, verify_vectorized_output
+
+    table = MarkerTable(DEFAULT_MARKERS + MAKEUP_MARKERS)
+    with quiet():
+        default = process_schedule_data_vectorized(makeup_frame())
+        makeup = process_schedule_data_vectorized(makeup_frame(), marker_table=table)
+        assert verify_vectorized_output(makeup_frame(), marker_table=table)
+    assert default['Tuần học'].iat[0] == "1, 3"
+    assert makeup['Tuần học'].iat[0] == "1, 2, 3"
+
+def test_marker_counts_reach_statistics():
+    from tkb_stats import MARKER_GROUP, compute_statistics
+
+    table = MarkerTable(DEFAULT_MARKERS + MAKEUP_MARKERS)
+    counts = DEFAULT_CALENDAR.week_matrix(makeup_frame(), table).marker_counts()
+    stats = compute_statistics(makeup_frame(), week_markers=counts)
+    assert stats.groups[MARKER_GROUP]['Số lượng'].to_dict() == {'Học': 3, 'Học bù': 3, 'Học, xem ghi chú': 3}
+    assert set(stats.to_frame()['Loại']) >= {MARKER_GROUP}
+
+def test_cli_builds_marker_table(tmp_path):
+    from tkb_cli import build_marker_table, parse_args
+
+    source = tmp_path / "tkb.xlsx"
+    source.write_bytes(b"")
+    assert build_marker_table(parse_args([str(source)])) is None
+    table = build_marker_table(parse_args([str(source), '--makeup', '--marker', 'o=Học online']))
+    assert table.is_active('bù') and table.is_active(' O ') and table.label(table.classify('o')[0]) == "Học online"
@@ -0,0 +1,137 @@
+import contextlib
+import glob
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from schedule_converter_fixed import process_schedule_data_vectorized
+from semester_calendar import DEFAULT_CALENDAR
+from tkb_cache import DEFAULT_CACHE_DIR, load_cached_workbook
+from tkb_writer import frame_rows, write_xlsx_stream
+
+def find_workbooks(sources, exclude=()):
+    """Danh sách file .xlsx từ các thư mục, mẫu glob hoặc đường dẫn file (bỏ file tạm '~$' và các file exclude)"""
+    excluded = {os.path.abspath(path) for path in exclude if path}
+    found = []
+    for source in sources:
+        if os.path.isdir(source):
+            paths = glob.glob(os.path.join(source, "*.xlsx"))
+        elif glob.has_magic(source):
+            paths = glob.glob(source, recursive=True)
+        else:
+            paths = [source]
+        for path in sorted(paths):
+            if (not os.path.basename(path).startswith("~$") and os.path.abspath(path) not in excluded
+                    and path not in found):
+                found.append(path)
+    return found
+
+def convert_workbook(excel_file, sheet_name='TKB CHINH', header=None, cache_dir=DEFAULT_CACHE_DIR):
+    """Đọc + chuyển đổi một workbook (chạy trong process con); trả về dict kết quả và thời gian"""
+    report = {'file': excel_file, 'rows': 0, 'read_s': 0.0, 'convert_s': 0.0, 'error': None}
+    frame = None
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            workbook = load_cached_workbook(excel_file, sheet_name=sheet_name, header=header, cache_dir=cache_dir,
+                                            categorical=True)
+            report['read_s'] = time.perf_counter() - started
+            if workbook.frame is None:
+                raise ValueError(f"Không tìm thấy sheet '{sheet_name}'")
+
+            started = time.perf_counter()
+            frame = process_schedule_data_vectorized(workbook.frame, workbook.calendar or DEFAULT_CALENDAR)
+            report['convert_s'] = time.perf_counter() - started
+        report['rows'] = len(frame)
+    except Exception as e:
+        report['error'] = f"{type(e).__name__}: {e}"
+    return report, frame
+
+def _converted_frames(files, executor, max_in_flight, reports, sheet_name, header, cache_dir):
+    """Sinh (file, DataFrame kết quả) theo đúng thứ tự files
+
+    Kết quả xong trước lượt của mình được giữ lại và tính vào max_in_flight cùng các file đang chạy,
+    nên nhiều nhất max_in_flight kết quả nằm trong bộ nhớ. Báo cáo từng file được ghi vào reports.
+    """
+    pending = list(files)
+    running, finished = {}, {}
+    for path in files:
+        while path not in finished:
+            while pending and len(running) + len(finished) < max_in_flight:
+                submitted = pending.pop(0)
+                running[executor.submit(convert_workbook, submitted, sheet_name, header, cache_dir)] = submitted
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                done_path = running.pop(future)
+                report, finished[done_path] = future.result()
+                reports[done_path] = report
+                status = f"❌ {report['error']}" if report['error'] else f"✅ {report['rows']} dòng"
+                print(f"  {os.path.basename(done_path)}: {status} "
+                      f"(đọc {report['read_s']:.2f}s, chuyển đổi {report['convert_s']:.2f}s)")
+        frame = finished.pop(path)
+        if frame is not None:
+            yield path, frame
+
+def _batch_rows(frames, columns):
+    """Các dòng ('Nguồn', cột kết quả...) của từng file; file có bộ cột tuần khác được đưa về columns"""
+    for path, frame in frames:
+        source = os.path.basename(path)
+        for row in frame_rows(frame.reindex(columns=columns[1:])):
+            yield (source, *row)
+
+def convert_batch(sources, output_file="tkb_tong_hop.xlsx", max_workers=None, sheet_name='TKB CHINH',
+                  header=None, max_in_flight=None, report_file=None, cache_dir=DEFAULT_CACHE_DIR):
+    """Chuyển đổi song song nhiều workbook TKB và ghi nối tiếp vào một file kết quả
+
+    Kết quả từng file được ghi theo luồng (write_xlsx_stream) theo thứ tự file đầu vào rồi bỏ đi ngay;
+    số workbook đang xử lý hoặc chờ ghi bị giới hạn bởi max_in_flight (mặc định = số process), nên
+    bộ nhớ không tăng theo số file. Bộ cột lấy theo file đầu tiên chuyển đổi được.
+    output_file bị loại khỏi danh sách nguồn; report_file vẫn được ghi khi ghi kết quả lỗi giữa chừng.
+    Trả về (số dòng đã ghi, danh sách báo cáo từng file).
+    """
+    files = find_workbooks(sources, exclude=(output_file,))
+    if not files:
+        print("Không tìm thấy file .xlsx nào")
+        return 0, []
+
+    max_workers = max_workers or min(len(files), os.cpu_count() or 1)
+    max_in_flight = max_in_flight or max_workers
+    print(f"🚀 Chuyển đổi {len(files)} file trên {max_workers} process")
+
+    started = time.perf_counter()
+    reports = {}
+    written = 0
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            frames = _converted_frames(files, executor, max_in_flight, reports, sheet_name, header, cache_dir)
+            try:
+                first = next(frames, None)
+                if first is not None:
+                    columns = ['Nguồn'] + list(first[1].columns)
+                    rows = _batch_rows(itertools.chain([first], frames), columns)
+                    del first
+                    if output_file:
+                        written, = write_xlsx_stream(output_file, [('Sheet1', columns, rows)])
+                        print(f"\n💾 Đã lưu {written} dòng dữ liệu vào file: {output_file}")
+                    else:
+                        written = sum(1 for _ in rows)
+            finally:
+                # Ghi lỗi giữa chừng: vẫn chờ các file còn lại để báo cáo đủ rồi mới báo lỗi
+                for _ in frames:
+                    pass
+    finally:
+        ordered = [reports[path] for path in files if path in reports]
+        elapsed = time.perf_counter() - started
+        total_rows = sum(report['rows'] for report in ordered)
+        print(f"⏱️ Tổng thời gian: {elapsed:.2f}s, {total_rows} dòng ({total_rows / elapsed:.0f} dòng/giây)")
+        if report_file:
+            with open(report_file, 'w', encoding='utf-8') as f:
+                json.dump({'elapsed_s': elapsed, 'files': ordered}, f, ensure_ascii=False, indent=2)
+    return written, ordered
+
+if __name__ == "__main__":
+    convert_batch(sys.argv[1:] or ["."])
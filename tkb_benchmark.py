@@ -0,0 +1,233 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from semester_calendar import DEFAULT_CALENDAR
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+# Vị trí các dòng tiêu đề giống sheet 'TKB CHINH' thật (đọc với header=8)
+HEADER_ROW = 8
+SOURCE_COLUMNS = ['TT', 'Mã môn học', 'Tên môn học/ học phần', 'Khóa', 'Ngành', 'Lớp', 'Nhóm', 'Tổ hợp', 'Tổ TH',
+                  'Thứ', 'Tiết BĐ', 'Số tiết', 'Giảng viên giảng dạy', 'Khoa', 'Bộ môn', 'Ghi chú', 'Tháng']
+TAIL_COLUMNS = ['Phòng', 'Nhà', 'Số TC', 'Phân bổ CT']
+TAIL_DETAIL = ['TS tiết', 'LT', 'TL/ BT', 'BTL', 'TH/ TN', 'Tự học']
+
+MAJORS = ['AT', 'CN-KH', 'VT', 'E-CN', 'CC', 'DT-VT', 'CNPM', 'HTTT', 'KT', 'QT', 'MR', 'TT', 'DPT', 'Chung']
+YEARS = [2022, 2023, 2024, "2023_2024"]
+BUILDINGS = ['A1', 'A2', 'A3', 'NT', 'Online']
+FAMILY = ['Nguyễn', 'Trần', 'Lê', 'Phạm', 'Hoàng', 'Vũ', 'Đặng', 'Bùi', 'Đỗ', 'Ngô']
+MIDDLE = ['Thị', 'Văn', 'Đức', 'Thanh', 'Quang', 'Hoàng', 'Minh', 'Thu', 'Việt', 'Hữu']
+GIVEN = ['Anh', 'Trang', 'Duy', 'Hằng', 'Mai', 'Hưng', 'Dũng', 'Thắng', 'Hiệp', 'Bình', 'Lam', 'Sỹ', 'Thư']
+START_PERIODS = [1, 3, 4, 6, 7, 8, 10, 12]
+
+def _cardinality(n_rows, per_row, minimum, maximum):
+    return int(min(maximum, max(minimum, n_rows * per_row)))
+
+def _week_patterns(n_weeks):
+    """Các mẫu tuần hay gặp: cả kỳ, nửa đầu, nửa sau, cách 4 tuần, khoảng ngẫu nhiên"""
+    full = list(range(min(15, n_weeks)))
+    patterns = [full, full[:8], list(range(8, n_weeks - 1)), list(range(0, n_weeks, 4)),
+                list(range(3, n_weeks, 4)), list(range(6, 12)), full[:1]]
+    return [[w for w in pattern if w < n_weeks] for pattern in patterns]
+
+def synthetic_rows(n_rows, seed=0, calendar=DEFAULT_CALENDAR):
+    """Các dòng thô (như read_sheet_rows) của một sheet TKB giả lập có n_rows dòng dữ liệu
+
+    Cùng bố cục với file thật: tiêu đề ở dòng 0-6, số tuần ở dòng 7, header ở dòng 8,
+    nhãn tháng + ngày BĐ/KT của từng cột tuần, cardinality tăng theo số dòng như dữ liệu thật.
+    """
+    rng = np.random.default_rng(seed)
+    n_weeks = len(calendar)
+    width = len(SOURCE_COLUMNS) + n_weeks + len(TAIL_COLUMNS) + len(TAIL_DETAIL) - 1
+
+    def blank():
+        return [""] * width
+
+    rows = [blank() for _ in range(HEADER_ROW + 3)]
+    rows[0][0] = "HỌC VIỆN CÔNG NGHỆ BCVT"
+    rows[3][0] = "LỊCH GIẢNG DẠY - HỌC TẬP (DỮ LIỆU GIẢ LẬP)"
+    first_week = len(SOURCE_COLUMNS)
+    rows[HEADER_ROW][:len(SOURCE_COLUMNS)] = SOURCE_COLUMNS
+    previous_month = None
+    for i, (week, monday) in enumerate(zip(calendar.week_numbers, calendar.mondays.astype(object))):
+        rows[HEADER_ROW - 1][first_week + i] = int(week)
+        if monday.month != previous_month:
+            rows[HEADER_ROW][first_week + i] = f"{monday:%m/%y}"
+            previous_month = monday.month
+        rows[HEADER_ROW + 1][first_week + i] = monday.day
+        rows[HEADER_ROW + 2][first_week + i] = (monday + timedelta(days=6)).day
+    tail = first_week + n_weeks
+    rows[HEADER_ROW][tail:tail + len(TAIL_COLUMNS)] = TAIL_COLUMNS
+    rows[HEADER_ROW + 1][tail + len(TAIL_COLUMNS) - 1:] = TAIL_DETAIL
+    rows[HEADER_ROW + 1][first_week - 1] = "Ngày BĐ"
+    rows[HEADER_ROW + 2][first_week - 1] = "Ngày KT"
+
+    n_subjects = _cardinality(n_rows, 1 / 8, 20, 5000)
+    n_lecturers = _cardinality(n_rows, 1 / 13, 15, 3000)
+    n_rooms = _cardinality(n_rows, 1 / 35, 20, 600)
+    subjects = rng.integers(0, n_subjects, n_rows)
+    lecturers = [f"{FAMILY[i % 10]} {MIDDLE[i // 10 % 10]} {GIVEN[i // 100 % 13]}" + (f" {i // 1300}" if i >= 1300 else "")
+                 for i in range(n_lecturers)]
+    rooms = [(100 * (1 + i % 7) + i // 7 % 12 + 1) if i % 9 else f"G0{i % 5 + 1}" for i in range(n_rooms)]
+    patterns = _week_patterns(n_weeks)
+    pattern_choice = rng.choice(len(patterns), n_rows, p=np.array([6, 2, 2, 1, 1, 1, 1]) / 14)
+
+    for i in range(n_rows):
+        subject = int(subjects[i])
+        major = MAJORS[subject % len(MAJORS)]
+        row = blank()
+        row[:len(SOURCE_COLUMNS)] = [
+            i + 1, f"INT{1000 + subject}", f"Học phần {subject}", YEARS[int(rng.integers(0, 4)) if subject % 11 else 3],
+            major, f"{major}{subject % 6 + 1}" if subject % 3 else "", f"{int(rng.integers(1, 40)):02d}",
+            f"{int(rng.integers(1, 4)):02d}" if subject % 4 == 0 else "", "",
+            int(rng.integers(2, 9)), START_PERIODS[int(rng.integers(0, len(START_PERIODS)))], int(rng.integers(1, 5)),
+            lecturers[int(rng.integers(0, n_lecturers))], major, f"Bộ môn {major}", "", "",
+        ]
+        for w in patterns[pattern_choice[i]]:
+            row[first_week + w] = "x"
+        room = int(rng.integers(0, n_rooms))
+        building = BUILDINGS[room % len(BUILDINGS)]
+        row[tail:tail + len(TAIL_COLUMNS) + 1] = [
+            rooms[room] if building != 'Online' else "Seclab", building, subject % 4 + 1, 45, 30,
+        ]
+        rows.append(row)
+    return rows
+
+def synthetic_frame(n_rows, seed=0, calendar=DEFAULT_CALENDAR):
+    """DataFrame giống pd.read_excel(sheet 'TKB CHINH', header=8) của workbook giả lập"""
+    from tkb_reader import rows_to_frame
+
+    return rows_to_frame(synthetic_rows(n_rows, seed, calendar), header=HEADER_ROW)
+
+def write_synthetic_workbook(output_file, n_rows, seed=0, calendar=DEFAULT_CALENDAR):
+    """Ghi workbook TKB giả lập (sheet 'TKB CHINH') để đo cả bước đọc file Excel"""
+    from tkb_writer import write_xlsx_stream
+
+    rows = synthetic_rows(n_rows, seed, calendar)
+    cleaned = ([None if value == "" else value for value in row] for row in rows[1:])
+    write_xlsx_stream(output_file, [('TKB CHINH', rows[0], cleaned)])
+    return output_file
+
+def measure(func, *args, memory=True, **kwargs):
+    """(kết quả, giây, MB bộ nhớ Python cấp phát đỉnh) của func
+
+    Thời gian đo ở lần gọi không bật tracemalloc (tracemalloc làm chậm nhiều lần);
+    memory=True gọi thêm một lần có tracemalloc để lấy bộ nhớ đỉnh, nếu không peak là None.
+    """
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - started
+    if not memory:
+        return result, elapsed, None
+
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak / (1024 * 1024)
+
+def run_benchmark(sizes=DEFAULT_SIZES, seed=0, reference_limit=None, memory=True, workdir=None):
+    """Đo từng bước (đọc, chuyển đổi, hiển thị/thống kê, lưu) trên dữ liệu giả lập mỗi kích thước
+
+    reference_limit: bỏ qua process_schedule_data_improved (vòng lặp từng dòng) khi số dòng lớn hơn.
+    Trả về danh sách kết quả {'rows', 'stage', 'seconds', 'rows_per_s', 'peak_mb'}.
+    """
+    import schedule_converter_fixed as converter
+    from tkb_reader import load_tkb_workbook
+
+    results = []
+
+    def record(n_rows, stage, elapsed, peak_mb):
+        results.append({'rows': n_rows, 'stage': stage, 'seconds': round(elapsed, 4),
+                        'rows_per_s': round(n_rows / elapsed) if elapsed else None,
+                        'peak_mb': None if peak_mb is None else round(peak_mb, 2)})
+        peak_text = "" if peak_mb is None else f"{peak_mb:9.1f} MB"
+        print(f"  {stage:<22} {elapsed:8.3f}s {n_rows / elapsed if elapsed else 0:12.0f} dòng/s {peak_text}")
+
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for n_rows in sizes:
+            print(f"📏 {n_rows} dòng")
+            workbook_file = os.path.join(tmp, f"tkb_{n_rows}.xlsx")
+            write_synthetic_workbook(workbook_file, n_rows, seed)
+
+            workbook, elapsed, peak = measure(load_tkb_workbook, workbook_file, memory=memory)
+            record(n_rows, 'read', elapsed, peak)
+            df, calendar = workbook.frame, workbook.calendar or DEFAULT_CALENDAR
+
+            stages = []
+            with contextlib.redirect_stdout(io.StringIO()):
+                if reference_limit is None or n_rows <= reference_limit:
+                    _, elapsed, peak = measure(converter.process_schedule_data_improved, df, calendar, memory=memory)
+                    stages.append(('process_reference', elapsed, peak))
+                df_result, elapsed, peak = measure(converter.process_schedule_data_vectorized, df, calendar,
+                                                   memory=memory)
+                stages.append(('process_vectorized', elapsed, peak))
+                _, elapsed, peak = measure(converter.display_schedule_table, df_result, memory=memory)
+                stages.append(('display', elapsed, peak))
+                _, elapsed, peak = measure(converter.save_to_excel, df_result,
+                                           os.path.join(tmp, f"out_{n_rows}.xlsx"), memory=memory)
+                stages.append(('save', elapsed, peak))
+            for stage, elapsed, peak in stages:
+                record(n_rows, stage, elapsed, peak)
+    return results
+
+def compare_results(current, previous):
+    """In tỉ lệ thời gian so với file kết quả trước (>1 là chậm hơn)"""
+    before = {(r['rows'], r['stage']): r for r in previous['results']}
+    print(f"📊 So với {previous.get('timestamp', '?')} ({previous.get('label') or 'không nhãn'}):")
+    for result in current['results']:
+        old = before.get((result['rows'], result['stage']))
+        if old and old['seconds']:
+            ratio = result['seconds'] / old['seconds']
+            flag = "⚠️" if ratio > 1.1 else "  "
+            print(f"  {flag} {result['stage']:<22} {result['rows']:>7} dòng: {old['seconds']:.3f}s -> "
+                  f"{result['seconds']:.3f}s (x{ratio:.2f})")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Đo hiệu năng chuyển đổi TKB trên dữ liệu giả lập")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="số dòng dữ liệu mỗi lần đo")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--reference-limit', type=int, default=None,
+                        help="bỏ qua vòng lặp tham chiếu khi số dòng lớn hơn giá trị này")
+    parser.add_argument('--no-memory', action='store_true', help="không đo bộ nhớ đỉnh (chạy nhanh gấp đôi)")
+    parser.add_argument('--output', default="benchmark_results.json", help="file JSON kết quả")
+    parser.add_argument('--label', default=None, help="nhãn phiên bản ghi vào kết quả")
+    parser.add_argument('--compare', default=None, help="file JSON kết quả cũ để so sánh")
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'label': args.label,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'cpu_count': os.cpu_count(),
+        'seed': args.seed,
+        'results': run_benchmark(args.sizes, args.seed, args.reference_limit, memory=not args.no_memory),
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 Đã ghi kết quả vào file: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare_results(report, json.load(f))
+    return report
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,58 @@
+from array import array
+
+import numpy as np
+import pandas as pd
+
+class ColumnBuilder:
+    """Dựng bảng theo cột (struct-of-arrays) thay cho list các dict
+
+    Mỗi dòng được thêm bằng append(...) theo thứ tự self.columns, không tạo dict.
+    Các cột trong `categorical` chỉ lưu mã số nguyên (array 'i') và một bảng giá trị dùng chung,
+    nên chuỗi lặp lại (ngành, khóa, giảng viên, địa điểm...) chỉ được giữ một lần.
+    """
+
+    __slots__ = ('columns', '_slots', '_categories', '_length')
+
+    def __init__(self, columns, categorical=()):
+        self.columns = list(columns)
+        categorical = set(categorical)
+        self._slots = []
+        self._categories = {}
+        for col in self.columns:
+            if col in categorical:
+                self._categories[col] = {}
+                self._slots.append(array('i'))
+            else:
+                self._slots.append([])
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def append(self, *values):
+        """Thêm một dòng; số giá trị phải bằng số cột"""
+        if len(values) != len(self.columns):
+            raise ValueError(f"Cần {len(self.columns)} giá trị, nhận được {len(values)}")
+        for col, slot, value in zip(self.columns, self._slots, values):
+            categories = self._categories.get(col)
+            if categories is None:
+                slot.append(value)
+            else:
+                code = categories.get(value)
+                if code is None:
+                    code = categories[value] = len(categories)
+                slot.append(code)
+        self._length += 1
+
+    def to_frame(self):
+        """DataFrame kết quả: cột categorical dựng từ mã, không tạo lại chuỗi cho từng dòng"""
+        data = {}
+        for col, slot in zip(self.columns, self._slots):
+            categories = self._categories.get(col)
+            if categories is None:
+                data[col] = pd.Series(slot, dtype=object)
+            else:
+                codes = np.frombuffer(slot, dtype=np.int32) if len(slot) else np.zeros(0, dtype=np.int32)
+                values = pd.Index(list(categories), dtype=object)
+                data[col] = pd.Categorical.from_codes(codes, categories=values)
+        return pd.DataFrame(data, columns=self.columns)
@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from semester_calendar import SemesterCalendar
+from tkb_reader import TkbWorkbook, load_tkb_workbook
+
+DEFAULT_CACHE_DIR = ".tkb_cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+CACHE_VERSION = 1
+METADATA_KEY = b"tkb_cache"
+CACHE_SUFFIXES = (".parquet", ".npy")
+
+# Mã kiểu giá trị của cột object hỗn hợp
+TAG_NULL, TAG_STR, TAG_INT, TAG_FLOAT, TAG_BOOL = 0, 1, 2, 3, 4
+
+def _import_pyarrow():
+    """pyarrow là phụ thuộc tùy chọn: None nếu chưa cài"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 của nội dung file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def cache_path(cache_dir, digest, sheet_name, header, categorical=False):
+    """Đường dẫn entry cache cho (nội dung file, sheet, dòng header, dạng category hay không)
+
+    header=None (tự nhận dạng) có entry riêng: dòng tiêu đề được suy ra từ chính nội dung file.
+    """
+    sheet = re.sub(r"[^0-9A-Za-z]+", "_", sheet_name).strip("_") or "sheet"
+    suffix = "-cat" if categorical else ""
+    header_tag = "auto" if header is None else header
+    return os.path.join(cache_dir, f"{digest[:40]}-{sheet}-h{header_tag}{suffix}.parquet")
+
+def _tag_value(value):
+    """(mã kiểu, chuỗi, số) của một ô trong cột object hỗn hợp"""
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NA:
+        return TAG_NULL, None, np.nan
+    if isinstance(value, str):
+        return TAG_STR, value, np.nan
+    if isinstance(value, (bool, np.bool_)):
+        return TAG_BOOL, None, float(value)
+    if isinstance(value, (int, np.integer)):
+        return TAG_INT, None, float(value)
+    if isinstance(value, (float, np.floating)):
+        return TAG_FLOAT, None, float(value)
+    raise TypeError(f"Không lưu được giá trị kiểu {type(value).__name__} vào cache")
+
+def _untag_value(tag, text, number):
+    if tag == TAG_STR:
+        return text
+    if tag == TAG_INT:
+        return int(number)
+    if tag == TAG_FLOAT:
+        return number
+    if tag == TAG_BOOL:
+        return bool(number)
+    return np.nan
+
+def _dtype_name(dtype):
+    """Tên dtype đủ để dựng lại bằng _restore_dtype (phân biệt 'str', 'string' và kiểu Arrow)"""
+    if isinstance(dtype, pd.ArrowDtype):
+        return f"arrow:{dtype.pyarrow_dtype}"
+    if isinstance(dtype, pd.StringDtype) and dtype.na_value is pd.NA:
+        return f"string[{dtype.storage}]"
+    return str(dtype)
+
+def _restore_dtype(column, name):
+    if name.startswith("arrow:"):
+        import pyarrow
+        return column.astype(pd.ArrowDtype(pyarrow.type_for_alias(name[len("arrow:"):])))
+    return column.astype(name)
+
+def _encode_frame(frame):
+    """Tách DataFrame thành các cột vật lý lưu được bằng Arrow và mô tả cột (metadata)"""
+    physical = {}
+    columns = []
+    for i, name in enumerate(frame.columns):
+        if not isinstance(name, (str, int, float)):
+            raise TypeError(f"Không lưu được tên cột kiểu {type(name).__name__} vào cache")
+        series = frame.iloc[:, i]
+        key = f"c{i}"
+        info = {'name': name}
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Cột category: lưu mã số, bảng giá trị (có thể hỗn hợp kiểu) nằm trong metadata
+            physical[key] = series.cat.codes.to_numpy(dtype=np.int32)
+            info['encoding'] = 'categorical'
+            info['categories'] = [[int(tag), text, None if np.isnan(number) else number]
+                                  for tag, text, number in map(_tag_value, series.cat.categories)]
+            info['ordered'] = bool(series.cat.ordered)
+        elif series.dtype == object and not series.map(lambda v: isinstance(v, str), na_action='ignore').dropna().all():
+            # Cột hỗn hợp kiểu (vd. 'x' và số): lưu mã kiểu + phần chuỗi + phần số
+            tagged = [_tag_value(v) for v in series]
+            physical[key + "__tag"] = np.array([t[0] for t in tagged], dtype=np.int8)
+            physical[key] = pd.array([t[1] for t in tagged], dtype="string")
+            physical[key + "__num"] = np.array([t[2] for t in tagged], dtype=np.float64)
+            info['encoding'] = 'tagged'
+        else:
+            physical[key] = series.reset_index(drop=True)
+            info['encoding'] = 'plain'
+            info['dtype'] = _dtype_name(series.dtype)
+        columns.append(info)
+    return pd.DataFrame(physical), columns
+
+def _decode_frame(physical, columns):
+    data = {}
+    for i, info in enumerate(columns):
+        key = f"c{i}"
+        if info['encoding'] == 'tagged':
+            tags = physical[key + "__tag"].to_numpy()
+            texts = physical[key].to_numpy(dtype=object, na_value=None)
+            numbers = physical[key + "__num"].to_numpy()
+            data[i] = pd.Series([_untag_value(t, s, n) for t, s, n in zip(tags, texts, numbers)], dtype=object)
+        elif info['encoding'] == 'categorical':
+            categories = [_untag_value(t, s, np.nan if n is None else n) for t, s, n in info['categories']]
+            data[i] = pd.Categorical.from_codes(physical[key].to_numpy(dtype=np.int32),
+                                                categories=pd.Index(categories), ordered=info['ordered'])
+        else:
+            column = physical[key]
+            if _dtype_name(column.dtype) != info['dtype']:
+                # vd. cột kiểu Arrow được to_pandas() trả về thành kiểu numpy/chuỗi mặc định
+                column = _restore_dtype(column, info['dtype'])
+            data[i] = column
+    frame = pd.DataFrame(data)
+    frame.columns = [info['name'] for info in columns]
+    return frame
+
+def write_frame(frame, path, metadata=None):
+    """Ghi DataFrame ra Parquet (ghi file tạm rồi đổi tên để không để lại file hỏng)"""
+    pa = _import_pyarrow()
+    if pa is None:
+        raise ImportError("Cần cài pyarrow để ghi cache Parquet")
+    physical, columns = _encode_frame(frame)
+    table = pa.Table.from_pandas(physical, preserve_index=False)
+    meta = {'version': CACHE_VERSION, 'columns': columns, 'extra': metadata or {}}
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), METADATA_KEY: json.dumps(meta).encode()})
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pa.parquet.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+def read_frame(path):
+    """Đọc DataFrame đã ghi bằng write_frame (memory-map file); trả về (frame, metadata phụ)"""
+    pa = _import_pyarrow()
+    if pa is None:
+        raise ImportError("Cần cài pyarrow để đọc cache Parquet")
+    table = pa.parquet.read_table(path, memory_map=True)
+    meta = json.loads(table.schema.metadata[METADATA_KEY])
+    if meta.get('version') != CACHE_VERSION:
+        raise ValueError(f"Phiên bản cache không khớp: {meta.get('version')}")
+    return _decode_frame(table.to_pandas(), meta['columns']), meta['extra']
+
+def _entry_files(path):
+    """Các file của một entry cache: bảng .parquet, hoặc ma trận phòng .npy kèm file .npy.json"""
+    files = [path]
+    if path.endswith(".npy") and os.path.exists(f"{path}.json"):
+        files.append(f"{path}.json")
+    return files
+
+def evict_lru(cache_dir, max_bytes, keep=()):
+    """Xóa các entry dùng lâu nhất (theo mtime) cho tới khi tổng dung lượng <= max_bytes
+
+    Entry gồm cache Parquet và ma trận phòng (.npy + .npy.json của tkb_rooms); bỏ qua file tạm đang ghi.
+    """
+    if not os.path.isdir(cache_dir):
+        return []
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(CACHE_SUFFIXES) and ".tmp." not in name:
+            path = os.path.join(cache_dir, name)
+            try:
+                files = _entry_files(path)
+                mtime = os.stat(path).st_mtime
+                size = sum(os.stat(file).st_size for file in files)
+            except OSError:
+                continue
+            entries.append((mtime, size, path, files))
+    total = sum(size for _, size, _, _ in entries)
+    removed = []
+    for mtime, size, path, files in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path in keep:
+            continue
+        for file in files:
+            os.remove(file)
+        total -= size
+        removed.append(path)
+    return removed
+
+def load_cached_workbook(excel_file, sheet_name='TKB CHINH', header=None,
+                         cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, categorical=False):
+    """Như load_tkb_workbook nhưng dùng cache Parquet theo hash nội dung file + dòng header
+
+    Lần chạy lại với cùng file không cần mở openpyxl. Không có pyarrow -> đọc thẳng file Excel.
+    categorical=True trả về các cột CATEGORICAL_SOURCE_COLUMNS dạng category (cache lưu sẵn mã số).
+    """
+    if _import_pyarrow() is None:
+        print("⚠️ Chưa cài pyarrow - bỏ qua cache, đọc trực tiếp file Excel")
+        return load_tkb_workbook(excel_file, sheet_name=sheet_name, header=header, categorical=categorical)
+
+    path = cache_path(cache_dir, file_digest(excel_file), sheet_name, header, categorical)
+    if os.path.exists(path):
+        try:
+            frame, extra = read_frame(path)
+        except Exception as e:
+            print(f"⚠️ Cache hỏng, đọc lại file Excel: {e}")
+        else:
+            os.utime(path)  # đánh dấu vừa dùng (LRU)
+            calendar = SemesterCalendar.from_dict(extra['calendar']) if extra.get('calendar') else None
+            print(f"⚡ Dùng cache: {path}")
+            return TkbWorkbook(sheet_names=extra['sheet_names'], frame=frame, calendar=calendar,
+                               header=extra.get('header', header))
+
+    workbook = load_tkb_workbook(excel_file, sheet_name=sheet_name, header=header, categorical=categorical)
+    if workbook.frame is None:
+        return workbook
+
+    extra = {
+        'source': os.path.basename(excel_file),
+        'sheet_names': workbook.sheet_names,
+        'header': workbook.header,
+        'calendar': workbook.calendar.to_dict() if workbook.calendar is not None else None,
+    }
+    try:
+        write_frame(workbook.frame, path, extra)
+        evict_lru(cache_dir, max_bytes, keep={path})
+    except (TypeError, ValueError, OSError) as e:
+        print(f"⚠️ Không ghi được cache: {e}")
+    return workbook
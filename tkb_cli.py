@@ -0,0 +1,85 @@
+import argparse
+import os
+import sys
+
+# Điểm vào dòng lệnh: `python tkb_cli.py ...`. Chỉ import thư viện chuẩn (tkb_output cũng vậy) ở đầu file:
+# pandas/numpy/openpyxl được nạp sau khi tham số hợp lệ, nên `--help` và lỗi tham số trả về ngay.
+from tkb_output import OUTPUT_FORMATS, format_for_path
+
+DEFAULT_EXCEL_FILE = "0528_TKB_HK1_NAM_HOC_2025_20261-1.xlsx"
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="tkb_cli.py", description="Chuyển đổi thời khóa biểu (sheet TKB) sang bảng từng lớp học phần")
+    parser.add_argument('input', nargs='?', default=DEFAULT_EXCEL_FILE, help="file Excel TKB (mặc định: %(default)s)")
+    parser.add_argument('-s', '--sheet', default='TKB CHINH', help="tên sheet (mặc định: %(default)s)")
+    parser.add_argument('--header', type=int, default=None,
+                        help="dòng tiêu đề, đếm từ 0 (mặc định: tự nhận dạng theo tên cột)")
+    parser.add_argument('-o', '--output', default=None, help="file kết quả (mặc định: tkb_full_data.<định dạng>)")
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default=None,
+                        help="định dạng kết quả; xlsx chỉ để xem, parquet/feather để nạp lại nhanh "
+                             "(mặc định: theo đuôi file -o, hoặc xlsx)")
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help="không in bảng, thống kê và mẫu dữ liệu (nhanh hơn với file lớn)")
+    parser.add_argument('--incremental', action='store_true', help="chỉ chuyển đổi lại các dòng đã thay đổi")
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                        help="số process chuyển đổi song song theo khối dòng, 0 = mọi nhân CPU; không vượt quá số nhân, "
+                             "bảng nhỏ chạy tuần tự (mặc định: %(default)s)")
+    parser.add_argument('--stats', nargs='?', const="tkb_stats.json", default=None, metavar='JSON',
+                        help="ghi thống kê theo ngành, khóa, giảng viên, nhà, phòng ra file JSON")
+    parser.add_argument('--makeup', action='store_true',
+                        help="tính ô tuần có mã học bù ('b', 'bù') là có học")
+    parser.add_argument('--marker', action='append', default=[], metavar='KÝ_HIỆU[=NHÃN]',
+                        help="thêm ký hiệu ô tuần tính là có học, vd. --marker 'o=Học online' (lặp lại được)")
+    parser.add_argument('--profile', nargs='?', const="tkb_profile.json", default=None, metavar='JSON',
+                        help="đo thời gian/bộ nhớ từng bước, ghi ra file JSON")
+    return parser
+
+def parse_args(argv=None):
+    """Đọc và kiểm tra tham số (không cần pandas); lỗi -> in thông báo và thoát mã 2"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not os.path.isfile(args.input):
+        parser.error(f"không tìm thấy file: {args.input}")
+    if args.header is not None and args.header < 0:
+        parser.error("--header phải >= 0")
+    if args.jobs < 0:
+        parser.error("--jobs phải >= 0")
+    for spec in args.marker:
+        if not spec.partition("=")[0].strip():
+            parser.error(f"--marker thiếu ký hiệu: {spec!r}")
+    if args.format is None:
+        args.format = format_for_path(args.output)
+    if args.output is None:
+        args.output = f"tkb_full_data.{args.format}"
+    return args
+
+def build_marker_table(args):
+    """MarkerTable theo --makeup/--marker; None nếu dùng bảng mặc định"""
+    if not (args.makeup or args.marker):
+        return None
+    from tkb_weeks import DEFAULT_MARKERS, MAKEUP_MARKERS, MarkerTable, WeekMarker
+
+    markers = list(DEFAULT_MARKERS) + (list(MAKEUP_MARKERS) if args.makeup else [])
+    for spec in args.marker:
+        text, _, label = spec.partition("=")
+        markers.append(WeekMarker(text.strip(), label.strip() or f"Học ({text.strip()})"))
+    return MarkerTable(markers)
+
+def run(argv=None, main=None):
+    """Chạy chuyển đổi theo tham số dòng lệnh; trả về mã thoát (0 nếu thành công)
+
+    main: hàm main của schedule_converter_fixed khi module đó đã được nạp (chạy như script), để không nạp lại.
+    """
+    args = parse_args(argv)
+
+    if main is None:
+        from schedule_converter_fixed import main
+
+    ok = main(incremental=args.incremental, profile=args.profile, excel_file=args.input, sheet_name=args.sheet,
+              header=args.header, output_file=args.output, output_format=args.format, quiet=args.quiet,
+              jobs=args.jobs, stats_file=args.stats, marker_table=build_marker_table(args))
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(run())
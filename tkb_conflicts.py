@@ -0,0 +1,141 @@
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+CONFLICT_ROOM = "Phòng"
+CONFLICT_LECTURER = "Giảng viên"
+
+# Cột kết quả chuyển đổi dùng làm tài nguyên cho từng loại xung đột
+RESOURCE_COLUMNS = {CONFLICT_ROOM: 'Địa điểm', CONFLICT_LECTURER: 'Giảng viên'}
+
+# Địa điểm không phải phòng thật: phòng "-" (chưa xếp) và phòng học trực tuyến
+SKIP_LOCATIONS = re.compile(r"^Phòng -(,|$)|Nhà Online", re.IGNORECASE)
+
+# Thông tin mỗi dòng trong báo cáo (thêm hậu tố " 1" / " 2")
+DETAIL_COLUMNS = ['STT', 'Lớp', 'Mã lớp', 'Mã môn học', 'Môn học', 'Giảng viên', 'Địa điểm']
+
+PERIOD_RANGE = re.compile(r"^\s*(\d+)\s*-\s*(\d+)\s*$")
+
+def _codes(values):
+    """(mã số nguyên, các giá trị khác nhau) của một cột; cột category dùng luôn mã có sẵn"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(dtype=np.int64), values.cat.categories
+    codes, uniques = pd.factorize(values)
+    return codes.astype(np.int64), uniques
+
+def parse_periods(time_slots):
+    """Tiết bắt đầu/kết thúc từ cột 'Thời gian' ("7-9"); -1 nếu không phải khoảng tiết"""
+    codes, uniques = _codes(time_slots)
+    bounds = np.full((len(uniques) + 1, 2), -1, dtype=np.int64)
+    for i, value in enumerate(uniques):
+        match = PERIOD_RANGE.match(str(value))
+        if match:
+            bounds[i] = int(match.group(1)), int(match.group(2))
+    return bounds[codes, 0], bounds[codes, 1]
+
+def week_masks(week_lists):
+    """Bitmask tuần (bit w <-> tuần w) từ cột 'Tuần học' ("1, 2, 3"); 0 nếu không có tuần"""
+    codes, uniques = _codes(week_lists)
+    masks = np.zeros(len(uniques) + 1, dtype=np.int64)
+    for i, value in enumerate(uniques):
+        for week in str(value).split(","):
+            week = week.strip()
+            if week.isdigit():
+                if int(week) > 62:
+                    raise ValueError(f"Tuần {week} vượt quá giới hạn bitmask")
+                masks[i] |= 1 << int(week)
+    return masks[codes]
+
+def _weeks_of(mask):
+    return [week for week in range(63) if mask >> week & 1]
+
+def sweep_overlaps(resource, day, start, end, masks):
+    """Các cặp dòng (i, j) cùng tài nguyên, cùng thứ, khoảng tiết giao nhau và có tuần chung
+
+    Sắp xếp theo (tài nguyên, thứ, tiết bắt đầu) rồi quét một lượt, chỉ giữ các buổi còn
+    đang diễn ra - không so sánh từng cặp. Mỗi cặp trả về một lần với i < j.
+    """
+    order = np.lexsort((start, day, resource))
+    pairs = []
+    active = []
+    current = None
+    for i in order.tolist():
+        group = (resource[i], day[i])
+        if group != current:
+            current = group
+            active = []
+        active = [j for j in active if end[j] >= start[i]]
+        for j in active:
+            if masks[i] & masks[j]:
+                pairs.append((min(i, j), max(i, j)))
+        active.append(i)
+    return pairs
+
+def find_conflicts(df_result, kinds=(CONFLICT_ROOM, CONFLICT_LECTURER), skip_locations=SKIP_LOCATIONS):
+    """Danh sách trùng phòng / trùng giảng viên trong kết quả process_schedule_data_improved
+
+    Trả về DataFrame, mỗi dòng một cặp buổi học xung đột: loại, tài nguyên, thứ, tiết trùng,
+    tuần trùng và thông tin hai dòng ('Dòng 1'/'Dòng 2' là vị trí dòng trong df_result).
+    Các cặp được sắp theo loại rồi theo vị trí dòng.
+    """
+    start, end = parse_periods(df_result['Thời gian'])
+    masks = week_masks(df_result['Tuần học'])
+    day, _ = _codes(df_result['Thứ'])
+    scheduled = (start >= 0) & (masks != 0) & (day >= 0)
+
+    records = []
+    for kind in kinds:
+        values = df_result[RESOURCE_COLUMNS[kind]]
+        resource, names = _codes(values)
+        usable = np.array([str(name).strip() != "" and str(name) != "Lỗi" for name in names] + [False])
+        if kind == CONFLICT_ROOM and skip_locations is not None:
+            usable &= np.array([not skip_locations.search(str(name)) for name in names] + [True])
+        rows = np.flatnonzero(scheduled & usable[resource])
+        pairs = sweep_overlaps(resource[rows], day[rows], start[rows], end[rows], masks[rows])
+        for a, b in sorted((rows[i], rows[j]) for i, j in pairs):
+            record = {
+                'Loại': kind,
+                'Tài nguyên': str(values.iat[a]),
+                'Thứ': str(df_result['Thứ'].iat[a]),
+                'Tiết trùng': f"{max(start[a], start[b])}-{min(end[a], end[b])}",
+                'Tuần trùng': ", ".join(str(w) for w in _weeks_of(int(masks[a] & masks[b]))),
+                'Dòng 1': int(a),
+                'Dòng 2': int(b),
+            }
+            for suffix, position in ((" 1", a), (" 2", b)):
+                for col in DETAIL_COLUMNS:
+                    if col in df_result.columns:
+                        record[col + suffix] = df_result[col].iat[position]
+            records.append(record)
+
+    columns = ['Loại', 'Tài nguyên', 'Thứ', 'Tiết trùng', 'Tuần trùng', 'Dòng 1', 'Dòng 2']
+    columns += [col + suffix for suffix in (" 1", " 2") for col in DETAIL_COLUMNS if col in df_result.columns]
+    return pd.DataFrame.from_records(records, columns=columns)
+
+def print_conflict_summary(conflicts, limit=10):
+    """In số xung đột theo loại và một vài cặp đầu tiên"""
+    if conflicts.empty:
+        print("✅ Không có trùng phòng / trùng giảng viên")
+        return
+    for kind, count in conflicts['Loại'].value_counts().items():
+        print(f"⚠️ Trùng {kind.lower()}: {count} cặp buổi học")
+    for row in conflicts.head(limit).itertuples(index=False):
+        print(f"  - {row[0]}: {row[1]} - thứ {row[2]}, tiết {row[3]}, tuần {row[4]} "
+              f"(dòng {row[5]} và {row[6]})")
+
+if __name__ == "__main__":
+    from schedule_converter_fixed import process_schedule_data_vectorized, save_to_excel
+    from semester_calendar import DEFAULT_CALENDAR
+    from tkb_cache import load_cached_workbook
+
+    excel_file = sys.argv[1] if len(sys.argv) > 1 else "0528_TKB_HK1_NAM_HOC_2025_20261-1.xlsx"
+    workbook = load_cached_workbook(excel_file, categorical=True)
+    if workbook.frame is None:
+        sys.exit("Không tìm thấy sheet 'TKB CHINH'")
+    schedule = process_schedule_data_vectorized(workbook.frame, workbook.calendar or DEFAULT_CALENDAR)
+    conflicts = find_conflicts(schedule)
+    print_conflict_summary(conflicts)
+    if not conflicts.empty:
+        save_to_excel(conflicts, "tkb_xung_dot.xlsx")
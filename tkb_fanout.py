@@ -0,0 +1,114 @@
+import csv
+import json
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from schedule_converter_fixed import SCHEDULE_COLUMNS
+from tkb_writer import frame_rows, write_xlsx_stream
+
+# Cột nhóm -> thư mục con chứa file của từng nhóm
+FANOUT_GROUPS = {'Lớp': "lop", 'Giảng viên': "giang_vien"}
+
+UNSAFE_FILENAME = re.compile(r'[\\/:*?"<>|\s]+')
+
+def safe_filename(name):
+    """Tên file hợp lệ trên mọi hệ điều hành từ tên lớp / giảng viên"""
+    return UNSAFE_FILENAME.sub("_", str(name)).strip("._") or "khong_ten"
+
+def write_group_file(path, columns, rows, fmt='xlsx'):
+    """Ghi một file thời khóa biểu (xlsx theo luồng hoặc csv); trả về số dòng"""
+    if fmt == 'csv':
+        with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(rows)
+        return len(rows)
+    count, = write_xlsx_stream(path, [("Thời khóa biểu", columns, rows)])
+    return count
+
+def _write_jobs(jobs):
+    """Ghi một lô file (chạy trong worker): mỗi job là (path, columns, rows, fmt)"""
+    return [(path, write_group_file(path, columns, rows, fmt)) for path, columns, rows, fmt in jobs]
+
+def plan_fanout(df_result, output_dir, by=tuple(FANOUT_GROUPS), columns=None, fmt='xlsx'):
+    """Chia kết quả thành các file theo từng cột nhóm bằng MỘT lần groupby mỗi cột
+
+    Trả về (danh sách job ghi file, các dòng manifest) theo thứ tự cột nhóm rồi tên nhóm.
+    Bỏ qua nhóm rỗng và dòng lỗi chuyển đổi ('Lỗi').
+    """
+    columns = columns or [col for col in SCHEDULE_COLUMNS if col in df_result.columns]
+    values = df_result[columns]
+    jobs = []
+    manifest = []
+    for group_col in by:
+        folder = os.path.join(output_dir, FANOUT_GROUPS.get(group_col, safe_filename(group_col)))
+        used_names = set()
+        groups = df_result.groupby(df_result[group_col].astype(str).str.strip(), sort=True, observed=True).indices
+        for name, positions in groups.items():
+            if name in ("", "Lỗi", "nan"):
+                continue
+            filename = safe_filename(name)
+            stem, n = filename, 2
+            while filename.lower() in used_names:
+                filename, n = f"{stem}_{n}", n + 1
+            used_names.add(filename.lower())
+            path = os.path.join(folder, f"{filename}.{fmt}")
+            jobs.append((path, columns, list(frame_rows(values.iloc[positions])), fmt))
+            manifest.append({'Nhóm': group_col, 'Tên': name, 'File': os.path.relpath(path, output_dir),
+                             'Số dòng': len(positions)})
+    return jobs, manifest
+
+def fan_out(df_result, output_dir="tkb_ca_nhan", by=tuple(FANOUT_GROUPS), columns=None, fmt='xlsx',
+            max_workers=None, use_processes=True, jobs_per_task=16):
+    """Ghi mỗi lớp / mỗi giảng viên một file thời khóa biểu, song song trên pool, kèm manifest.json
+
+    Các file được gom thành lô jobs_per_task file cho mỗi lần gửi sang worker để giảm chi phí
+    truyền dữ liệu. Trả về DataFrame manifest (nhóm, tên, đường dẫn tương đối, số dòng).
+    """
+    started = time.perf_counter()
+    jobs, manifest = plan_fanout(df_result, output_dir, by=by, columns=columns, fmt=fmt)
+    for folder in {os.path.dirname(path) for path, *_ in jobs}:
+        os.makedirs(folder, exist_ok=True)
+
+    batches = [jobs[i:i + jobs_per_task] for i in range(0, len(jobs), jobs_per_task)]
+    max_workers = max_workers or min(len(batches), os.cpu_count() or 1) or 1
+    pool = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    written = {}
+    with pool(max_workers=max_workers) as executor:
+        # Giới hạn số lô đang chờ để không giữ toàn bộ dữ liệu đã pickle cùng lúc
+        pending = list(batches)
+        running = set()
+        while pending or running:
+            while pending and len(running) < 2 * max_workers:
+                running.add(executor.submit(_write_jobs, pending.pop(0)))
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                written.update(future.result())
+
+    manifest = pd.DataFrame(manifest, columns=['Nhóm', 'Tên', 'File', 'Số dòng'])
+    manifest_file = os.path.join(output_dir, "manifest.json")
+    os.makedirs(output_dir, exist_ok=True)
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump({'source_rows': len(df_result), 'files': manifest.to_dict(orient='records')},
+                  f, ensure_ascii=False, indent=2)
+
+    elapsed = time.perf_counter() - started
+    print(f"📂 Đã ghi {len(written)} file vào {output_dir} trong {elapsed:.2f}s (manifest: {manifest_file})")
+    return manifest
+
+if __name__ == "__main__":
+    import sys
+
+    from schedule_converter_fixed import process_schedule_data_vectorized
+    from semester_calendar import DEFAULT_CALENDAR
+    from tkb_cache import load_cached_workbook
+
+    excel_file = sys.argv[1] if len(sys.argv) > 1 else "0528_TKB_HK1_NAM_HOC_2025_20261-1.xlsx"
+    workbook = load_cached_workbook(excel_file, categorical=True)
+    if workbook.frame is None:
+        sys.exit("Không tìm thấy sheet 'TKB CHINH'")
+    fan_out(process_schedule_data_vectorized(workbook.frame, workbook.calendar or DEFAULT_CALENDAR))
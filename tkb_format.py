@@ -0,0 +1,121 @@
+import functools
+from collections import Counter
+
+import pandas as pd
+
+# Số mục tối đa của mỗi cache: thực tế chỉ có vài trăm tổ hợp khác nhau
+CACHE_SIZE = 4096
+
+# Số thứ trong file nguồn -> nhãn cột 'Thứ' của kết quả
+DAY_NAMES = {2: "2", 3: "3", 4: "4", 5: "5", 6: "6", 7: "7", 8: "CN"}
+
+# Tên -> hàm đã bọc lru_cache, để cache_stats() đọc số lần trúng/trượt
+_CACHES = {}
+# Số dòng lấy kết quả từ bảng tra (chuyển đổi theo cột) mà không gọi hàm định dạng
+_TABLE_HITS = Counter()
+# Số lần trúng/trượt và số giá trị lớn nhất ghi nhận ở process con (tkb_parallel), cộng vào cache_stats()
+_WORKER_COUNTS = Counter()
+_WORKER_SIZES = Counter()
+
+def memoized(name, maxsize=CACHE_SIZE):
+    """functools.lru_cache có giới hạn, đăng ký theo tên để báo tỉ lệ trúng cache"""
+    def decorator(func):
+        cached = functools.lru_cache(maxsize=maxsize)(func)
+        _CACHES[name] = cached
+        return cached
+    return decorator
+
+def record_table_lookup(name, rows, distinct):
+    """Ghi nhận rows dòng được định dạng qua bảng tra chỉ với distinct lần gọi hàm định dạng"""
+    _TABLE_HITS[name] += max(rows - distinct, 0)
+
+def cache_stats():
+    """{tên: {'hits', 'misses', 'size', 'maxsize', 'hit_rate'}} của các cache định dạng
+
+    Gồm process hiện tại và các process con đã gửi số liệu về qua merge_cache_stats().
+    hits gồm cả lần trúng lru_cache lẫn các dòng lấy từ bảng tra theo giá trị khác nhau,
+    nên hit_rate là tỉ lệ dòng không phải dựng lại chuỗi.
+    """
+    stats = {}
+    for name, cached in _CACHES.items():
+        info = cached.cache_info()
+        hits = info.hits + _TABLE_HITS[name] + _WORKER_COUNTS[name, 'hits']
+        misses = info.misses + _WORKER_COUNTS[name, 'misses']
+        calls = hits + misses
+        stats[name] = {'hits': hits, 'misses': misses, 'size': max(info.currsize, _WORKER_SIZES[name]),
+                       'maxsize': info.maxsize, 'hit_rate': round(hits / calls, 4) if calls else None}
+    return stats
+
+def cache_counts():
+    """{tên: (hits, misses, size)} của riêng process hiện tại, để process con tính phần chênh lệch"""
+    counts = {}
+    for name, cached in _CACHES.items():
+        info = cached.cache_info()
+        counts[name] = (info.hits + _TABLE_HITS[name], info.misses, info.currsize)
+    return counts
+
+def counts_since(before):
+    """Số lần trúng/trượt từ lần cache_counts() trước (dạng merge_cache_stats() nhận)"""
+    return {name: {'hits': hits - before[name][0], 'misses': misses - before[name][1], 'size': size}
+            for name, (hits, misses, size) in cache_counts().items()}
+
+def merge_cache_stats(stats):
+    """Cộng số lần trúng/trượt ghi nhận ở process con vào cache_stats() của process này"""
+    for name, info in stats.items():
+        _WORKER_COUNTS[name, 'hits'] += info['hits']
+        _WORKER_COUNTS[name, 'misses'] += info['misses']
+        _WORKER_SIZES[name] = max(_WORKER_SIZES[name], info['size'])
+
+def clear_caches():
+    for cached in _CACHES.values():
+        cached.cache_clear()
+    _TABLE_HITS.clear()
+    _WORKER_COUNTS.clear()
+    _WORKER_SIZES.clear()
+
+def print_cache_stats(stats=None):
+    stats = cache_stats() if stats is None else stats
+    print("\n🧮 Cache định dạng:")
+    for name, info in stats.items():
+        rate = f"{info['hit_rate']:.1%}" if info['hit_rate'] is not None else "-"
+        print(f"  {name:<12} trúng {info['hits']:>8} / {info['hits'] + info['misses']:>8} lần ({rate}), "
+              f"{info['size']} giá trị")
+
+@memoized('day_name')
+def _day_name(day):
+    return DAY_NAMES.get(day, f"Thứ {day}")
+
+def day_name(day_num):
+    """Nhãn thứ: 2..7 -> "2".."7", 8 -> "CN", ô trống -> "" """
+    if pd.isna(day_num):
+        return ""
+    return _day_name(int(day_num))
+
+@memoized('period_range')
+def _period_range(start_period, num_periods):
+    try:
+        return f"{int(start_period)}-{int(start_period) + int(num_periods) - 1}"
+    except (TypeError, ValueError, OverflowError):
+        return f"{start_period}"
+
+def period_range(start_period, num_periods):
+    """'Thời gian' từ (Tiết BĐ, Số tiết): "BĐ-KT", giữ nguyên tiết BĐ nếu không đổi được sang số"""
+    if pd.isna(start_period) or pd.isna(num_periods):
+        return ""
+    return _period_range(start_period, num_periods)
+
+@memoized('location')
+def location_label(room, building):
+    """"Phòng X, Nhà Y" / "Phòng X" / "Nhà Y" """
+    if room and building:
+        return f"Phòng {room}, Nhà {building}"
+    if room:
+        return f"Phòng {room}"
+    if building:
+        return f"Nhà {building}"
+    return ""
+
+@memoized('week_list')
+def week_list_label(weeks):
+    """'Tuần học' từ tuple số tuần: "1, 2, 3" """
+    return ", ".join(f"{w}" for w in weeks)
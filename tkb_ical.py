@@ -0,0 +1,151 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+from semester_calendar import DEFAULT_CALENDAR
+from tkb_conflicts import parse_periods, week_masks
+from tkb_rooms import day_index
+
+TIMEZONE = "Asia/Ho_Chi_Minh"
+
+# Giờ bắt đầu / kết thúc của từng tiết (tiết -> ("HH:MM", "HH:MM")); sửa theo lịch của trường
+PERIOD_TIMES = {
+    1: ("07:00", "07:50"), 2: ("07:50", "08:40"), 3: ("08:50", "09:40"), 4: ("09:50", "10:40"),
+    5: ("10:40", "11:30"), 6: ("12:30", "13:20"), 7: ("13:20", "14:10"), 8: ("14:20", "15:10"),
+    9: ("15:20", "16:10"), 10: ("16:10", "17:00"), 11: ("17:10", "18:00"), 12: ("18:00", "18:50"),
+    13: ("18:50", "19:40"), 14: ("19:50", "20:40"), 15: ("20:40", "21:30"),
+}
+
+VTIMEZONE = [
+    "BEGIN:VTIMEZONE", f"TZID:{TIMEZONE}",
+    "BEGIN:STANDARD", "DTSTART:19700101T000000", "TZOFFSETFROM:+0700", "TZOFFSETTO:+0700", "TZNAME:ICT",
+    "END:STANDARD", "END:VTIMEZONE",
+]
+
+def escape_text(value):
+    """Escape giá trị TEXT theo RFC 5545"""
+    return (str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+def fold_line(line):
+    """Gập dòng dài hơn 75 byte (không cắt giữa ký tự UTF-8), kết thúc bằng CRLF"""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return data + b"\r\n"
+    parts = []
+    start, limit = 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(data[start:end])
+        start, limit = end, 74  # dòng tiếp theo bắt đầu bằng một dấu cách
+    return b"\r\n ".join(parts) + b"\r\n"
+
+def week_recurrence(dates):
+    """Nén danh sách ngày học (tăng dần) thành (ngày đầu, số lần lặp hằng tuần, EXDATE, RDATE)
+
+    Các ngày nằm trên lưới 7 ngày tính từ ngày đầu được phủ bởi RRULE:FREQ=WEEKLY;COUNT=n,
+    các tuần nghỉ ở giữa thành EXDATE; ngày lệch khỏi lưới (lịch không đều) thành RDATE.
+    """
+    first, last = dates[0], dates[-1]
+    count = (last - first).days // 7 + 1
+    active = set(dates)
+    grid = [first + timedelta(weeks=k) for k in range(count)]
+    exdates = [d for d in grid if d not in active]
+    rdates = [d for d in dates if (d - first).days % 7]
+    return first, count, exdates, rdates
+
+def _stamp(day, clock):
+    return f"{day:%Y%m%d}T{clock.replace(':', '')}00"
+
+def iter_ics_events(df_result, calendar=DEFAULT_CALENDAR, period_times=PERIOD_TIMES, skipped=None):
+    """Sinh lần lượt từng VEVENT (danh sách dòng) cho mỗi dòng thời khóa biểu có lịch
+
+    Dòng không có thứ, khoảng tiết trong period_times hoặc tuần học sẽ bị bỏ qua
+    (vị trí dòng được thêm vào list `skipped` nếu truyền vào).
+    """
+    monday_of_week = {int(w): m.astype(object) for w, m in zip(calendar.week_numbers, calendar.mondays)}
+    start, end = parse_periods(df_result['Thời gian'])
+    masks = week_masks(df_result['Tuần học'])
+    dtstamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    mondays_by_mask = {}
+    columns = list(df_result.columns)
+    get = {col: columns.index(col) for col in columns}
+    for position, row in enumerate(df_result.itertuples(index=False, name=None)):
+        day = day_index(row[get['Thứ']])
+        mask = int(masks[position])
+        first_period, last_period = int(start[position]), int(end[position])
+        if day is None or not mask or first_period not in period_times or last_period not in period_times:
+            if skipped is not None:
+                skipped.append(position)
+            continue
+
+        mondays = mondays_by_mask.get(mask)
+        if mondays is None:
+            mondays = mondays_by_mask[mask] = [monday_of_week[w] for w in sorted(monday_of_week) if mask >> w & 1]
+        dates = sorted(monday + timedelta(days=day) for monday in mondays)
+        first, count, exdates, rdates = week_recurrence(dates)
+        begin_clock, end_clock = period_times[first_period][0], period_times[last_period][1]
+
+        text = {col: str(row[i]) for col, i in get.items()}
+        uid = hashlib.sha1("|".join(text.values()).encode('utf-8')).hexdigest()[:20]
+        lines = [
+            "BEGIN:VEVENT",
+            f"UID:{position}-{uid}@tkb",
+            f"DTSTAMP:{dtstamp}",
+            f"DTSTART;TZID={TIMEZONE}:{_stamp(first, begin_clock)}",
+            f"DTEND;TZID={TIMEZONE}:{_stamp(first, end_clock)}",
+        ]
+        if count > 1:
+            lines.append(f"RRULE:FREQ=WEEKLY;COUNT={count}")
+        if exdates:
+            lines.append(f"EXDATE;TZID={TIMEZONE}:" + ",".join(_stamp(d, begin_clock) for d in exdates))
+        if rdates:
+            lines.append(f"RDATE;TZID={TIMEZONE}:" + ",".join(_stamp(d, begin_clock) for d in rdates))
+        summary = text.get('Môn học', "")
+        if text.get('Mã môn học'):
+            summary += f" ({text['Mã môn học']}" + (f" - nhóm {text['Mã lớp']}" if text.get('Mã lớp') else "") + ")"
+        lines.append(f"SUMMARY:{escape_text(summary)}")
+        if text.get('Địa điểm'):
+            lines.append(f"LOCATION:{escape_text(text['Địa điểm'])}")
+        description = [f"Tiết: {first_period}-{last_period}", f"Tuần: {text.get('Tuần học', '')}"]
+        for col in ('Giảng viên', 'Lớp', 'Ngành', 'Khóa', 'Ghi chú'):
+            if text.get(col):
+                description.append(f"{col}: {text[col]}")
+        lines.append(f"DESCRIPTION:{escape_text(chr(10).join(description))}")
+        lines.append("END:VEVENT")
+        yield lines
+
+def write_ics(df_result, output_file="tkb_full_data.ics", calendar=DEFAULT_CALENDAR, period_times=PERIOD_TIMES,
+              name="Thời khóa biểu"):
+    """Ghi file .ics theo luồng: mỗi dòng thời khóa biểu là một VEVENT lặp hằng tuần
+
+    Trả về (số sự kiện đã ghi, danh sách vị trí dòng bị bỏ qua).
+    """
+    skipped = []
+    count = 0
+    with open(output_file, 'wb') as f:
+        for line in ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//TKB//schedule_converter//VI",
+                     "CALSCALE:GREGORIAN", f"X-WR-CALNAME:{escape_text(name)}", f"X-WR-TIMEZONE:{TIMEZONE}",
+                     *VTIMEZONE]:
+            f.write(fold_line(line))
+        for lines in iter_ics_events(df_result, calendar, period_times, skipped):
+            f.write(b"".join(fold_line(line) for line in lines))
+            count += 1
+        f.write(fold_line("END:VCALENDAR"))
+    print(f"📆 Đã ghi {count} sự kiện vào file: {output_file} (bỏ qua {len(skipped)} dòng không có lịch)")
+    return count, skipped
+
+if __name__ == "__main__":
+    import sys
+
+    from schedule_converter_fixed import process_schedule_data_vectorized
+    from tkb_cache import load_cached_workbook
+
+    excel_file = sys.argv[1] if len(sys.argv) > 1 else "0528_TKB_HK1_NAM_HOC_2025_20261-1.xlsx"
+    workbook = load_cached_workbook(excel_file, categorical=True)
+    if workbook.frame is None:
+        sys.exit("Không tìm thấy sheet 'TKB CHINH'")
+    calendar = workbook.calendar or DEFAULT_CALENDAR
+    write_ics(process_schedule_data_vectorized(workbook.frame, calendar), calendar=calendar)
@@ -0,0 +1,161 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from schedule_converter_fixed import CATEGORICAL_COLUMNS, process_schedule_data_vectorized
+from semester_calendar import DEFAULT_CALENDAR
+from tkb_cache import _import_pyarrow, read_frame, write_frame
+from tkb_reader import categorize_columns
+from tkb_weeks import DEFAULT_MARKER_TABLE
+
+# Khóa nhận diện một dòng nguồn giữa các lần phát hành file TKB
+KEY_COLUMNS = ['TT', 'Mã môn học', 'Nhóm']
+STATE_VERSION = 1
+
+# Đuôi file trạng thái / danh sách thay đổi, đặt cạnh file kết quả (tkb_full_data.xlsx -> tkb_full_data.state.parquet)
+STATE_SUFFIX = ".state.parquet"
+CHANGES_SUFFIX = ".changes.csv"
+
+STATUS_ADDED = "Thêm mới"
+STATUS_CHANGED = "Thay đổi"
+STATUS_REMOVED = "Đã xóa"
+
+def row_fingerprints(df):
+    """Khóa ('TT'|'Mã môn học'|'Nhóm') và hash nội dung của từng dòng nguồn"""
+    parts = []
+    for col in KEY_COLUMNS:
+        if col in df.columns:
+            parts.append(df[col].astype(str).where(df[col].notna(), "").astype(object))
+        else:
+            parts.append(pd.Series("", index=df.index, dtype=object))
+    keys = parts[0].str.cat(parts[1:], sep="|")
+    hashes = pd.util.hash_pandas_object(df, index=False)
+    return pd.DataFrame({'_key': keys.to_numpy(), '_hash': hashes.to_numpy()})
+
+def diff_fingerprints(current, previous):
+    """Ghép dòng hiện tại với dòng lần trước theo khóa
+
+    Trong cùng một khóa, dòng có hash giống nhau được coi là không đổi; các dòng còn lại
+    ghép theo thứ tự xuất hiện là "thay đổi", phần dư là "thêm mới" / "đã xóa".
+    Trả về (status, previous_position, removed_positions); status[i] là "" nếu không đổi.
+    """
+    unmatched = {}
+    for position, (key, value) in enumerate(zip(previous['_key'], previous['_hash'])):
+        unmatched.setdefault(key, {}).setdefault(value, []).append(position)
+
+    count = len(current)
+    status = np.full(count, "", dtype=object)
+    previous_position = np.full(count, -1, dtype=np.int64)
+    pending = []
+    for i, (key, value) in enumerate(zip(current['_key'], current['_hash'])):
+        same_hash = unmatched.get(key, {}).get(value)
+        if same_hash:
+            previous_position[i] = same_hash.pop(0)
+        else:
+            pending.append(i)
+
+    leftovers = {}
+    for key, by_hash in unmatched.items():
+        positions = sorted(p for group in by_hash.values() for p in group)
+        if positions:
+            leftovers[key] = positions
+    for i in pending:
+        positions = leftovers.get(current['_key'].iat[i])
+        if positions:
+            previous_position[i] = positions.pop(0)
+            status[i] = STATUS_CHANGED
+        else:
+            status[i] = STATUS_ADDED
+    removed = sorted(p for positions in leftovers.values() for p in positions)
+    return status, previous_position, removed
+
+def incremental_paths(output_file):
+    """(file trạng thái, file danh sách thay đổi) của một file kết quả, cùng thư mục và tên gốc"""
+    stem = os.path.splitext(output_file)[0]
+    return stem + STATE_SUFFIX, stem + CHANGES_SUFFIX
+
+def _load_state(state_file, calendar, source_columns, source=None, marker_table=DEFAULT_MARKER_TABLE):
+    """Kết quả lần chạy trước nếu còn dùng được (cùng file nguồn, lịch tuần, bảng ký hiệu tuần và cột nguồn)"""
+    if not os.path.exists(state_file):
+        return None
+    try:
+        state, extra = read_frame(state_file)
+    except Exception as e:
+        print(f"⚠️ Không đọc được trạng thái lần trước, chuyển đổi lại toàn bộ: {e}")
+        return None
+    if (extra.get('version') != STATE_VERSION
+            or extra.get('calendar') != calendar.to_dict()
+            or extra.get('markers') != marker_table.to_dict()
+            or extra.get('source_columns') != source_columns):
+        print("ℹ️ Lịch tuần, bảng ký hiệu tuần hoặc cấu trúc cột đã đổi - chuyển đổi lại toàn bộ")
+        return None
+    if extra.get('source') != source:
+        print(f"ℹ️ Trạng thái lần trước thuộc file nguồn khác ({extra.get('source')}) - chuyển đổi lại toàn bộ")
+        return None
+    return state
+
+def convert_incremental(df, calendar=DEFAULT_CALENDAR, state_file="tkb_full_data.state.parquet",
+                        changes_file="tkb_full_data.changes.csv", source=None, marker_table=DEFAULT_MARKER_TABLE):
+    """Chỉ chuyển đổi lại các dòng thêm mới/thay đổi so với lần chạy trước
+
+    Trả về (kết quả đầy đủ theo thứ tự dòng nguồn, DataFrame các thay đổi).
+    Trạng thái (kết quả + khóa + hash) lưu ở state_file, danh sách thay đổi ghi ra changes_file
+    (xem incremental_paths). source: tên file nguồn; trạng thái của file nguồn khác bị bỏ qua.
+    marker_table: bảng ký hiệu ô tuần; đổi bảng thì chuyển đổi lại toàn bộ.
+    """
+    source_columns = [str(col) for col in df.columns]
+    fingerprints = row_fingerprints(df)
+
+    if _import_pyarrow() is None:
+        print("⚠️ Chưa cài pyarrow - không lưu được trạng thái, chuyển đổi toàn bộ")
+        return process_schedule_data_vectorized(df, calendar, marker_table), None
+
+    previous = _load_state(state_file, calendar, source_columns, source, marker_table)
+    if previous is None:
+        previous = pd.DataFrame({'_key': pd.Series([], dtype=object), '_hash': pd.Series([], dtype=np.uint64)})
+
+    status, previous_position, removed = diff_fingerprints(fingerprints, previous)
+    to_convert = status != ""
+    n_added = int((status == STATUS_ADDED).sum())
+    print(f"🔁 So với lần trước: {n_added} dòng mới, {int(to_convert.sum()) - n_added} dòng thay đổi, "
+          f"{len(removed)} dòng đã xóa")
+
+    # Chuyển đổi lại chỉ các dòng mới/thay đổi, các dòng còn lại lấy từ kết quả lần trước
+    converted = process_schedule_data_vectorized(df[to_convert], calendar, marker_table)
+    converted.index = np.flatnonzero(to_convert)
+    output_columns = list(converted.columns)
+    reused = previous.iloc[previous_position[~to_convert]][output_columns] if (~to_convert).any() else None
+    if reused is not None:
+        reused.index = np.flatnonzero(~to_convert)
+        # Bảng categories của hai phần khác nhau -> concat trả về object, chuyển lại category
+        result = categorize_columns(pd.concat([converted, reused]).sort_index(), CATEGORICAL_COLUMNS)
+    else:
+        result = converted
+
+    # Danh sách thay đổi: dòng mới/thay đổi lấy kết quả mới, dòng đã xóa lấy kết quả cũ
+    changes = converted.assign(**{'Trạng thái': status[to_convert]})
+    changes.index = fingerprints['_key'][to_convert].to_numpy()
+    if removed:
+        old_rows = previous.iloc[removed].set_index('_key')[output_columns]
+        changes = pd.concat([changes, old_rows.assign(**{'Trạng thái': STATUS_REMOVED})])
+        categorize_columns(changes, CATEGORICAL_COLUMNS)
+    changes = changes[['Trạng thái'] + output_columns]
+    changes.index.name = 'Khóa dòng'
+
+    if changes_file:
+        changes.to_csv(changes_file, encoding='utf-8-sig')
+        print(f"📝 Đã ghi {len(changes)} thay đổi vào file: {changes_file}")
+
+    state = result.reset_index(drop=True)
+    state.insert(0, '_key', fingerprints['_key'].to_numpy())
+    state['_hash'] = fingerprints['_hash'].to_numpy()
+    write_frame(state, state_file, {
+        'version': STATE_VERSION,
+        'calendar': calendar.to_dict(),
+        'markers': marker_table.to_dict(),
+        'source_columns': source_columns,
+        'source': source,
+    })
+
+    return result.reset_index(drop=True), changes
@@ -0,0 +1,142 @@
+import os
+
+# Định dạng -> (hàm ghi, các đuôi file). Chỉ dùng thư viện chuẩn ở đây để tkb_cli import được ngay;
+# pandas/pyarrow/xlsxwriter được nạp trong từng hàm ghi.
+WRITERS = {}
+EXTENSIONS = {}
+
+DEFAULT_CSV_CHUNK_ROWS = 50000
+
+def register_writer(fmt, extensions=()):
+    """Decorator đăng ký hàm ghi writer(df, output_file, **options) -> số dòng đã ghi"""
+    def decorator(func):
+        WRITERS[fmt] = func
+        for extension in (fmt, *extensions):
+            EXTENSIONS[extension.lower()] = fmt
+        return func
+    return decorator
+
+def format_for_path(output_file, default='xlsx'):
+    """Định dạng suy ra từ đuôi file (vd. '.parquet' -> 'parquet'), không rõ -> default"""
+    extension = os.path.splitext(output_file or "")[1].lower().lstrip(".")
+    return EXTENSIONS.get(extension, default)
+
+def write_output(df_result, output_file, output_format=None, **options):
+    """Ghi kết quả bằng writer của định dạng (mặc định suy ra từ đuôi file); trả về số dòng"""
+    output_format = output_format or format_for_path(output_file)
+    writer = WRITERS.get(output_format)
+    if writer is None:
+        raise ValueError(f"Định dạng không hỗ trợ: {output_format} (chọn một trong {list(WRITERS)})")
+    return writer(df_result, output_file, **options)
+
+def _replace_atomically(write, output_file):
+    """Ghi vào file tạm rồi đổi tên, để người đọc không thấy file ghi dở"""
+    tmp_path = f"{output_file}.{os.getpid()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, output_file)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _is_blank(value):
+    return isinstance(value, str) and not value.strip()
+
+def _is_number(value):
+    import numbers
+
+    return isinstance(value, numbers.Number) and not isinstance(value, bool)
+
+def _numeric_array(series):
+    """Mảng số nullable nếu cột chỉ gồm số và ô trống (NaN/None/""), ngược lại None"""
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+
+    raw = series.to_numpy(dtype=object)
+    missing = pd.isna(raw) | np.array([_is_blank(value) for value in raw], dtype=bool)
+    values = raw[~missing]
+    if not len(values) or not all(_is_number(value) for value in values):
+        return None
+    filled = np.zeros(len(raw))
+    filled[~missing] = values.astype(float)
+    if np.isfinite(filled).all() and (filled == np.round(filled)).all() and (np.abs(filled) < 2 ** 53).all():
+        return pa.array(filled.astype(np.int64), mask=missing, type=pa.int64())
+    return pa.array(filled, mask=missing, type=pa.float64())
+
+def arrow_table(df_result, dictionary_threshold=0.5):
+    """pyarrow.Table của kết quả: cột chuỗi lặp nhiều được mã hóa dictionary
+
+    Cột category giữ nguyên dạng dictionary; cột object chỉ chứa chuỗi thành string
+    (dictionary nếu số giá trị khác nhau / số dòng <= dictionary_threshold); cột object chỉ có
+    số và ô trống (vd. 'Số tín chỉ' có cả số và "") thành cột số nullable (int64, hoặc float64
+    nếu có số lẻ); chỉ cột hỗn hợp thật sự (vd. ô tuần gốc có cả 'x' và số) mới ghi dạng chuỗi.
+    """
+    import pandas as pd
+    import pyarrow as pa
+
+    arrays = []
+    for name in df_result.columns:
+        series = df_result[name]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categories = series.cat.categories
+            if not all(isinstance(value, str) for value in categories):
+                series = pd.Categorical.from_codes(series.cat.codes, categories=[str(value) for value in categories])
+            arrays.append(pa.array(series))
+            continue
+        if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+            non_null = series.dropna()
+            if not non_null.map(lambda value: isinstance(value, str)).all():
+                numeric = _numeric_array(series)
+                if numeric is not None:
+                    arrays.append(numeric)
+                    continue
+                series = series.map(str, na_action='ignore')
+            array = pa.array(series.astype(object), type=pa.string(), from_pandas=True)
+            if len(series) and series.nunique() <= dictionary_threshold * len(series):
+                array = array.dictionary_encode()
+            arrays.append(array)
+            continue
+        arrays.append(pa.array(series, from_pandas=True))
+    return pa.Table.from_arrays(arrays, names=[str(name) for name in df_result.columns])
+
+@register_writer('xlsx', extensions=('xlsm',))
+def write_xlsx(df_result, output_file, sheet_name='Sheet1'):
+    """Excel ghi theo luồng (xlsxwriter constant_memory / openpyxl write-only)"""
+    from tkb_writer import frame_rows, write_xlsx_stream
+
+    count, = write_xlsx_stream(output_file, [(sheet_name, list(df_result.columns), frame_rows(df_result))])
+    return count
+
+@register_writer('csv', extensions=('txt',))
+def write_csv(df_result, output_file, chunk_rows=DEFAULT_CSV_CHUNK_ROWS, encoding='utf-8-sig'):
+    """CSV ghi từng khối chunk_rows dòng (bộ nhớ tạm chỉ cỡ một khối)"""
+    def write(path):
+        with open(path, 'w', newline='', encoding=encoding) as f:
+            df_result.head(0).to_csv(f, index=False)
+            for start in range(0, len(df_result), chunk_rows):
+                df_result.iloc[start:start + chunk_rows].to_csv(f, index=False, header=False)
+
+    _replace_atomically(write, output_file)
+    return len(df_result)
+
+@register_writer('parquet', extensions=('pq',))
+def write_parquet(df_result, output_file, compression='zstd', row_group_rows=100000):
+    """Parquet, cột chuỗi lặp nhiều dạng dictionary (đọc lại bằng pandas thành category)"""
+    import pyarrow.parquet as pq
+
+    table = arrow_table(df_result)
+    _replace_atomically(lambda path: pq.write_table(table, path, compression=compression,
+                                                    row_group_size=row_group_rows), output_file)
+    return table.num_rows
+
+@register_writer('feather', extensions=('arrow', 'ipc'))
+def write_feather(df_result, output_file, compression='lz4'):
+    """Feather v2 / Arrow IPC (đọc lại được bằng memory-map, không cần giải mã)"""
+    import pyarrow.feather as feather
+
+    table = arrow_table(df_result)
+    _replace_atomically(lambda path: feather.write_feather(table, path, compression=compression), output_file)
+    return table.num_rows
+
+OUTPUT_FORMATS = list(WRITERS)
@@ -0,0 +1,181 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from schedule_converter_fixed import _convert_columns, process_schedule_data_vectorized
+from semester_calendar import DEFAULT_CALENDAR
+from tkb_format import cache_counts, counts_since, merge_cache_stats
+from tkb_weeks import DEFAULT_MARKER_TABLE
+
+DEFAULT_CHUNK_ROWS = 25000
+# Dưới số dòng này chạy tuần tự: chi phí khởi động process và vùng nhớ chung lớn hơn phần tiết kiệm được
+MIN_PARALLEL_ROWS = 2 * DEFAULT_CHUNK_ROWS
+# Cột nguồn _convert_columns đọc (ngoài các cột tuần của lịch)
+SOURCE_COLUMNS = ['TT', 'Lớp', 'Nhóm', 'Thứ', 'Tiết BĐ', 'Số tiết', 'Giảng viên giảng dạy', 'Tên môn học/ học phần',
+                  'Mã môn học', 'Khóa', 'Ngành', 'Phòng', 'Nhà', 'Số TC', 'Ghi chú']
+ORIGINAL_PREFIX = "Gốc_"
+# Cột kết quả có số giá trị khác nhau / số dòng lớn hơn ngưỡng này được gửi về nguyên dạng
+PACK_THRESHOLD = 0.5
+
+# Trạng thái của process con, đặt một lần trong _init_worker
+_WORKER = {}
+
+def _categories(uniques):
+    """Bảng categories kiểu object (giữ nguyên kiểu Python của từng giá trị, gộp được giữa các khối)"""
+    return pd.Index(np.asarray(uniques, dtype=object), dtype=object)
+
+def plan_layout(df, columns):
+    """Vị trí từng cột trong vùng nhớ chung: [(tên, dtype gốc, dtype lưu, offset byte)], tổng số byte
+
+    Cột số được chép nguyên giá trị; cột văn bản/hỗn hợp lưu mã int32 (factorize theo khối),
+    cột category lưu mã của chính nó.
+    """
+    layout, offset = [], 0
+    for col in columns:
+        dtype = df[col].dtype
+        stored = dtype if isinstance(dtype, np.dtype) and dtype.kind in "biuf" else np.dtype(np.int32)
+        layout.append((col, dtype, stored, offset))
+        offset += stored.itemsize * len(df)
+    return layout, offset
+
+def _column_views(buffer, layout, n_rows):
+    return [np.ndarray(n_rows, dtype=stored, buffer=buffer, offset=offset) for _, _, stored, offset in layout]
+
+def encode_chunk(df, layout, views, start, stop):
+    """Ghi các dòng [start, stop) vào vùng nhớ chung; trả về bảng giá trị của các cột được factorize"""
+    categories = {}
+    for (col, dtype, stored, _), view in zip(layout, views):
+        values = df[col].iloc[start:stop]
+        if isinstance(dtype, pd.CategoricalDtype):
+            view[start:stop] = values.cat.codes.to_numpy()
+        elif stored == dtype:
+            view[start:stop] = values.to_numpy()
+        else:
+            codes, uniques = pd.factorize(values)
+            view[start:stop] = codes
+            categories[col] = _categories(uniques)
+    return categories
+
+def decode_chunk(layout, views, start, stop, categories):
+    """DataFrame các dòng [start, stop) dựng lại từ vùng nhớ chung (cùng giá trị và dtype với gốc)"""
+    index = pd.RangeIndex(start, stop)
+    data = {}
+    for (col, dtype, stored, _), view in zip(layout, views):
+        values = view[start:stop]
+        if isinstance(dtype, pd.CategoricalDtype):
+            data[col] = pd.Series(pd.Categorical.from_codes(values, dtype=dtype), index=index)
+        elif stored == dtype:
+            data[col] = pd.Series(values.copy(), index=index)
+        else:
+            data[col] = pd.Series(pd.Categorical.from_codes(values, categories=categories[col]), index=index).astype(dtype)
+    return pd.DataFrame(data, index=index)
+
+def _attach(name):
+    """Mở vùng nhớ chung đã có (process cha tạo và xóa nó)
+
+    Trước Python 3.13 process con dùng chung resource tracker với process cha, nên đăng ký lại
+    cùng tên là vô hại; từ 3.13 thì tắt hẳn theo dõi bằng track=False.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+def _init_worker(name, layout, n_rows, calendar, marker_table):
+    memory = _attach(name)
+    _WORKER.update(memory=memory, layout=layout, views=_column_views(memory.buf, layout, n_rows), calendar=calendar,
+                   marker_table=marker_table)
+
+def _convert_chunk(start, stop, categories):
+    """Chuyển đổi một khối dòng; cột lặp nhiều giá trị được gửi về dạng category cho nhẹ
+
+    Trả về (cột, dtype, vị trí các dòng lỗi trong toàn bảng, số lần trúng/trượt cache định dạng của khối).
+    """
+    before = cache_counts()
+    frame = decode_chunk(_WORKER['layout'], _WORKER['views'], start, stop, categories)
+    error_rows = []
+    result = _convert_columns(frame, _WORKER['calendar'], error_rows, _WORKER['marker_table'])
+    packed, dtypes = {}, {}
+    for col, values in result.items():
+        if col.startswith(ORIGINAL_PREFIX):
+            continue
+        dtypes[col] = values.dtype
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            codes, uniques = pd.factorize(values)
+            if len(uniques) <= PACK_THRESHOLD * len(values):
+                values = pd.Categorical.from_codes(codes, categories=_categories(uniques))
+            else:
+                values = values.to_numpy(dtype=object)
+        else:
+            values = values.array
+        packed[col] = values
+    return packed, dtypes, [start + row for row in error_rows], counts_since(before)
+
+def _combine(chunks):
+    """Ghép các khối theo thứ tự, gộp bảng categories và trả các cột về dtype như khi chạy tuần tự"""
+    dtypes = chunks[0][1]
+    combined = {}
+    for col, dtype in dtypes.items():
+        parts = [packed[col] for packed, *_ in chunks]
+        if all(isinstance(part, pd.Categorical) for part in parts):
+            union = union_categoricals(parts)
+            values = pd.Series(pd.Categorical.from_codes(union.codes, categories=_categories(union.categories)))
+            combined[col] = values if isinstance(dtype, pd.CategoricalDtype) else values.astype(dtype)
+        else:
+            combined[col] = pd.Series(np.concatenate([np.asarray(part, dtype=object) for part in parts]), dtype=dtype)
+    return pd.DataFrame(combined)
+
+def available_cpus():
+    """Số nhân CPU process này được phép chạy (theo affinity nếu hệ điều hành hỗ trợ)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+def convert_parallel(df, calendar=DEFAULT_CALENDAR, max_workers=None, chunk_rows=DEFAULT_CHUNK_ROWS,
+                     min_rows=MIN_PARALLEL_ROWS, marker_table=DEFAULT_MARKER_TABLE):
+    """Như process_schedule_data_vectorized nhưng chia khối chunk_rows dòng cho nhiều process
+
+    Cột nguồn đi qua một vùng nhớ chung (cột số giữ nguyên, cột văn bản dạng mã int32); mỗi khối
+    được gửi đi ngay khi ghi xong nên process con bắt đầu trong lúc các khối sau còn đang mã hóa.
+    Kết quả ghép theo đúng thứ tự dòng gốc: cùng giá trị với chạy tuần tự với mọi số process /
+    kích thước khối. Số process không vượt quá số nhân CPU; chỉ một khối, một process hoặc ít hơn
+    min_rows dòng -> chạy tuần tự. Số lần trúng/trượt cache định dạng của process con được cộng
+    vào cache_stats() của process cha.
+    """
+    max_workers = min(max_workers or available_cpus(), available_cpus())
+    bounds = [(start, min(start + chunk_rows, len(df))) for start in range(0, len(df), chunk_rows)]
+    if max_workers == 1 or len(bounds) <= 1 or len(df) < min_rows:
+        return process_schedule_data_vectorized(df, calendar, marker_table)
+
+    print(f"📊 Xử lý TẤT CẢ {len(df)} dòng dữ liệu gốc ({len(bounds)} khối, {max_workers} process)")
+    week_cols = [col for col in calendar.columns if col in df.columns]
+    layout, size = plan_layout(df, [col for col in SOURCE_COLUMNS if col in df.columns] + week_cols)
+    memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        views = _column_views(memory.buf, layout, len(df))
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(bounds)), initializer=_init_worker,
+                                 initargs=(memory.name, layout, len(df), calendar, marker_table)) as executor:
+            futures = [executor.submit(_convert_chunk, start, stop, encode_chunk(df, layout, views, start, stop))
+                       for start, stop in bounds]
+            chunks = [future.result() for future in futures]
+            result = _combine(chunks)
+        for *_, stats in chunks:
+            merge_cache_stats(stats)
+        del views
+    finally:
+        memory.close()
+        memory.unlink()
+
+    # Cột tuần gốc lấy thẳng từ dữ liệu nguồn, không cần gửi về từ process con (dòng lỗi để trống)
+    error_rows = [row for _, _, rows, _ in chunks for row in rows]
+    for col in week_cols:
+        original = df[col].to_numpy()
+        if len(error_rows):
+            original = original.astype(object)
+            original[error_rows] = np.nan
+        result[f'{ORIGINAL_PREFIX}{col}'] = original
+    return result
@@ -0,0 +1,135 @@
+import contextlib
+import json
+import os
+import platform
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+# TKB_PROFILE=1 bật đo (ghi tkb_profile.json), hoặc TKB_PROFILE=<đường dẫn file JSON>
+PROFILE_ENV = "TKB_PROFILE"
+# TKB_PROFILE_CPROFILE=1 ghi thêm file pstats (cạnh file JSON, đuôi .pstats)
+CPROFILE_ENV = "TKB_PROFILE_CPROFILE"
+DEFAULT_PROFILE_FILE = "tkb_profile.json"
+
+@dataclass
+class StageRecord:
+    """Số đo của một bước: thời gian thực, thời gian CPU, số dòng và bộ nhớ Python đỉnh"""
+    name: str
+    depth: int
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    rows: int = None
+    rows_per_s: float = None
+    peak_mb: float = None
+
+class StageProfiler:
+    """Đo từng bước của pipeline; khi chưa bật thì stage() gần như không tốn gì"""
+
+    def __init__(self):
+        self.enabled = False
+        self.output = None
+        self.memory = False
+        self.records = []
+        self.metrics = {}
+        self._stack = []
+        self._cprofile = None
+        self._started_tracemalloc = False
+
+    def enable(self, output=DEFAULT_PROFILE_FILE, memory=True, cprofile=False):
+        """Bật đo. memory=True dùng tracemalloc (chính xác nhưng làm chậm các bước cấp phát nhiều)"""
+        self.enabled = True
+        self.output = output
+        self.memory = memory
+        self.records = []
+        self.metrics = {}
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        if cprofile:
+            import cProfile
+
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def enable_from_env(self, environ=os.environ):
+        """Bật đo nếu có biến môi trường TKB_PROFILE; trả về True nếu đã bật"""
+        value = environ.get(PROFILE_ENV, "").strip()
+        if not value or value.lower() in ("0", "false", "no"):
+            return False
+        output = DEFAULT_PROFILE_FILE if value.lower() in ("1", "true", "yes") else value
+        self.enable(output, cprofile=environ.get(CPROFILE_ENV, "").strip().lower() in ("1", "true", "yes"))
+        return True
+
+    def disable(self):
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        self.enabled = False
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=None):
+        """Đo một khối lệnh: `with stage('đọc') as s: ...; s.rows = len(df)` (s là None nếu chưa bật)"""
+        if not self.enabled:
+            yield None
+            return
+
+        record = StageRecord(name=name, depth=len(self._stack), rows=rows)
+        self.records.append(record)
+        memory = self.memory and tracemalloc.is_tracing()
+        if memory:
+            # Đỉnh của bước ngoài tính tới giờ được giữ lại trước khi reset cho bước này
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        frame = [record, 0]
+        self._stack.append(frame)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall_s = time.perf_counter() - wall
+            record.cpu_s = time.process_time() - cpu
+            self._stack.pop()
+            if memory:
+                peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+                record.peak_mb = round(max(peak - base, 0) / (1024 * 1024), 3)
+                if self._stack:
+                    self._stack[-1][1] = max(self._stack[-1][1], peak)
+            if record.rows is not None and record.wall_s > 0:
+                record.rows_per_s = round(record.rows / record.wall_s, 1)
+
+    def report(self):
+        return {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'memory': self.memory,
+            'stages': [asdict(record) for record in self.records],
+            'metrics': self.metrics,
+        }
+
+    def write(self, output=None):
+        """Ghi profile JSON (và file .pstats nếu bật cProfile), in bảng tóm tắt; trả về đường dẫn"""
+        output = output or self.output or DEFAULT_PROFILE_FILE
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(os.path.splitext(output)[0] + ".pstats")
+            self._cprofile.enable()
+
+        print(f"\n⏱️ Profile ({output}):")
+        for record in self.records:
+            rate = f"{record.rows_per_s:12.0f} dòng/s" if record.rows_per_s else " " * 19
+            peak = f"{record.peak_mb:9.1f} MB" if record.peak_mb is not None else ""
+            print(f"  {'  ' * record.depth}{record.name:<{28 - 2 * record.depth}} {record.wall_s:8.3f}s "
+                  f"(CPU {record.cpu_s:7.3f}s) {rate} {peak}")
+        return output
+
+# Profiler dùng chung cho cả chương trình
+PROFILER = StageProfiler()
+stage = PROFILER.stage
@@ -0,0 +1,217 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from semester_calendar import SemesterCalendar
+from tkb_schema import detect_schema_from_rows
+
+# Cột nguồn có ít giá trị khác nhau, lặp lại trên hàng nghìn dòng: giữ dạng category
+CATEGORICAL_SOURCE_COLUMNS = ['Ngành', 'Khóa', 'Giảng viên giảng dạy', 'Phòng', 'Nhà', 'Thứ']
+
+_XLSX_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_XLSX_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+@dataclass
+class TkbWorkbook:
+    """Kết quả đọc workbook TKB: danh sách sheet, dữ liệu sheet và lịch tuần"""
+    sheet_names: list
+    frame: pd.DataFrame
+    calendar: SemesterCalendar = None
+    header: int = None
+
+def _convert_value(value, error_codes):
+    """Chuyển giá trị ô giống pandas (OpenpyxlReader._convert_cell)"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        as_int = int(value) if np.isfinite(value) else None
+        return as_int if as_int == value else float(value)
+    if isinstance(value, str) and value in error_codes:
+        return np.nan
+    return value
+
+def _finish_rows(raw_rows, error_codes):
+    """Chuyển giá trị ô, cắt ô/dòng trống ở cuối và làm đều độ dài các dòng như pandas"""
+    rows = []
+    last_row_with_data = -1
+    for row_number, values in enumerate(raw_rows):
+        row = [_convert_value(value, error_codes) for value in values]
+        while row and row[-1] == "":
+            row.pop()
+        if row:
+            last_row_with_data = row_number
+        rows.append(row)
+    rows = rows[:last_row_with_data + 1]
+
+    if rows:
+        width = max(len(row) for row in rows)
+        rows = [row + [""] * (width - len(row)) for row in rows]
+    return rows
+
+def read_sheet_rows(worksheet, max_rows=None):
+    """Đọc tuần tự các dòng của sheet (chế độ read-only), cắt ô/dòng trống ở cuối như pandas
+
+    max_rows giới hạn số dòng đọc (dừng sớm, không duyệt hết sheet).
+    """
+    from openpyxl.cell.cell import ERROR_CODES
+
+    worksheet.reset_dimensions()
+    return _finish_rows(worksheet.iter_rows(max_row=max_rows, values_only=True), set(ERROR_CODES))
+
+def _column_number(reference):
+    """Vị trí cột (đếm từ 0) của địa chỉ ô kiểu 'AB12'"""
+    number = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        number = number * 26 + ord(char.upper()) - 64
+    return number - 1
+
+def _xlsx_sheet_path(archive, sheet_name):
+    """Đường dẫn XML của sheet trong file xlsx (theo workbook.xml và bảng quan hệ); None nếu không có"""
+    from xml.etree import ElementTree
+
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    relations = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {rel.get("Id"): rel.get("Target") for rel in relations}
+    for sheet in workbook.iter(f"{_XLSX_NS}sheet"):
+        if sheet.get("name") == sheet_name:
+            target = targets[sheet.get(f"{_XLSX_REL_NS}id")]
+            return target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+    return None
+
+def _shared_strings(archive, needed):
+    """Các chuỗi dùng chung có chỉ số trong needed (dừng đọc sau chỉ số lớn nhất)"""
+    from xml.etree import ElementTree
+
+    strings = {}
+    if not needed or "xl/sharedStrings.xml" not in archive.namelist():
+        return strings
+    last = max(needed)
+    with archive.open("xl/sharedStrings.xml") as f:
+        index = 0
+        for _, element in ElementTree.iterparse(f):
+            if element.tag != f"{_XLSX_NS}si":
+                continue
+            if index in needed:
+                # Bỏ phần phiên âm (rPh) giống openpyxl
+                runs = [element.find(f"{_XLSX_NS}t")] + [r.find(f"{_XLSX_NS}t") for r in element.iter(f"{_XLSX_NS}r")]
+                strings[index] = "".join(t.text or "" for t in runs if t is not None)
+            element.clear()
+            if index >= last:
+                break
+            index += 1
+    return strings
+
+def scan_sheet_rows(excel_file, sheet_name, max_rows):
+    """max_rows dòng đầu của sheet, đọc thẳng XML theo luồng (không nạp style như openpyxl)
+
+    Dùng để nhận dạng tiêu đề trong vài mili giây. Ô kiểu ngày được trả về dạng số serial.
+    ValueError nếu không có sheet_name.
+    """
+    import zipfile
+    from xml.etree import ElementTree
+
+    from openpyxl.cell.cell import ERROR_CODES
+
+    with zipfile.ZipFile(excel_file) as archive:
+        path = _xlsx_sheet_path(archive, sheet_name)
+        if path is None:
+            raise ValueError(f"Không tìm thấy sheet '{sheet_name}'")
+
+        raw_rows, shared = [], set()
+        with archive.open(path) as f:
+            for _, element in ElementTree.iterparse(f):
+                if element.tag != f"{_XLSX_NS}row":
+                    continue
+                row_number = int(element.get("r", len(raw_rows) + 1))
+                if row_number > max_rows:
+                    break
+                raw_rows.extend([] for _ in range(row_number - 1 - len(raw_rows)))
+                row = []
+                for position, cell in enumerate(element.iter(f"{_XLSX_NS}c")):
+                    column = _column_number(cell.get("r")) if cell.get("r") else position
+                    row.extend([None] * (column + 1 - len(row)))
+                    kind, value = cell.get("t", "n"), cell.findtext(f"{_XLSX_NS}v")
+                    if kind == "inlineStr":
+                        value = "".join(t.text or "" for t in cell.iter(f"{_XLSX_NS}t"))
+                    elif value is None:
+                        pass
+                    elif kind == "s":
+                        value = ("s", int(value))
+                        shared.add(value[1])
+                    elif kind == "b":
+                        value = value == "1"
+                    elif kind == "n":
+                        value = float(value)
+                    row[column] = value
+                raw_rows.append(row)
+                element.clear()
+        strings = _shared_strings(archive, shared)
+
+    raw_rows = [[strings.get(value[1], "") if isinstance(value, tuple) else value for value in row]
+                for row in raw_rows]
+    return _finish_rows(raw_rows, set(ERROR_CODES))
+
+def rows_to_frame(rows, header=8, dtype_backend=None):
+    """Dựng DataFrame từ các dòng thô với cùng quy tắc suy kiểu như pd.read_excel
+
+    Với dtype_backend, các cột hỗn hợp kiểu (vd. ô tuần chứa cả 'x' và số) vẫn giữ dtype object
+    thay vì báo lỗi như pd.read_excel(dtype_backend='pyarrow').
+    """
+    frame = TextParser(rows, header=header, skip_blank_lines=False).read()
+    if dtype_backend is not None:
+        frame = frame.convert_dtypes(dtype_backend=dtype_backend)
+    return frame
+
+def categorize_columns(frame, columns=CATEGORICAL_SOURCE_COLUMNS):
+    """Chuyển các cột (nếu có) sang kiểu category; cột đã là category được giữ nguyên
+
+    Cột hỗn hợp kiểu (vd. 'Khóa' có cả số và chuỗi) vẫn giữ nguyên giá trị gốc trong bảng categories.
+    """
+    for col in columns:
+        if col in frame.columns and not isinstance(frame[col].dtype, pd.CategoricalDtype):
+            frame[col] = frame[col].astype('category')
+    return frame
+
+def load_tkb_workbook(excel_file, sheet_name='TKB CHINH', header=None, dtype_backend=None, categorical=False):
+    """Mở workbook MỘT lần ở chế độ read-only: lấy danh sách sheet, lịch tuần và dữ liệu sheet
+
+    header=None nhận dạng dòng tiêu đề theo nội dung (tkb_schema) và đổi tên cột về tên chuẩn;
+    số nguyên thì đọc đúng dòng đó như pd.read_excel(header=...).
+    dtype_backend='pyarrow' cho các cột kiểu Arrow (cần cài pyarrow).
+    categorical=True chuyển các cột CATEGORICAL_SOURCE_COLUMNS sang kiểu category ngay khi đọc.
+    Trả về TkbWorkbook; frame là None nếu không có sheet_name.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(excel_file, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet_names = list(workbook.sheetnames)
+        if sheet_name not in sheet_names:
+            return TkbWorkbook(sheet_names=sheet_names, frame=None)
+        rows = read_sheet_rows(workbook[sheet_name])
+    finally:
+        workbook.close()
+
+    schema = None
+    if header is None:
+        schema = detect_schema_from_rows(rows)
+        header, calendar = schema.header, schema.calendar
+    else:
+        try:
+            calendar = SemesterCalendar.from_rows(rows, header)
+        except (ValueError, IndexError) as e:
+            print(f"⚠️ Không đọc được lịch tuần từ tiêu đề: {e}")
+            calendar = None
+
+    frame = rows_to_frame(rows, header=header, dtype_backend=dtype_backend)
+    if schema is not None:
+        schema.apply(frame)
+    if categorical:
+        categorize_columns(frame)
+    return TkbWorkbook(sheet_names=sheet_names, frame=frame, calendar=calendar, header=header)
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from tkb_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, evict_lru
+from tkb_conflicts import SKIP_LOCATIONS, _codes, parse_periods, week_masks
+
+# Trục "thứ" của ma trận: nhãn như cột 'Thứ' của kết quả chuyển đổi
+DAY_LABELS = ["2", "3", "4", "5", "6", "7", "CN"]
+
+BUILDING = re.compile(r"Nhà\s+(.+)$")
+OCCUPANCY_VERSION = 1
+
+def day_index(day):
+    """Vị trí trên trục thứ: nhận 4, "4", "Thứ 4", 8, "CN"; None nếu không hợp lệ"""
+    text = str(day).strip()
+    if text.lower().startswith("thứ"):
+        text = text[3:].strip()
+    text = text.upper()
+    if text in ("8", "CHỦ NHẬT"):
+        text = "CN"
+    try:
+        return DAY_LABELS.index(text)
+    except ValueError:
+        return None
+
+def parse_period_range(periods):
+    """(tiết đầu, tiết cuối) từ "7-9", "7", 7 hoặc (7, 9)"""
+    if isinstance(periods, (tuple, list)):
+        first, last = periods
+    else:
+        first, _, last = str(periods).partition("-")
+        last = last or first
+    return int(first), int(last)
+
+def semester_weeks(calendar):
+    """Số tuần lớn nhất của lịch học kỳ (0 nếu không có lịch)"""
+    if calendar is None or not len(calendar):
+        return 0
+    return int(calendar.week_numbers.max())
+
+class RoomOccupancy:
+    """Ma trận bận/trống của phòng học: occupied[phòng, tuần, thứ, tiết] (bool)
+
+    Tuần và tiết được đánh chỉ số bằng chính số tuần/số tiết (chỉ số 0 không dùng).
+    Tạo một lần cho mỗi kết quả chuyển đổi; truy vấn chỉ là cắt mảng NumPy.
+    """
+
+    def __init__(self, rooms, buildings, occupied):
+        if occupied.ndim != 4 or occupied.shape[0] != len(rooms) or occupied.shape[2] != len(DAY_LABELS):
+            raise ValueError("occupied phải có dạng (phòng, tuần, thứ, tiết)")
+        self.rooms = list(rooms)
+        self.buildings = list(buildings)
+        self.occupied = occupied
+        self.room_index = {room: i for i, room in enumerate(self.rooms)}
+        self._building_masks = {}
+        self._prefix = None
+
+    def __repr__(self):
+        _, weeks, _, periods = self.occupied.shape
+        return f"RoomOccupancy({len(self.rooms)} phòng, {weeks - 1} tuần, {periods - 1} tiết)"
+
+    @classmethod
+    def from_schedule(cls, df_result, skip_locations=SKIP_LOCATIONS, calendar=None):
+        """Dựng từ các cột 'Địa điểm', 'Thứ', 'Thời gian', 'Tuần học' của kết quả chuyển đổi
+
+        Trục tuần phủ mọi tuần của calendar (kể cả các tuần cuối không có lịch), không chỉ tới
+        tuần lớn nhất có trong dữ liệu.
+        """
+        start, end = parse_periods(df_result['Thời gian'])
+        masks = week_masks(df_result['Tuần học'])
+        location, names = _codes(df_result['Địa điểm'])
+        day_codes, day_names = _codes(df_result['Thứ'])
+        day_lookup = np.array([-1 if day_index(name) is None else day_index(name) for name in day_names] + [-1])
+        day = day_lookup[day_codes]
+
+        keep = np.array([str(name).strip() not in ("", "Lỗi")
+                         and not (skip_locations is not None and skip_locations.search(str(name)))
+                         for name in names] + [False])
+        rows = np.flatnonzero(keep[location] & (day >= 0) & (start >= 0) & (masks != 0))
+
+        # Chỉ các phòng thực sự có lịch, theo thứ tự tên
+        used = np.unique(location[rows])
+        order = sorted(used.tolist(), key=lambda code: str(names[code]))
+        remap = np.full(len(names) + 1, -1, dtype=np.int64)
+        remap[order] = np.arange(len(order))
+        rooms = [str(names[code]) for code in order]
+        buildings = [match.group(1).strip() if (match := BUILDING.search(room)) else "" for room in rooms]
+
+        max_week = int(masks[rows].max()).bit_length() - 1 if len(rows) else 0
+        max_week = max(max_week, semester_weeks(calendar))
+        max_period = int(end[rows].max()) if len(rows) else 0
+        occupied = np.zeros((len(rooms), max_week + 1, len(DAY_LABELS), max_period + 1), dtype=bool)
+
+        # Danh sách tuần tính một lần cho mỗi mẫu tuần khác nhau
+        patterns, pattern_index = np.unique(masks[rows], return_inverse=True)
+        pattern_weeks = [np.array([w for w in range(max_week + 1) if int(p) >> w & 1], dtype=np.int64)
+                         for p in patterns]
+        room = remap[location[rows]]
+        for r, weeks, d, first, last in zip(room.tolist(), pattern_index.tolist(), day[rows].tolist(),
+                                            start[rows].tolist(), end[rows].tolist()):
+            occupied[r, pattern_weeks[weeks], d, first:last + 1] = True
+        return cls(rooms, buildings, occupied)
+
+    def _building_mask(self, building):
+        if building is None:
+            return None
+        key = str(building).strip().lower()
+        mask = self._building_masks.get(key)
+        if mask is None:
+            mask = self._building_masks[key] = np.array([b.lower() == key for b in self.buildings], dtype=bool)
+        return mask
+
+    def _check(self, week, day, first, last):
+        _, weeks, _, periods = self.occupied.shape
+        if not 0 < week < weeks:
+            raise ValueError(f"Tuần {week} ngoài học kỳ (1-{weeks - 1})")
+        if day is None:
+            raise ValueError("Thứ không hợp lệ")
+        if not 0 < first <= last:
+            raise ValueError(f"Khoảng tiết không hợp lệ: {first}-{last}")
+        return min(last, periods - 1)
+
+    def free_mask(self, day, periods, week):
+        """Mảng bool theo phòng: True nếu phòng trống suốt các tiết đó"""
+        d = day_index(day)
+        first, last = parse_period_range(periods)
+        last = self._check(week, d, first, last)
+        if first > last:
+            return np.ones(len(self.rooms), dtype=bool)
+        return ~self.occupied[:, week, d, first:last + 1].any(axis=1)
+
+    def free_rooms(self, day, periods, week, building=None):
+        """Các phòng trống (vd. free_rooms(4, "7-9", 12, building="A2"))"""
+        mask = self.free_mask(day, periods, week)
+        building_mask = self._building_mask(building)
+        if building_mask is not None:
+            mask &= building_mask
+        return [self.rooms[i] for i in np.flatnonzero(mask)]
+
+    def is_free(self, room, day, periods, week):
+        return bool(self.free_mask(day, periods, week)[self.room_index[room]])
+
+    def free_matrix(self, queries):
+        """Nhiều truy vấn (thứ, tiết, tuần) một lần: mảng bool (số truy vấn, số phòng)
+
+        Dùng tổng tích lũy theo tiết (tính một lần) nên mỗi truy vấn chỉ là một phép trừ.
+        """
+        if self._prefix is None:
+            rooms, weeks, days, periods = self.occupied.shape
+            prefix = np.zeros((rooms, weeks, days, periods + 1), dtype=np.uint16)
+            np.cumsum(self.occupied, axis=3, dtype=np.uint16, out=prefix[..., 1:])
+            self._prefix = prefix
+
+        count = len(queries)
+        days = np.empty(count, dtype=np.int64)
+        weeks = np.empty(count, dtype=np.int64)
+        firsts = np.empty(count, dtype=np.int64)
+        lasts = np.empty(count, dtype=np.int64)
+        for i, (day, periods, week) in enumerate(queries):
+            d = day_index(day)
+            first, last = parse_period_range(periods)
+            lasts[i] = self._check(week, d, first, last)
+            days[i], weeks[i], firsts[i] = d, week, min(first, lasts[i] + 1)
+        busy = self._prefix[:, weeks, days, lasts + 1] - self._prefix[:, weeks, days, firsts]
+        return (busy == 0).T
+
+    def free_rooms_batch(self, queries, building=None):
+        """Danh sách phòng trống cho từng truy vấn (thứ, tiết, tuần)"""
+        free = self.free_matrix(queries)
+        building_mask = self._building_mask(building)
+        if building_mask is not None:
+            free &= building_mask
+        return [[self.rooms[i] for i in np.flatnonzero(row)] for row in free]
+
+    def save(self, path):
+        """Ghi ma trận ra file .npy (đọc lại bằng memory-map) và danh sách phòng ra path + '.json'"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, self.occupied)
+        with open(f"{path}.json", 'w', encoding='utf-8') as f:
+            json.dump({'version': OCCUPANCY_VERSION, 'rooms': self.rooms, 'buildings': self.buildings},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Đọc ma trận đã ghi bằng save(); mmap=True không nạp toàn bộ vào bộ nhớ"""
+        with open(f"{path}.json", encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != OCCUPANCY_VERSION:
+            raise ValueError(f"Phiên bản ma trận phòng không khớp: {meta.get('version')}")
+        occupied = np.load(path, mmap_mode='r' if mmap else None)
+        return cls(meta['rooms'], meta['buildings'], occupied)
+
+def occupancy_digest(df_result):
+    """Hash nội dung các cột dùng để dựng ma trận phòng"""
+    columns = ['Địa điểm', 'Thứ', 'Thời gian', 'Tuần học']
+    plain = pd.DataFrame({col: df_result[col].astype(str).to_numpy() for col in columns})
+    hashes = pd.util.hash_pandas_object(plain, index=False).to_numpy()
+    return hashlib.sha256(hashes.tobytes()).hexdigest()
+
+def load_room_occupancy(df_result, cache_dir=DEFAULT_CACHE_DIR, calendar=None, max_bytes=DEFAULT_MAX_BYTES):
+    """Ma trận phòng của kết quả chuyển đổi, lấy từ cache (memory-map) nếu đã dựng trước đó
+
+    File cache (.npy + .npy.json) được dọn cùng cache Parquet theo LRU (tkb_cache.evict_lru).
+    """
+    path = os.path.join(cache_dir, f"rooms-{occupancy_digest(df_result)[:40]}-w{semester_weeks(calendar)}.npy")
+    if os.path.exists(path) and os.path.exists(f"{path}.json"):
+        try:
+            occupancy = RoomOccupancy.load(path)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Cache ma trận phòng hỏng, dựng lại: {e}")
+        else:
+            os.utime(path)  # đánh dấu vừa dùng (LRU)
+            return occupancy
+    occupancy = RoomOccupancy.from_schedule(df_result, calendar=calendar)
+    try:
+        occupancy.save(path)
+        evict_lru(cache_dir, max_bytes, keep={path})
+    except OSError as e:
+        print(f"⚠️ Không ghi được cache ma trận phòng: {e}")
+    return occupancy
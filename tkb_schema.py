@@ -0,0 +1,130 @@
+import re
+import unicodedata
+from dataclasses import dataclass
+
+from semester_calendar import SemesterCalendar
+
+# Số dòng đầu sheet được quét để tìm dòng tiêu đề (tiêu đề thật nằm ở dòng 8)
+HEADER_SCAN_ROWS = 30
+
+# Tên cột chuẩn (tên các bộ chuyển đổi dùng) -> các cách viết tiêu đề chấp nhận được
+FIELD_ALIASES = {
+    'TT': ('TT', 'STT', 'Số TT'),
+    'Mã môn học': ('Mã môn học', 'Mã MH', 'Mã học phần', 'Mã HP'),
+    'Tên môn học/ học phần': ('Tên môn học/ học phần', 'Tên môn học', 'Tên học phần', 'Môn học'),
+    'Khóa': ('Khóa', 'Khoá', 'Khóa học'),
+    'Ngành': ('Ngành', 'Chuyên ngành'),
+    'Lớp': ('Lớp',),
+    'Nhóm': ('Nhóm', 'Mã lớp'),
+    'Tổ hợp': ('Tổ hợp',),
+    'Tổ TH': ('Tổ TH',),
+    'Thứ': ('Thứ',),
+    'Tiết BĐ': ('Tiết BĐ', 'Tiết bắt đầu'),
+    'Số tiết': ('Số tiết',),
+    'Giảng viên giảng dạy': ('Giảng viên giảng dạy', 'Giảng viên', 'GV giảng dạy'),
+    'Khoa': ('Khoa',),
+    'Bộ môn': ('Bộ môn',),
+    'Ghi chú': ('Ghi chú',),
+    'Phòng': ('Phòng', 'Phòng học'),
+    'Nhà': ('Nhà', 'Tòa nhà'),
+    'Số TC': ('Số TC', 'Số tín chỉ', 'TC'),
+}
+# Thiếu một trong các cột này thì dòng không phải tiêu đề TKB
+REQUIRED_FIELDS = ('Tên môn học/ học phần', 'Lớp', 'Thứ', 'Giảng viên giảng dạy')
+
+def normalize_label(value):
+    """Dạng so khớp của nhãn tiêu đề: NFC, không phân biệt hoa thường và khoảng trắng"""
+    if value is None:
+        return ""
+    text = unicodedata.normalize('NFC', str(value)).casefold()
+    text = re.sub(r"\s*/\s*", "/", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+_ALIAS_FIELDS = {normalize_label(alias): field for field, aliases in FIELD_ALIASES.items() for alias in aliases}
+
+@dataclass
+class SheetSchema:
+    """Bố cục sheet TKB nhận dạng theo nội dung: dòng tiêu đề, vị trí từng cột và lịch tuần"""
+    header: int
+    fields: dict
+    calendar: SemesterCalendar = None
+
+    def rename_map(self, columns):
+        """{tên cột trong DataFrame: tên chuẩn} cho các cột có tiêu đề khác tên chuẩn"""
+        columns = list(columns)
+        return {columns[position]: field for field, position in self.fields.items()
+                if position < len(columns) and columns[position] != field}
+
+    def apply(self, frame):
+        """Đổi tên cột của DataFrame (đọc với header=self.header) về tên chuẩn; trả về chính frame"""
+        renames = self.rename_map(frame.columns)
+        if renames:
+            frame.rename(columns=renames, inplace=True)
+        return frame
+
+# Bố cục đã nhận dạng: (dòng tiêu đề, nội dung 3 dòng số tuần/tiêu đề/ngày) -> SheetSchema
+_LAYOUT_CACHE = {}
+
+def _layout_key(rows, header):
+    """Khóa bố cục: các dòng mà SheetSchema phụ thuộc vào (dòng trên, dòng tiêu đề, dòng dưới)"""
+    return (header,) + tuple(tuple(normalize_label(value) for value in rows[i]) if 0 <= i < len(rows) else ()
+                             for i in (header - 1, header, header + 1))
+
+def _match_fields(row):
+    """{tên chuẩn: vị trí} của các ô khớp tên cột (ô đầu tiên nếu trùng)"""
+    fields = {}
+    for position, value in enumerate(row):
+        field = _ALIAS_FIELDS.get(normalize_label(value))
+        if field is not None and field not in fields:
+            fields[field] = position
+    return fields
+
+def detect_schema_from_rows(rows, max_rows=HEADER_SCAN_ROWS):
+    """Tìm dòng tiêu đề trong max_rows dòng đầu (dòng khớp nhiều tên cột nhất) và dựng SheetSchema
+
+    Cột tuần được xác định theo nội dung (dòng số tuần phía trên, nhãn tháng và ngày thứ Hai),
+    không theo tên 'Unnamed: i'. Bố cục đã gặp được lấy lại từ cache. ValueError nếu không tìm thấy.
+    """
+    candidates = range(min(len(rows), max_rows))
+    for header in candidates:
+        schema = _LAYOUT_CACHE.get(_layout_key(rows, header))
+        if schema is not None:
+            return schema
+
+    best, best_fields = None, {}
+    for header in candidates:
+        fields = _match_fields(rows[header])
+        if all(field in fields for field in REQUIRED_FIELDS) and len(fields) > len(best_fields):
+            best, best_fields = header, fields
+    if best is None:
+        missing = ", ".join(REQUIRED_FIELDS)
+        raise ValueError(f"Không tìm thấy dòng tiêu đề (cần các cột: {missing}) trong {max_rows} dòng đầu")
+
+    try:
+        calendar = SemesterCalendar.from_rows(rows, best)
+    except (ValueError, IndexError) as e:
+        print(f"⚠️ Không đọc được lịch tuần từ tiêu đề: {e}")
+        calendar = None
+    schema = SheetSchema(header=best, fields=best_fields, calendar=calendar)
+    _LAYOUT_CACHE[_layout_key(rows, best)] = schema
+    return schema
+
+def detect_schema(excel_file, sheet_name='TKB CHINH', max_rows=HEADER_SCAN_ROWS):
+    """Nhận dạng bố cục sheet chỉ từ max_rows dòng đầu, đọc XML theo luồng
+
+    Nhãn tiêu đề là ô kiểu ngày (đọc nhanh chỉ thấy số serial) thì đọc lại bằng openpyxl.
+    """
+    from tkb_reader import read_sheet_rows, scan_sheet_rows
+
+    schema = detect_schema_from_rows(scan_sheet_rows(excel_file, sheet_name, max_rows), max_rows)
+    if schema.calendar is not None:
+        return schema
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(excel_file, read_only=True, data_only=True, keep_links=False)
+    try:
+        rows = read_sheet_rows(workbook[sheet_name], max_rows=max_rows)
+    finally:
+        workbook.close()
+    return detect_schema_from_rows(rows, max_rows)
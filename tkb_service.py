@@ -0,0 +1,246 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from schedule_converter_fixed import SCHEDULE_COLUMNS, process_schedule_data_vectorized
+from semester_calendar import DEFAULT_CALENDAR
+from tkb_cache import file_digest, load_cached_workbook
+from tkb_conflicts import week_masks
+from tkb_rooms import RoomOccupancy, day_index
+from tkb_stats import compute_statistics
+
+# Tham số truy vấn -> cột được đánh chỉ mục
+INDEXED_FIELDS = {'lop': 'Lớp', 'giang_vien': 'Giảng viên', 'phong': 'Địa điểm'}
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 10000
+# Tuần lớn nhất truy vấn được (bit cao nhất của bitmask tuần int64, xem tkb_conflicts.week_masks)
+MAX_WEEK = 62
+
+def parse_week(value):
+    """Số tuần của tham số 'tuan'; ValueError (-> HTTP 400) nếu không phải số trong 1..MAX_WEEK"""
+    if value is None:
+        raise ValueError("Thiếu tham số 'tuan'")
+    try:
+        week = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Tuần không hợp lệ: {value!r}") from None
+    if not 1 <= week <= MAX_WEEK:
+        raise ValueError(f"Tuần {week} ngoài khoảng 1-{MAX_WEEK}")
+    return week
+
+class TimetableSnapshot:
+    """Kết quả chuyển đổi của một phiên bản file nguồn cùng các chỉ mục; không thay đổi sau khi tạo"""
+
+    def __init__(self, source, digest, mtime, frame, calendar):
+        self.source = source
+        self.digest = digest
+        self.mtime = mtime
+        self.frame = frame
+        self.calendar = calendar
+        self.loaded_at = datetime.now().isoformat(timespec='seconds')
+        self.columns = [col for col in SCHEDULE_COLUMNS if col in frame.columns]
+        self.indexes = {field: {str(key).strip(): positions
+                                for key, positions in frame.groupby(col, observed=True, sort=False).indices.items()}
+                        for field, col in INDEXED_FIELDS.items() if col in frame.columns}
+        self.week_masks = week_masks(frame['Tuần học'])
+        days = {label: day_index(label) for label in frame['Thứ'].astype(str).unique()}
+        self.days = np.array([-1 if days[label] is None else days[label] for label in frame['Thứ'].astype(str)],
+                             dtype=np.int8)
+        self.rooms = RoomOccupancy.from_schedule(frame, calendar=calendar)
+        self.statistics = compute_statistics(frame, calendar).to_dict()
+
+    @classmethod
+    def load(cls, excel_file, sheet_name='TKB CHINH', header=None):
+        digest = file_digest(excel_file)
+        mtime = os.stat(excel_file).st_mtime
+        with contextlib.redirect_stdout(io.StringIO()):
+            workbook = load_cached_workbook(excel_file, sheet_name=sheet_name, header=header, categorical=True)
+            if workbook.frame is None:
+                raise ValueError(f"Không tìm thấy sheet '{sheet_name}'")
+            calendar = workbook.calendar or DEFAULT_CALENDAR
+            frame = process_schedule_data_vectorized(workbook.frame, calendar)
+        return cls(excel_file, digest, mtime, frame, calendar)
+
+    def _lookup(self, field, value):
+        """Vị trí các dòng có giá trị bằng value; không có thì tìm theo chuỗi con (không phân biệt hoa thường)"""
+        index = self.indexes[field]
+        positions = index.get(value.strip())
+        if positions is not None:
+            return positions
+        needle = value.strip().lower()
+        matches = [positions for key, positions in index.items() if needle in key.lower()]
+        return np.sort(np.concatenate(matches)) if matches else np.zeros(0, dtype=np.int64)
+
+    def select(self, filters):
+        """Vị trí các dòng thỏa mọi điều kiện: lop, giang_vien, phong, tuan, thu"""
+        selected = None
+        for field in INDEXED_FIELDS:
+            if filters.get(field):
+                positions = self._lookup(field, filters[field])
+                selected = positions if selected is None else np.intersect1d(selected, positions)
+        if selected is None:
+            mask = np.ones(len(self.frame), dtype=bool)
+        else:
+            mask = np.zeros(len(self.frame), dtype=bool)
+            mask[selected] = True
+        if filters.get('tuan'):
+            mask &= (self.week_masks >> parse_week(filters['tuan'])) & 1 == 1
+        if filters.get('thu'):
+            day = day_index(filters['thu'])
+            if day is None:
+                raise ValueError(f"Thứ không hợp lệ: {filters['thu']}")
+            mask &= self.days == day
+        return np.flatnonzero(mask)
+
+    def records(self, positions, limit=DEFAULT_LIMIT, offset=0):
+        page = self.frame.iloc[positions[offset:offset + limit]][self.columns]
+        return json.loads(page.to_json(orient='records', force_ascii=False))
+
+    def info(self):
+        return {'source': os.path.basename(self.source), 'digest': self.digest, 'rows': len(self.frame),
+                'loaded_at': self.loaded_at, 'calendar': repr(self.calendar)}
+
+class TimetableService:
+    """Giữ snapshot hiện tại trong bộ nhớ và nạp lại khi file nguồn thay đổi (mtime, rồi hash)
+
+    Snapshot mới được dựng hoàn chỉnh rồi mới thay vào (một phép gán), nên các request đang chạy
+    luôn thấy trọn vẹn một phiên bản. Nạp lỗi thì giữ phiên bản cũ.
+    """
+
+    def __init__(self, excel_file, sheet_name='TKB CHINH', header=None, poll_interval=2.0):
+        self.excel_file = excel_file
+        self.sheet_name = sheet_name
+        self.header = header
+        self.poll_interval = poll_interval
+        self.snapshot = TimetableSnapshot.load(excel_file, sheet_name, header)
+        self.reloads = 0
+        self.last_error = None
+        self._failed_mtime = None
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def check_reload(self):
+        """Nạp lại nếu file đã đổi; trả về True nếu đã thay snapshot"""
+        current = self.snapshot
+        mtime = None
+        try:
+            mtime = os.stat(self.excel_file).st_mtime
+            if mtime in (current.mtime, self._failed_mtime):
+                return False
+            if file_digest(self.excel_file) == current.digest:
+                current.mtime = mtime
+                return False
+            snapshot = TimetableSnapshot.load(self.excel_file, self.sheet_name, self.header)
+        except Exception as e:
+            # Không thử lại cho tới khi file đổi tiếp (vd. đang được ghi dở)
+            self._failed_mtime = mtime
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"⚠️ Không nạp lại được {self.excel_file}, giữ phiên bản cũ: {self.last_error}")
+            return False
+        self.snapshot = snapshot
+        self.reloads += 1
+        self.last_error = None
+        print(f"🔄 Đã nạp lại {self.excel_file}: {len(snapshot.frame)} dòng")
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.check_reload()
+
+    def start_watcher(self):
+        self._watcher = threading.Thread(target=self._watch, name="tkb-reload", daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def handle(self, path, query):
+        """(mã HTTP, dict JSON) cho một request GET"""
+        snapshot = self.snapshot
+        params = {key: values[-1] for key, values in query.items()}
+        if path == "/health":
+            return 200, {'status': 'ok', 'reloads': self.reloads, 'last_error': self.last_error, **snapshot.info()}
+        if path == "/schedule":
+            limit = int(params.get('limit', DEFAULT_LIMIT))
+            offset = int(params.get('offset', 0))
+            if not 0 <= limit <= MAX_LIMIT:
+                raise ValueError(f"limit phải trong khoảng 0-{MAX_LIMIT}")
+            if offset < 0:
+                raise ValueError("offset phải >= 0")
+            positions = snapshot.select(params)
+            return 200, {'count': len(positions), 'offset': offset,
+                         'rows': snapshot.records(positions, limit, offset)}
+        if path.startswith("/values/"):
+            field = path[len("/values/"):]
+            if field not in snapshot.indexes:
+                return 404, {'error': f"Không có chỉ mục '{field}' (chọn {list(snapshot.indexes)})"}
+            return 200, {'values': sorted(key for key in snapshot.indexes[field] if key)}
+        if path == "/free-rooms":
+            rooms = snapshot.rooms.free_rooms(params.get('thu', ''), params.get('tiet', ''), parse_week(params.get('tuan')),
+                                              building=params.get('nha'))
+            return 200, {'count': len(rooms), 'rooms': rooms}
+        if path == "/stats":
+            return 200, snapshot.statistics
+        return 404, {'error': "Đường dẫn: /health, /schedule, /values/<lop|giang_vien|phong>, /free-rooms, /stats"}
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            try:
+                status, body = service.handle(url.path.rstrip("/") or "/", parse_qs(url.query))
+            except (ValueError, KeyError) as e:
+                status, body = 400, {'error': str(e)}
+            except Exception as e:
+                # Lỗi ngoài dự kiến vẫn trả JSON thay vì đóng kết nối không phản hồi
+                print(f"⚠️ Lỗi xử lý {self.path}: {type(e).__name__}: {e}", file=sys.stderr)
+                status, body = 500, {'error': f"Lỗi máy chủ: {type(e).__name__}"}
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+    return Handler
+
+def serve(excel_file, host="127.0.0.1", port=8765, sheet_name='TKB CHINH', header=None, poll_interval=2.0):
+    """Chạy dịch vụ HTTP (mỗi request một thread) cho tới khi bị dừng (Ctrl+C)"""
+    started = time.perf_counter()
+    service = TimetableService(excel_file, sheet_name, header, poll_interval)
+    service.start_watcher()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"🌐 {len(service.snapshot.frame)} dòng sẵn sàng sau {time.perf_counter() - started:.2f}s "
+          f"tại http://{host}:{server.server_address[1]}/schedule")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dịch vụ tra cứu thời khóa biểu (JSON qua HTTP)")
+    parser.add_argument('input', nargs='?', default="0528_TKB_HK1_NAM_HOC_2025_20261-1.xlsx")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--sheet', default='TKB CHINH')
+    parser.add_argument('--header', type=int, default=None, help="dòng tiêu đề, đếm từ 0 (mặc định: tự nhận dạng)")
+    parser.add_argument('--poll', type=float, default=2.0, help="chu kỳ kiểm tra file nguồn (giây)")
+    args = parser.parse_args()
+    if not os.path.isfile(args.input):
+        sys.exit(f"Không tìm thấy file: {args.input}")
+    serve(args.input, args.host, args.port, args.sheet, args.header, args.poll)
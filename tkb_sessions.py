@@ -0,0 +1,92 @@
+from collections import namedtuple
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from semester_calendar import DEFAULT_CALENDAR
+from tkb_cache import _import_pyarrow
+from tkb_conflicts import _codes, parse_periods, week_masks
+from tkb_rooms import day_index
+
+# Một buổi học thực tế: vị trí dòng trong kết quả chuyển đổi, tuần, ngày, khoảng tiết, phòng, giảng viên
+Session = namedtuple('Session', ['row', 'week', 'date', 'start_period', 'end_period', 'location', 'lecturer'])
+
+# Cột văn bản giữ lại trong bảng buổi học (dạng category, lấy theo mã của dòng gốc)
+SESSION_TEXT_COLUMNS = ['Lớp', 'Mã lớp', 'Mã môn học', 'Môn học', 'Thứ', 'Địa điểm', 'Giảng viên']
+
+def _week_lookup(calendar):
+    """Mảng ngày thứ Hai theo số tuần (NaT nếu số tuần không có trong lịch)"""
+    size = int(calendar.week_numbers.max()) + 1 if len(calendar) else 1
+    mondays = np.full(size, np.datetime64("NaT"), dtype="datetime64[D]")
+    mondays[calendar.week_numbers] = calendar.mondays
+    return mondays
+
+def _session_inputs(df_result, calendar):
+    start, end = parse_periods(df_result['Thời gian'])
+    masks = week_masks(df_result['Tuần học'])
+    day_codes, day_names = _codes(df_result['Thứ'])
+    offsets = np.array([-1 if day_index(name) is None else day_index(name) for name in day_names] + [-1])
+    return start, end, masks, offsets[day_codes]
+
+def iter_sessions(df_result, calendar=DEFAULT_CALENDAR):
+    """Sinh lần lượt từng buổi học (dòng × tuần học × thứ -> ngày cụ thể), chỉ khi được duyệt tới
+
+    Dòng không có thứ, khoảng tiết hoặc tuần học không sinh buổi nào.
+    """
+    start, end, masks, offsets = _session_inputs(df_result, calendar)
+    mondays = _week_lookup(calendar)
+    locations = df_result['Địa điểm']
+    lecturers = df_result['Giảng viên']
+    for row in range(len(df_result)):
+        mask, offset = int(masks[row]), int(offsets[row])
+        if not mask or offset < 0 or start[row] < 0:
+            continue
+        for week in range(min(mask.bit_length(), len(mondays))):
+            if mask >> week & 1 and not np.isnat(mondays[week]):
+                yield Session(row, week, mondays[week].astype(object) + timedelta(days=offset),
+                              int(start[row]), int(end[row]), locations.iat[row], lecturers.iat[row])
+
+def sessions_table(df_result, calendar=DEFAULT_CALENDAR, as_arrow=False):
+    """Toàn bộ buổi học dạng bảng, tính theo mảng NumPy (không tạo đối tượng Python cho từng buổi)
+
+    Trả về DataFrame (hoặc pyarrow.Table nếu as_arrow=True) với các cột 'Dòng', 'Tuần', 'Ngày',
+    'Tiết BĐ', 'Tiết KT' và SESSION_TEXT_COLUMNS dạng category. Thứ tự giống iter_sessions.
+    """
+    start, end, masks, offsets = _session_inputs(df_result, calendar)
+    mondays = _week_lookup(calendar)
+    weeks = np.flatnonzero(~np.isnat(mondays))
+    valid = (masks != 0) & (offsets >= 0) & (start >= 0)
+    masks = np.where(valid, masks, 0)
+
+    # Ma trận (dòng, tuần) của các bit đang bật; np.nonzero duyệt theo dòng rồi theo tuần
+    active = (masks[:, None] >> weeks[None, :]) & 1
+    rows, week_index = np.nonzero(active)
+    week_numbers = weeks[week_index]
+    dates = mondays[week_numbers] + offsets[rows].astype("timedelta64[D]")
+
+    data = {
+        'Dòng': rows.astype(np.int32),
+        'Tuần': week_numbers.astype(np.int16),
+        'Ngày': dates,
+        'Tiết BĐ': start[rows].astype(np.int16),
+        'Tiết KT': end[rows].astype(np.int16),
+    }
+    text_columns = [col for col in SESSION_TEXT_COLUMNS if col in df_result.columns]
+    codes = {col: _codes(df_result[col]) for col in text_columns}
+
+    if as_arrow:
+        pa = _import_pyarrow()
+        if pa is None:
+            raise ImportError("Cần cài pyarrow để trả về bảng Arrow")
+        arrays = {name: pa.array(values) for name, values in data.items()}
+        for col, (col_codes, uniques) in codes.items():
+            taken = col_codes[rows].astype(np.int32)
+            dictionary = pa.array([str(value) for value in uniques], type=pa.string())
+            arrays[col] = pa.DictionaryArray.from_arrays(pa.array(taken, mask=taken < 0), dictionary)
+        return pa.table(arrays)
+
+    frame = pd.DataFrame(data)
+    for col, (col_codes, uniques) in codes.items():
+        frame[col] = pd.Categorical.from_codes(col_codes[rows], categories=pd.Index(uniques, dtype=object))
+    return frame
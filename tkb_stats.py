@@ -0,0 +1,242 @@
+import json
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from semester_calendar import DEFAULT_CALENDAR
+from tkb_conflicts import SKIP_LOCATIONS, _codes, parse_periods, week_masks
+from tkb_format import location_label
+from tkb_rooms import BUILDING, DAY_LABELS
+
+# Các nhóm thống kê, theo thứ tự in / ghi sheet
+GROUP_FIELDS = ('Ngành', 'Khóa', 'Giảng viên', 'Nhà', 'Phòng')
+# Nhóm số ô tuần theo ký hiệu ('Học', 'Học, xem ghi chú', 'Học bù', ...), xem tkb_weeks.WeekMatrix.marker_counts
+MARKER_GROUP = 'Ký hiệu tuần'
+# Nhóm -> cột trong sheet nguồn (Phòng dựng từ Phòng + Nhà, cùng nhãn với 'Địa điểm' của kết quả chuyển đổi)
+SOURCE_FIELDS = {'Ngành': 'Ngành', 'Khóa': 'Khóa', 'Giảng viên': 'Giảng viên giảng dạy', 'Nhà': 'Nhà'}
+# Lớp học phần (mã môn, lớp, nhóm): số TC chỉ cộng một lần dù lớp có nhiều buổi
+RESULT_SECTION = ('Mã môn học', 'Lớp', 'Mã lớp')
+SOURCE_SECTION = ('Mã môn học', 'Lớp', 'Nhóm')
+# Sức chứa một phòng mỗi tuần khi tính tỉ lệ sử dụng: mọi thứ trong tuần x 16 tiết
+PERIODS_PER_DAY = 16
+ROOM_WEEK_PERIODS = len(DAY_LABELS) * PERIODS_PER_DAY
+
+@dataclass
+class ScheduleStatistics:
+    """Kết quả thống kê dùng chung cho sheet Excel, màn hình và JSON
+
+    totals: số liệu toàn bộ; groups: tên nhóm -> DataFrame (index = giá trị, nhiều dòng nhất trước).
+    """
+    totals: dict
+    groups: dict
+
+    def top(self, group, n=None, by='Số lượng'):
+        table = self.groups[group]
+        if by != 'Số lượng':
+            table = table.sort_values(by, ascending=False, kind='stable')
+        return table if n is None else table.head(n)
+
+    def to_frame(self, groups=GROUP_FIELDS + (MARKER_GROUP,)):
+        """Bảng dài cho sheet 'Thống kê': Loại, Tên, Số lượng, rồi các chỉ số còn lại"""
+        frames = [self.groups[group].rename_axis('Tên').reset_index().assign(Loại=group)
+                  for group in groups if group in self.groups]
+        if not frames:
+            return pd.DataFrame(columns=['Loại', 'Tên', 'Số lượng'])
+        frame = pd.concat(frames, ignore_index=True)
+        first = ['Loại', 'Tên', 'Số lượng']
+        return frame[first + [col for col in frame.columns if col not in first]]
+
+    def to_dict(self):
+        """Dạng JSON: {'totals': {...}, 'groups': {nhóm: [{'Tên': ..., chỉ số...}, ...]}}"""
+        groups = {}
+        for group, table in self.groups.items():
+            records = table.rename_axis('Tên').reset_index()
+            records['Tên'] = records['Tên'].astype(str)
+            groups[group] = json.loads(records.to_json(orient='records', force_ascii=False))
+        return {'totals': self.totals, 'groups': groups}
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+def _popcount(masks):
+    """Số bit 1 của từng bitmask (tính trên các giá trị khác nhau)"""
+    uniques, inverse = np.unique(masks, return_inverse=True)
+    return np.array([bin(int(mask)).count("1") for mask in uniques], dtype=np.int64)[inverse.reshape(-1)]
+
+def _numbers(values):
+    return pd.to_numeric(pd.Series(values).astype(object), errors='coerce').fillna(0).to_numpy(dtype=float)
+
+def _keys(values):
+    """(mã nhóm, tên) của một cột; tên gộp sau khi strip, ô trống/chuỗi rỗng không thuộc nhóm nào (mã -1)"""
+    codes, names = _codes(values)
+    remap, names = pd.factorize(pd.Index([str(name).strip() for name in names] + [""], dtype=object))
+    return _mask_empty(remap[codes], pd.Index(names, dtype=object))
+
+def _mask_empty(codes, names):
+    empty = np.array([str(name).strip() == "" for name in names] + [True])
+    return np.where(empty[codes], -1, codes), names
+
+def _section_codes(df, columns):
+    present = [col for col in columns if col in df.columns]
+    if not present:
+        return np.arange(len(df))
+    keys = pd.MultiIndex.from_arrays([df[col].astype(object).to_numpy() for col in present])
+    return pd.factorize(keys)[0]
+
+def _result_inputs(df):
+    """Cột theo từng dòng của kết quả chuyển đổi (schedule_converter_fixed)"""
+    start, end = parse_periods(df['Thời gian']) if 'Thời gian' in df.columns else (np.full(len(df), -1),) * 2
+    rooms, room_names = _keys(df['Địa điểm']) if 'Địa điểm' in df.columns else (np.full(len(df), -1), pd.Index([]))
+    building_names = [match.group(1).strip() if (match := BUILDING.search(str(name))) else "" for name in room_names]
+    buildings, building_index = pd.factorize(pd.Index(building_names + [""], dtype=object))
+    building_index = pd.Index(building_index, dtype=object)
+    keys = {group: _keys(df[group]) for group in ('Ngành', 'Khóa', 'Giảng viên') if group in df.columns}
+    keys['Nhà'] = _mask_empty(buildings[rooms], building_index)
+    keys['Phòng'] = rooms, room_names
+    return {
+        'keys': keys,
+        'periods': np.where(start >= 0, end - start + 1, 0),
+        'masks': week_masks(df['Tuần học']),
+        'credits': _numbers(df['Số tín chỉ']) if 'Số tín chỉ' in df.columns else np.zeros(len(df)),
+        'sections': _section_codes(df, RESULT_SECTION),
+    }
+
+def _source_inputs(df, calendar):
+    """Cột theo từng dòng của sheet TKB nguồn (hoặc kết quả còn giữ tên cột nguồn)"""
+    keys = {group: _keys(df[col]) for group, col in SOURCE_FIELDS.items() if col in df.columns}
+    if 'Phòng' in df.columns or 'Nhà' in df.columns:
+        blank = pd.Series("", index=df.index, dtype=object)
+        room = df['Phòng'] if 'Phòng' in df.columns else blank
+        building = df['Nhà'] if 'Nhà' in df.columns else blank
+        pairs, uniques = pd.factorize(pd.MultiIndex.from_arrays([
+            room.astype(object).where(room.notna(), "").astype(str).str.strip().to_numpy(),
+            building.astype(object).where(building.notna(), "").astype(str).str.strip().to_numpy()]))
+        names = pd.Index([location_label(r, b) for r, b in uniques], dtype=object)
+        keys['Phòng'] = _mask_empty(pairs, names)
+    return {
+        'keys': keys,
+        'periods': _numbers(df['Số tiết']).astype(np.int64) if 'Số tiết' in df.columns else np.zeros(len(df), dtype=np.int64),
+        'masks': calendar.encode_frame(df),
+        'credits': _numbers(df['Số TC']) if 'Số TC' in df.columns else np.zeros(len(df)),
+        'sections': _section_codes(df, SOURCE_SECTION),
+    }
+
+def _union_weeks(codes, masks, size):
+    """OR các bitmask tuần theo nhóm -> số tuần có lịch của từng nhóm"""
+    union = np.zeros(size, dtype=np.int64)
+    if len(codes):
+        order = np.argsort(codes, kind='stable')
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        union[sorted_codes[starts]] = np.bitwise_or.reduceat(masks[order], starts)
+    return _popcount(union)
+
+def _group_table(codes, names, rows):
+    """Bảng chỉ số của một nhóm: mọi chỉ số là bincount trên các mảng theo dòng đã tính sẵn"""
+    valid = codes >= 0
+    codes = codes[valid]
+    size = len(names)
+    count = np.bincount(codes, minlength=size)
+    hours = np.bincount(codes, weights=rows['hours'][valid], minlength=size)
+    # Lớp học phần khác nhau trong nhóm, mỗi lớp lấy số TC của dòng đầu tiên
+    pairs = codes * (int(rows['sections'].max(initial=0)) + 1) + rows['sections'][valid]
+    _, first = np.unique(pairs, return_index=True)
+    sections = np.bincount(codes[first], minlength=size)
+    credits = np.bincount(codes[first], weights=rows['credits'][valid][first], minlength=size)
+    weeks = _union_weeks(codes, rows['masks'][valid], size)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        per_week = np.where(weeks > 0, hours / weeks, 0.0)
+    table = pd.DataFrame({'Số lượng': count, 'Số lớp HP': sections, 'Số tuần': weeks,
+                          'Số tiết dạy': hours.astype(np.int64), 'Tiết/tuần TB': per_week.round(2),
+                          'Số tín chỉ': credits}, index=pd.Index(names, dtype=object))
+    return table, count
+
+def compute_statistics(df, calendar=DEFAULT_CALENDAR, masks=None, week_markers=None):
+    """Thống kê theo Ngành, Khóa, Giảng viên, Nhà, Phòng trong một lượt
+
+    Nhận kết quả chuyển đổi (có cột 'Tuần học') hoặc sheet nguồn (tuần lấy từ các cột tuần của calendar);
+    masks: bitmask tuần tự tính cho từng dòng (dùng thay cho cột tuần). Các mảng theo dòng (số tiết, số tuần,
+    tiết dạy = Số tiết x số tuần có học, số TC, lớp học phần) được dựng một lần; mỗi nhóm chỉ là vài
+    bincount trên mã nhóm. Tỉ lệ sử dụng phòng = tiết dạy / (số tuần của học kỳ x ROOM_WEEK_PERIODS).
+    week_markers: {nhãn ký hiệu: số ô} của các cột tuần nguồn (WeekMatrix.marker_counts), thành nhóm MARKER_GROUP.
+    """
+    inputs = _result_inputs(df) if 'Tuần học' in df.columns else _source_inputs(df, calendar)
+    if masks is not None:
+        inputs['masks'] = np.asarray(masks, dtype=np.int64)
+    weeks = _popcount(inputs['masks'])
+    rows = {'hours': inputs['periods'] * weeks, 'masks': inputs['masks'],
+            'credits': inputs['credits'], 'sections': inputs['sections']}
+    semester_weeks = int(_popcount(np.bitwise_or.reduce(inputs['masks'], keepdims=True))[0]) if len(df) else 0
+    capacity = semester_weeks * ROOM_WEEK_PERIODS
+
+    groups = {}
+    for group in GROUP_FIELDS:
+        if group not in inputs['keys']:
+            continue
+        codes, names = inputs['keys'][group]
+        table, count = _group_table(codes, names, rows)
+        if group in ('Phòng', 'Nhà'):
+            online = np.array([bool(SKIP_LOCATIONS.search(f"Nhà {name}" if group == 'Nhà' else str(name)))
+                               for name in names], dtype=bool)
+            if group == 'Nhà':
+                room_codes, room_names = inputs['keys']['Phòng']
+                both = (codes >= 0) & (room_codes >= 0)
+                pairs = np.unique(codes[both] * (len(room_names) + 1) + room_codes[both])
+                rooms = np.bincount(pairs // (len(room_names) + 1), minlength=len(names))
+                table.insert(0, 'Số phòng', rooms)
+                slots = rooms * capacity
+            else:
+                slots = np.full(len(names), capacity)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                usage = np.where(online | (slots == 0), np.nan, table['Số tiết dạy'].to_numpy() / slots)
+            table['Tỉ lệ sử dụng'] = usage.round(4)
+        order = np.argsort(-count, kind='stable')
+        groups[group] = table.iloc[order[count[order] > 0]]
+    if week_markers:
+        table = pd.DataFrame({'Số lượng': list(week_markers.values())},
+                             index=pd.Index(list(week_markers), dtype=object, name=MARKER_GROUP))
+        groups[MARKER_GROUP] = table.sort_values('Số lượng', ascending=False, kind='stable')
+
+    totals = {
+        'Số dòng': int(len(df)),
+        'Số lớp HP': int(len(np.unique(inputs['sections']))),
+        'Số tuần': semester_weeks,
+        'Số tiết dạy': int(rows['hours'].sum()),
+        'Số tín chỉ': float(inputs['credits'][np.unique(inputs['sections'], return_index=True)[1]].sum()),
+    }
+    totals.update({f"Số {group.lower()}": len(table) for group, table in groups.items()
+                   if group in ('Giảng viên', 'Phòng')})
+    return ScheduleStatistics(totals=totals, groups=groups)
+
+def print_statistics(stats, top=10):
+    """In thống kê: Top ngành, mọi khóa, giảng viên nhiều tiết nhất, phòng dùng nhiều nhất"""
+    totals = stats.totals
+    print(f"\n📊 Tổng: {totals['Số dòng']} dòng, {totals['Số lớp HP']} lớp học phần, "
+          f"{totals['Số tiết dạy']} tiết dạy trong {totals['Số tuần']} tuần, {totals['Số tín chỉ']:g} tín chỉ")
+    if 'Ngành' in stats.groups:
+        print(f"\n📈 Top {top} ngành có nhiều lớp nhất:")
+        table = stats.top('Ngành', top)
+        for major, count, hours in zip(table.index, table['Số lượng'], table['Số tiết dạy']):
+            print(f"  - {major}: {count} lớp, {hours} tiết")
+    if 'Khóa' in stats.groups:
+        print("\n📅 Thống kê theo khóa:")
+        table = stats.top('Khóa')
+        for year, count, hours in zip(table.index, table['Số lượng'], table['Số tiết dạy']):
+            print(f"  - Khóa {year}: {count} lớp, {hours} tiết")
+    if 'Giảng viên' in stats.groups:
+        print(f"\n👩‍🏫 Top {top} giảng viên nhiều tiết nhất:")
+        table = stats.top('Giảng viên', top, by='Số tiết dạy')
+        for lecturer, hours, weeks, per_week, sections in zip(table.index, table['Số tiết dạy'], table['Số tuần'],
+                                                               table['Tiết/tuần TB'], table['Số lớp HP']):
+            print(f"  - {lecturer}: {hours} tiết / {weeks} tuần ({per_week:g} tiết/tuần), {sections} lớp HP")
+    if 'Phòng' in stats.groups:
+        print(f"\n🏫 Top {top} phòng sử dụng nhiều nhất:")
+        table = stats.top('Phòng', top, by='Tỉ lệ sử dụng')
+        for room, hours, usage in zip(table.index, table['Số tiết dạy'], table['Tỉ lệ sử dụng']):
+            print(f"  - {room}: {hours} tiết ({usage:.1%})")
+    if MARKER_GROUP in stats.groups:
+        print("\n🗓️ Ô tuần theo ký hiệu:")
+        for label, count in stats.groups[MARKER_GROUP]['Số lượng'].items():
+            print(f"  - {label}: {count} ô")
@@ -0,0 +1,127 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Mã trong ma trận chú thích: 0 = ô trống, 1..n = marker thứ n trong bảng, OTHER = ô có nội dung lạ
+EMPTY = 0
+OTHER = 255
+
+@dataclass(frozen=True)
+class WeekMarker:
+    """Một ký hiệu trong ô tuần: text so khớp sau khi strip + lower, active = tuần có học"""
+    text: str
+    label: str
+    active: bool = True
+
+# Bảng ký hiệu mặc định: chỉ 'x' và biến thể. Ô lạ chứa 'x' vẫn tính là có học
+# (giống quy tắc cũ `'x' in str(ô).lower()`), ô khác (vd. 'b') là không có học
+DEFAULT_MARKERS = (
+    WeekMarker('x', "Học"),
+    WeekMarker('x*', "Học, xem ghi chú"),
+)
+# Mã học bù: chỉ dùng khi được chọn, vd. MarkerTable(DEFAULT_MARKERS + MAKEUP_MARKERS)
+MAKEUP_MARKERS = (
+    WeekMarker('b', "Học bù"),
+    WeekMarker('bù', "Học bù"),
+)
+
+class MarkerTable:
+    """Bảng phân loại ô tuần: giá trị ô -> mã marker và có học hay không"""
+
+    def __init__(self, markers=DEFAULT_MARKERS, fallback_contains='x'):
+        if len(markers) >= OTHER:
+            raise ValueError(f"Tối đa {OTHER - 1} ký hiệu")
+        self.markers = tuple(markers)
+        self.fallback_contains = fallback_contains
+        self._codes = {marker.text.strip().lower(): code for code, marker in enumerate(self.markers, start=1)}
+        # Theo mã: có học hay không (EMPTY và OTHER tính riêng)
+        self.active_codes = np.zeros(256, dtype=bool)
+        for code, marker in enumerate(self.markers, start=1):
+            self.active_codes[code] = marker.active
+
+    def classify(self, value):
+        """(mã, có học) của một ô"""
+        if value is None or (not isinstance(value, str) and pd.isna(value)):
+            return EMPTY, False
+        text = str(value).strip().lower()
+        if not text:
+            return EMPTY, False
+        code = self._codes.get(text)
+        if code is not None:
+            return code, bool(self.active_codes[code])
+        return OTHER, bool(self.fallback_contains) and self.fallback_contains in text
+
+    def to_dict(self):
+        """Dạng JSON (lưu kèm trạng thái chuyển đổi để biết bảng ký hiệu có đổi không)"""
+        return {'markers': [[marker.text, marker.label, marker.active] for marker in self.markers],
+                'fallback_contains': self.fallback_contains}
+
+    def is_active(self, value):
+        return self.classify(value)[1]
+
+    def label(self, code):
+        if code == EMPTY:
+            return ""
+        if code == OTHER:
+            return "Khác"
+        return self.markers[code - 1].label
+
+DEFAULT_MARKER_TABLE = MarkerTable()
+
+@dataclass
+class WeekMatrix:
+    """Kết quả đọc các cột tuần: codes (số dòng, số cột tuần) uint8 và active đã nén bit theo dòng
+
+    Bit i của mỗi dòng trong packed (thứ tự little) là cột tuần columns[i].
+    """
+    columns: list
+    codes: np.ndarray
+    packed: np.ndarray
+    table: MarkerTable = DEFAULT_MARKER_TABLE
+
+    def __len__(self):
+        return len(self.codes)
+
+    def active(self):
+        """Ma trận bool (số dòng, số cột tuần)"""
+        return np.unpackbits(self.packed, axis=1, count=len(self.columns), bitorder='little').astype(bool)
+
+    def masks(self):
+        """Bitmask int64 mỗi dòng (bit i = cột columns[i]), như SemesterCalendar.encode_frame"""
+        if len(self.columns) > 63:
+            raise ValueError("Quá 63 cột tuần, không gói được vào int64")
+        padded = np.zeros((len(self.packed), 8), dtype=np.uint8)
+        padded[:, :self.packed.shape[1]] = self.packed
+        return padded.view('<u8').reshape(-1).astype(np.int64)
+
+    def marker_counts(self):
+        """Số ô theo từng nhãn ký hiệu (bỏ ô trống; các ký hiệu cùng nhãn được cộng dồn): {nhãn: số ô}"""
+        counts = np.bincount(self.codes.reshape(-1), minlength=256)
+        labels = {}
+        for code in np.flatnonzero(counts):
+            if code != EMPTY:
+                label = self.table.label(code)
+                labels[label] = labels.get(label, 0) + int(counts[code])
+        return labels
+
+def parse_week_matrix(df, columns, table=DEFAULT_MARKER_TABLE):
+    """Đọc mọi cột tuần của df một lượt thành WeekMatrix
+
+    Các ô được gom thành một mảng 2-D, factorize một lần (ô trống không tạo chuỗi), chỉ các giá trị
+    khác nhau mới được phân loại bằng bảng ký hiệu; cột không có trong df coi như trống.
+    """
+    columns = list(columns)
+    present = [i for i, col in enumerate(columns) if col in df.columns]
+    codes = np.zeros((len(df), len(columns)), dtype=np.uint8)
+    active = np.zeros((len(df), len(columns)), dtype=bool)
+    if present and len(df):
+        cells = np.column_stack([df[columns[i]].to_numpy(dtype=object) for i in present])
+        value_index, uniques = pd.factorize(cells.reshape(-1))
+        classified = [table.classify(value) for value in uniques] + [(EMPTY, False)]
+        unique_codes = np.array([code for code, _ in classified], dtype=np.uint8)
+        unique_active = np.array([is_active for _, is_active in classified], dtype=bool)
+        codes[:, present] = unique_codes[value_index].reshape(len(df), len(present))
+        active[:, present] = unique_active[value_index].reshape(len(df), len(present))
+    packed = np.packbits(active, axis=1, bitorder='little')
+    return WeekMatrix(columns=columns, codes=codes, packed=packed, table=table)
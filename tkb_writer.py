@@ -0,0 +1,76 @@
+import math
+
+import pandas as pd
+
+def _cell_value(value):
+    """Giá trị ghi được vào ô Excel: None cho ô trống/NaN, số numpy -> số Python"""
+    if value is None or value is pd.NA or value is pd.NaT:
+        return None
+    if hasattr(value, 'item') and not isinstance(value, (str, bytes)):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+def _write_xlsxwriter(output_file, sheets):
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(output_file, {'constant_memory': True})
+    header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+    counts = []
+    try:
+        for sheet_name, columns, rows in sheets:
+            worksheet = workbook.add_worksheet(sheet_name)
+            for col, name in enumerate(columns):
+                worksheet.write(0, col, str(name), header_format)
+            count = 0
+            for count, row in enumerate(rows, start=1):
+                for col, value in enumerate(row):
+                    value = _cell_value(value)
+                    if value is not None:
+                        worksheet.write(count, col, value)
+            counts.append(count)
+    finally:
+        workbook.close()
+    return counts
+
+def _write_openpyxl(output_file, sheets):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    workbook = Workbook(write_only=True)
+    thin = Side(style='thin')
+    counts = []
+    for sheet_name, columns, rows in sheets:
+        worksheet = workbook.create_sheet(sheet_name)
+        header = []
+        for name in columns:
+            cell = WriteOnlyCell(worksheet, value=str(name))
+            cell.font = Font(bold=True)
+            cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+            cell.alignment = Alignment(horizontal='center', vertical='top')
+            header.append(cell)
+        worksheet.append(header)
+        count = 0
+        for count, row in enumerate(rows, start=1):
+            worksheet.append([_cell_value(value) for value in row])
+        counts.append(count)
+    workbook.save(output_file)
+    return counts
+
+def write_xlsx_stream(output_file, sheets):
+    """Ghi xlsx theo luồng với bộ nhớ không đổi: mỗi sheet là (tên, danh sách cột, iterable các dòng)
+
+    Dùng xlsxwriter ở chế độ constant_memory nếu đã cài, nếu không thì openpyxl write-only.
+    Các dòng được tiêu thụ lần lượt, không giữ lại trong bộ nhớ. Trả về số dòng đã ghi mỗi sheet.
+    """
+    try:
+        import xlsxwriter  # noqa: F401
+    except ImportError:
+        return _write_openpyxl(output_file, sheets)
+    return _write_xlsxwriter(output_file, sheets)
+
+def frame_rows(df):
+    """Các dòng của DataFrame dưới dạng tuple (không tạo dict)"""
+    return df.itertuples(index=False, name=None)